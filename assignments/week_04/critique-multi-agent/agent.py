@@ -1,7 +1,6 @@
 import os
 from typing import Literal, Annotated, TypedDict
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import END, START, StateGraph, MessagesState
 from langgraph.prebuilt import ToolNode
@@ -13,6 +12,8 @@ from langchain_community.tools.tavily_search import TavilySearchResults
 from langchain_experimental.tools import PythonREPLTool
 from dotenv import load_dotenv
 
+from clients import registry
+
 
 # Load environment variables from .env file
 load_dotenv()
@@ -60,9 +61,8 @@ def call_research_model(state: AgentState, config: RunnableConfig):
     responses based on the current state and user query.
     """
     system_prompt = SystemMessage("You are a helpful AI assistant, please respond to the user's query to the best of your ability!")
-    model = ChatOpenAI(model="gpt-4o-mini")
     tools = [tavily_tool]
-    model = model.bind_tools(tools)
+    model = registry.chat_model("gpt-4o-mini").bind_tools(tools)
     response = model.invoke([system_prompt] + state['messages'], config)
     current_count = state.setdefault('step_count', 0)
     return {"messages": [response], 'step_count': current_count + 1}
@@ -72,7 +72,7 @@ def respond(state: AgentState):
     Function to generate a structured response using the ResearcherResponse model.
     This formulates the proposal based on the research conducted.
     """
-    model = ChatOpenAI(model="gpt-4o-mini")
+    model = registry.chat_model("gpt-4o-mini")
     response = model.with_structured_output(ResearcherResponse).invoke([HumanMessage(content=state['messages'][-1].content)])
     return {'proposal': state['messages'][-1].content, "researcher_response": response}
 
@@ -86,7 +86,7 @@ def call_critique_model(state: AgentState, config: RunnableConfig):
     If it seems like the proposal is fine, then in proposal feedback mention that the proposal is good and accept the proposal.
     Otherwise provide concise proposal feedback and reject the proposal.
     """
-    model = ChatOpenAI(model="gpt-4o-mini")
+    model = registry.chat_model("gpt-4o-mini")
     messages = [
         {"role": "user", "content": critique_prompt},
         {"role": "assistant", "content": state['proposal']},
@@ -141,7 +141,7 @@ def call_coder_model(state: AgentState, config: RunnableConfig):
         {"role": "user", "content": coder_prompt},
         {"role": "assistant", "content": coder_agent_context},
     ]
-    model = ChatOpenAI(model="gpt-4o-mini")
+    model = registry.chat_model("gpt-4o-mini")
     response = model.invoke(messages, config)
     return {"graph_code": response.content}
 
@@ -0,0 +1,42 @@
+import threading
+
+import httpx
+from langchain_openai import ChatOpenAI
+
+
+class ClientRegistry:
+    """
+    Registry of long-lived chat models shared by all agents in the workflow.
+
+    Each (model, settings) pair is built once and every model reuses the same connection-pooled
+    httpx clients, so agent calls keep their connections alive instead of reconnecting every time.
+    """
+    def __init__(self, max_connections: int = 20, max_keepalive_connections: int = 10, keepalive_expiry: float = 60.0):
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http_client = httpx.Client(limits=limits)
+        self.http_async_client = httpx.AsyncClient(limits=limits)
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def chat_model(self, model: str = "gpt-4o-mini", **kwargs) -> ChatOpenAI:
+        """
+        Return the shared ChatOpenAI instance for the given model name and settings.
+        """
+        key = (model, *sorted(kwargs.items()))
+        with self._lock:
+            if key not in self._models:
+                self._models[key] = ChatOpenAI(
+                    model=model,
+                    http_client=self.http_client,
+                    http_async_client=self.http_async_client,
+                    **kwargs,
+                )
+            return self._models[key]
+
+
+# Registry used by every agent node
+registry = ClientRegistry()
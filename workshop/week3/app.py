@@ -1,15 +1,56 @@
 import chainlit as cl
 from chainlit.message import Message
+from chainlit.server import app as server
+from fastapi.responses import JSONResponse
 
-from src import RAGAgent
+from src import LazyAgent
+from src.build_index import DEFAULT_ARXIV_LINKS
 
-agent = RAGAgent(
-    arxiv_links=[
-        "https://arxiv.org/pdf/2305.10343.pdf",  # Quantum computing paper
-        "https://arxiv.org/pdf/2303.04137.pdf",  # LLM research paper
-    ],
-    force_recreate=False,
-)
+
+def build_agent():
+    # Imported here so that Chainlit starts serving before langchain and the vector store are loaded
+    from src import RAGAgent
+    from src.instrumentation import JSONLinesExporter, PrometheusExporter
+
+    return RAGAgent(
+        arxiv_links=DEFAULT_ARXIV_LINKS,
+        force_recreate=False,
+        # Built into the Docker image by `python -m src.build_index`; without it, papers are ingested into ./arxiv_db.
+        # The built index is read-only, so it is served from a copy in ./arxiv_db that papers can be added to
+        index_path="./arxiv_index",
+        writable_index=True,
+        memory_db_path=".files/sessions.db",
+        web_cache_path=".files/web_cache.db",
+        metrics_exporters=[JSONLinesExporter(".files/turns.jsonl"), PrometheusExporter(".files/metrics.prom")],
+    )
+
+
+# The agent is built on a background thread while the server starts; chats wait for it if they come first.
+# Failures (e.g. a paper download timing out) are retried before /healthz reports the app as broken
+agent = LazyAgent(build_agent, retries=3, retry_delay=5.0)
+agent.warm_up()
+
+
+async def healthz():
+    """
+    Liveness: 200 while the server is up and the agent is loading or ready, 503 once building it has failed
+    for good, so that the container is restarted. Reports whether the agent is ready too.
+    """
+    status = agent.status()
+    return JSONResponse(status, status_code=503 if status["error"] else 200)
+
+
+async def readyz():
+    """Readiness: 200 once the agent can answer, 503 before that (or if building it failed)."""
+    return JSONResponse(agent.status(), status_code=200 if agent.ready else 503)
+
+
+for path, endpoint in [("/healthz", healthz), ("/readyz", readyz)]:
+    # Routes of a previous load of this module (chainlit run --watch) are replaced
+    server.router.routes[:] = [route for route in server.router.routes if getattr(route, "path", None) != path]
+    server.add_api_route(path, endpoint, methods=["GET"])
+    # Chainlit serves its UI from a catch-all route, so health routes have to be matched before it
+    server.router.routes.insert(0, server.router.routes.pop())
 
 
 @cl.on_chat_start
@@ -23,5 +64,23 @@ async def on_chat_start():
 async def on_message(message: Message):
     """Handle incoming messages."""
     print(message.content)
-    answer = agent.ask(message.content)
-    await cl.Message(content=answer).send()
+    answer = cl.Message(content="")
+    progress = cl.Step(name="Research", type="tool")
+    await progress.send()
+    if not agent.ready:
+        await progress.stream_token("Loading the ArXiv knowledge base...\n")
+    rag_agent = await agent.aget()
+    async for event in rag_agent.astream(message.content, session_id=cl.context.session.thread_id):
+        if event["type"] == "status":
+            await progress.stream_token(event["content"] + "\n")
+        elif event["type"] == "token":
+            await answer.stream_token(event["content"])
+    await progress.update()
+    await answer.send()
+
+
+@cl.on_chat_end
+async def on_chat_end():
+    """Release the conversation memory of the finished chat."""
+    if agent.ready:
+        (await agent.aget()).end_session(cl.context.session.thread_id)
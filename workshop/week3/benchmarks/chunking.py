@@ -0,0 +1,129 @@
+import argparse
+import functools
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.documents import Document
+from langchain_text_splitters import MarkdownHeaderTextSplitter, RecursiveCharacterTextSplitter
+
+from src.chunking import DEFAULT_SPLITTER_CONFIG, PageChunker
+from src.ingestion import chunk_ids
+
+from .corpus import make_corpus
+
+
+def two_stage_chunks(pages: List[Document], splitter_config: Dict[str, Any]) -> List[Document]:
+    """The chunking PageChunker replaced: a header splitter over synthetic markdown, then the text splitter."""
+    header_splitter = MarkdownHeaderTextSplitter(
+        headers_to_split_on=[("#", "Section"), ("##", "Subsection"), ("###", "Subsubsection")]
+    )
+    text_splitter = RecursiveCharacterTextSplitter(**splitter_config)
+    chunks: List[Document] = []
+    for page in pages:
+        text = f"# {page.metadata['source']}\n## Page {page.metadata['page']}\n{page.page_content}"
+        small_chunks = text_splitter.split_documents(header_splitter.split_text(text))
+        for chunk in small_chunks:
+            chunk.metadata.update(source=page.metadata["source"], page=page.metadata["page"])
+        chunks.extend(small_chunks)
+    return chunks
+
+
+def load_pages(paths: List[str]) -> List[Document]:
+    from langchain_community.document_loaders import PyPDFLoader
+
+    return [page for path in paths for page in PyPDFLoader(path).load()]
+
+
+def measure(chunk: Callable[[List[Document]], List[Document]], pages: List[Document], repeats: int) -> Dict[str, Any]:
+    durations = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        chunks = chunk(pages)
+        durations.append(time.perf_counter() - started)
+    # Memory allocated on top of the chunks returned (intermediate objects), in a separate run since tracing is slow
+    tracemalloc.start()
+    chunks = chunk(pages)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    seconds = statistics.median(durations)
+    characters = sum(len(page.page_content) for page in pages)
+    return {
+        "seconds": seconds,
+        "pages_per_second": len(pages) / seconds,
+        "chunks_per_second": len(chunks) / seconds,
+        "mb_per_second": characters / 1e6 / seconds,
+        "chunks_mb": current / 2**20,
+        "transient_peak_kb": (peak - current) / 2**10,
+        "chunks": len(chunks),
+    }
+
+
+def same_chunks(a: List[Document], b: List[Document]) -> bool:
+    """Same texts, metadata and content ids, in the same order."""
+    return chunk_ids(a) == chunk_ids(b) and [(c.page_content, c.metadata) for c in a] == [
+        (c.page_content, c.metadata) for c in b
+    ]
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as workdir:
+        paths = args.pdfs or make_corpus(os.path.join(workdir, "papers"), args.papers, args.pages, seed=args.seed)
+        started = time.perf_counter()
+        pages = load_pages(paths)
+        parse_seconds = time.perf_counter() - started
+    splitter_config = DEFAULT_SPLITTER_CONFIG
+    chunker = PageChunker(splitter_config)
+    two_stage = measure(functools.partial(two_stage_chunks, splitter_config=splitter_config), pages, args.repeats)
+    single_pass = measure(chunker.split_pages, pages, args.repeats)
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "config": {"pdfs": len(paths), "pages": len(pages), "repeats": args.repeats, "splitter": splitter_config},
+        "parse_seconds": parse_seconds,
+        "identical": same_chunks(two_stage_chunks(pages, splitter_config), chunker.split_pages(pages)),
+        "two_stage": two_stage,
+        "page_chunker": single_pass,
+        "speedup": two_stage["seconds"] / single_pass["seconds"],
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Chunking throughput: PageChunker vs the former two-stage splitting")
+    parser.add_argument("--papers", type=int, default=100, help="Synthetic papers to chunk")
+    parser.add_argument("--pages", type=int, default=20, help="Pages per synthetic paper")
+    parser.add_argument("--pdf", action="append", dest="pdfs", help="Chunk these PDFs instead (repeatable)")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per chunker")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmarks/results/chunking.json", help="Where to write the JSON report")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    report = run_benchmark(args)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    lines = [
+        f"{name.replace('_', ' ').capitalize()}: {result['pages_per_second']:.0f} pages/s, "
+        f"{result['chunks_per_second']:.0f} chunks/s, {result['mb_per_second']:.2f} MB/s, "
+        f"{result['transient_peak_kb']:.0f} KB allocated at peak besides the chunks"
+        for name, result in [("two_stage", report["two_stage"]), ("page_chunker", report["page_chunker"])]
+    ]
+    lines.append(
+        f"{report['config']['pages']} pages, {report['page_chunker']['chunks']} chunks: "
+        f"{report['speedup']:.2f}x faster, " + ("identical chunks" if report["identical"] else "CHUNKS DIFFER")
+    )
+    print("\n".join(lines) + f"\nReport written to {args.output}")
+    return 0 if report["identical"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import os
+import random
+from typing import List
+
+VOCABULARY = (
+    "quantum entanglement diffusion policy transformer attention gradient theorem lemma proof model training "
+    "data robot action sequence noise denoising kernel hilbert space operator circuit qubit error correction "
+    "benchmark dataset loss optimizer convergence sampling trajectory manipulation visuomotor latent"
+).split()
+
+WEB_TOPICS = ["weather in Toronto", "stock price of Nvidia", "latest football scores", "news headlines today"]
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, pages: List[List[str]]) -> None:
+    """Write a minimal text-only PDF with one line of Helvetica per entry, readable by PyPDFLoader."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", b"", b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        stream = "BT /F1 10 Tf 12 TL 40 760 Td " + " ".join(f"({_escape(line)}) Tj T*" for line in lines) + " ET"
+        content = stream.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+        kids.append(len(objects) + 1)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> "
+            b"/Contents %d 0 R >>" % (len(objects))
+        )
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        " ".join(f"{kid} 0 R" for kid in kids).encode(),
+        len(kids),
+    )
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def make_corpus(directory: str, papers: int, pages: int, seed: int = 0) -> List[str]:
+    """Write `papers` synthetic papers of `pages` pages each; returns their paths."""
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for paper in range(papers):
+        content = []
+        for _ in range(pages):
+            lines = []
+            for _ in range(60):
+                line = " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(4, 14)))
+                lines.append(line + ("." if rng.random() < 0.3 else ""))
+            content.append(lines)
+        path = os.path.join(directory, f"paper_{paper:03d}.pdf")
+        write_pdf(path, content)
+        paths.append(path)
+    return paths
+
+
+def make_questions(count: int, seed: int = 0) -> List[str]:
+    """Distinct questions, mostly about the corpus vocabulary with some general web topics mixed in."""
+    rng = random.Random(seed)
+    questions = []
+    for i in range(count):
+        if i % 4 == 3:
+            questions.append(f"What is the {rng.choice(WEB_TOPICS)} (question {i})?")
+        else:
+            a, b = rng.sample(VOCABULARY, 2)
+            questions.append(f"How does the paper relate {a} and {b} (question {i})?")
+    return questions
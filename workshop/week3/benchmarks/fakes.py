@@ -0,0 +1,234 @@
+import asyncio
+import hashlib
+import math
+import re
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from src.clients import ClientRegistry
+
+ROUTES = ["arxiv", "web", "both"]
+_WORD = re.compile(r"\w+")
+
+
+def _stable_hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model stand-in that waits `latency` seconds and answers with `output_tokens` tokens.
+
+    With `route=True` it answers like the router, picking "arxiv", "web" or "both" from a hash of the prompt,
+    so the same questions always take the same path. Token usage is reported like an OpenAI response.
+    """
+
+    latency: float = 0.05
+    output_tokens: int = 200
+    route: bool = False
+    model_name: str = "gpt-4o-mini"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-benchmark"
+
+    def _reply(self, messages: List[BaseMessage]) -> List[str]:
+        prompt = "\n".join(str(m.content) for m in messages)
+        if self.route:
+            return [ROUTES[_stable_hash(prompt) % len(ROUTES)]]
+        words = _WORD.findall(prompt) or ["answer"]
+        return [f"{words[(_stable_hash(prompt) + i) % len(words)]} " for i in range(self.output_tokens)]
+
+    def _message(self, messages: List[BaseMessage], tokens: List[str]) -> Dict[str, Any]:
+        prompt_tokens = sum(len(str(m.content)) for m in messages) // 4
+        return {
+            "usage_metadata": {
+                "input_tokens": prompt_tokens,
+                "output_tokens": len(tokens),
+                "total_tokens": prompt_tokens + len(tokens),
+            },
+            "response_metadata": {"model_name": self.model_name},
+        }
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self.latency)
+        tokens = self._reply(messages)
+        message = AIMessage(content="".join(tokens), **self._message(messages, tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        tokens = self._reply(messages)
+        message = AIMessage(content="".join(tokens), **self._message(messages, tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        tokens = self._reply(messages)
+        for token in tokens:
+            time.sleep(self.latency / len(tokens))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", **self._message(messages, tokens)))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        tokens = self._reply(messages)
+        for token in tokens:
+            await asyncio.sleep(self.latency / len(tokens))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", **self._message(messages, tokens)))
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic bag-of-words embedder: every word is hashed to a signed dimension, so texts sharing
+    words are similar, as with a real embedding model. Waits `latency` seconds per call.
+    """
+
+    def __init__(self, size: int = 256, latency: float = 0.0) -> None:
+        self.size = size
+        self.latency = latency
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.size
+        for word in _WORD.findall(text.lower()):
+            h = _stable_hash(word)
+            vector[h % self.size] += 1.0 if (h >> 32) & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(self.latency)
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        await asyncio.sleep(self.latency)
+        return self._embed(text)
+
+
+class ClusteredEmbeddings(Embeddings):
+    """
+    Fast embedder of realistic size for vector store benchmarks: each text is a seeded random point near one
+    of `topics` random directions (picked from a hash of the text), normalized like OpenAI embeddings.
+    """
+
+    def __init__(self, size: int = 1536, topics: int = 64, noise: float = 0.6, seed: int = 0) -> None:
+        self.size = size
+        self.noise = noise
+        self.centers = np.random.default_rng(seed).standard_normal((topics, size)).astype(np.float32)
+
+    def _embed(self, text: str) -> List[float]:
+        h = _stable_hash(text)
+        vector = self.centers[h % len(self.centers)] + self.noise * np.random.default_rng(h).standard_normal(
+            self.size, dtype=np.float32
+        )
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class StubTavilyClient:
+    """Tavily stand-in returning `max_results` canned results after `latency` seconds."""
+
+    def __init__(self, latency: float = 0.1) -> None:
+        self.latency = latency
+
+    def _response(self, query: str, max_results: int = 5, **kwargs: Any) -> Dict[str, Any]:
+        return {
+            "query": query,
+            "answer": f"Stub answer about {query}",
+            "results": [
+                {
+                    "title": f"Result {i + 1} for {query}",
+                    "url": f"https://example.com/{_stable_hash(query) % 10000}/{i}",
+                    "content": f"Stub web content {i + 1} about {query}. " * 20,
+                }
+                for i in range(max_results)
+            ],
+        }
+
+    def search(self, query: str, **kwargs: Any) -> Dict[str, Any]:
+        time.sleep(self.latency)
+        return self._response(query, **kwargs)
+
+    async def asearch(self, query: str, **kwargs: Any) -> Dict[str, Any]:
+        await asyncio.sleep(self.latency)
+        return self._response(query, **kwargs)
+
+
+class BenchmarkRegistry(ClientRegistry):
+    """Client registry that hands out the local stand-ins instead of OpenAI and Tavily clients."""
+
+    def __init__(
+        self,
+        llm_latency: float = 0.05,
+        router_latency: float = 0.02,
+        output_tokens: int = 200,
+        embed_latency: float = 0.005,
+        search_latency: float = 0.1,
+    ) -> None:
+        super().__init__()
+        self.llm_latency = llm_latency
+        self.router_latency = router_latency
+        self.output_tokens = output_tokens
+        self.embed_latency = embed_latency
+        self.search_latency = search_latency
+
+    def _build_chat_model(self, model: str, **kwargs: Any) -> Any:
+        # The router is the only model used without a temperature
+        if "temperature" not in kwargs:
+            return FakeChatModel(latency=self.router_latency, route=True, model_name=model)
+        return FakeChatModel(latency=self.llm_latency, output_tokens=self.output_tokens, model_name=model)
+
+    def _build_embeddings(self) -> Any:
+        return HashingEmbeddings(latency=self.embed_latency)
+
+    def _build_web_search(self) -> Any:
+        return StubTavilyClient(latency=self.search_latency)
@@ -0,0 +1,255 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from typing import Any, Dict, List, Optional, Sequence
+
+from src.instrumentation import set_quiet
+from src.main import ArXivProcessor, RAGAgent
+
+from .corpus import make_corpus, make_questions
+from .fakes import BenchmarkRegistry, HashingEmbeddings
+
+REPORT_VERSION = 1
+
+# Report entries compared against a baseline; all are "lower is better" except throughput
+COMPARED_METRICS = {
+    "latency.end_to_end.p50": "lower",
+    "latency.end_to_end.p95": "lower",
+    "throughput.max_turns_per_second": "higher",
+    "ingestion.chunks_per_second": "higher",
+}
+
+
+def percentiles(values: Sequence[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    if not ordered:
+        return {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0}
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "p50": pick(0.5),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+    }
+
+
+def bench_ingestion(workdir: str, args: argparse.Namespace) -> Dict[str, Any]:
+    papers = make_corpus(os.path.join(workdir, "papers"), args.papers, args.pages, seed=args.seed)
+    processor = ArXivProcessor(
+        embeddings=HashingEmbeddings(latency=args.embed_latency),
+        persist_directory=os.path.join(workdir, "arxiv_db"),
+        pdf_cache_dir=None,
+    )
+    started = time.perf_counter()
+    processor.load_and_process(papers, force_recreate=True)
+    seconds = time.perf_counter() - started
+    chunks = sum(len(record.chunk_ids) for record in processor.manifest.sources.values())
+    return {
+        "papers": len(papers),
+        "pages": args.papers * args.pages,
+        "chunks": chunks,
+        "seconds": seconds,
+        "chunks_per_second": chunks / seconds,
+        "paths": papers,
+    }
+
+
+def build_agent(workdir: str, papers: List[str], args: argparse.Namespace) -> RAGAgent:
+    registry = BenchmarkRegistry(
+        llm_latency=args.llm_latency,
+        router_latency=args.router_latency,
+        output_tokens=args.output_tokens,
+        embed_latency=args.embed_latency,
+        search_latency=args.search_latency,
+    )
+    # Answer caches would turn repeated measurements into cache hits, so every turn runs the full graph
+    return RAGAgent(
+        arxiv_links=papers,
+        clients=registry,
+        persist_directory=os.path.join(workdir, "arxiv_db"),
+        pdf_cache_dir=None,
+        semantic_cache_threshold=None,
+        web_cache_ttl=None,
+        quiet=True,
+    )
+
+
+def bench_latency(agent: RAGAgent, questions: List[str]) -> Dict[str, Any]:
+    """Sequential turns: end-to-end and per-node latency without contention."""
+    # Reset rather than replaced, as the ArXiv processor records ingestion metrics on the same instance
+    agent.instrumentation.reset()
+    durations = []
+    for i, question in enumerate(questions):
+        started = time.perf_counter()
+        agent.ask(question, session_id=f"latency-{i}")
+        durations.append(time.perf_counter() - started)
+    histograms = agent.instrumentation.snapshot()["histograms"]
+    return {
+        "end_to_end": percentiles(durations),
+        "spans": {name: summary for name, summary in histograms.items() if name != "rag_turn_seconds"},
+    }
+
+
+async def _run_sessions(agent: RAGAgent, questions: List[str], concurrency: int) -> List[float]:
+    durations: List[float] = []
+
+    async def session(index: int) -> None:
+        for question in questions[index::concurrency]:
+            started = time.perf_counter()
+            await agent.aask(question, session_id=f"concurrent-{concurrency}-{index}")
+            durations.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(session(i) for i in range(concurrency)))
+    return durations
+
+
+def bench_throughput(agent: RAGAgent, questions: List[str], levels: List[int]) -> Dict[str, Any]:
+    """N concurrent sessions sharing the agent, each asking its share of the questions."""
+    results = []
+    for concurrency in levels:
+        started = time.perf_counter()
+        durations = asyncio.run(_run_sessions(agent, questions, concurrency))
+        seconds = time.perf_counter() - started
+        results.append(
+            {
+                "concurrency": concurrency,
+                "turns": len(durations),
+                "seconds": seconds,
+                "turns_per_second": len(durations) / seconds,
+                "latency": percentiles(durations),
+            }
+        )
+    return {"levels": results, "max_turns_per_second": max(r["turns_per_second"] for r in results)}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _lookup(report: Dict[str, Any], path: str) -> Optional[float]:
+    value: Any = report
+    for key in path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Metrics that got worse than the baseline by more than `tolerance` (relative)."""
+    if baseline.get("config") != report.get("config"):
+        print("Warning: baseline was produced with a different configuration", file=sys.stderr)
+    regressions = []
+    for path, better in COMPARED_METRICS.items():
+        new, old = _lookup(report, path), _lookup(baseline, path)
+        if not new or not old:
+            continue
+        change = (new - old) / old
+        print(f"{path}: {old:.4f} -> {new:.4f} ({change:+.1%})")
+        if (better == "lower" and change > tolerance) or (better == "higher" and change < -tolerance):
+            regressions.append(f"{path} changed by {change:+.1%}")
+    return regressions
+
+
+def run_benchmarks(args: argparse.Namespace) -> Dict[str, Any]:
+    set_quiet()
+    # Chroma's l2 relevance can drop below 0 and langchain warns on every such query
+    warnings.filterwarnings("ignore", message="Relevance scores must be between 0 and 1")
+    config = {
+        key: getattr(args, key)
+        for key in [
+            "papers",
+            "pages",
+            "questions",
+            "concurrency",
+            "llm_latency",
+            "router_latency",
+            "output_tokens",
+            "embed_latency",
+            "search_latency",
+            "seed",
+        ]
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        ingestion = bench_ingestion(workdir, args)
+        agent = build_agent(workdir, ingestion.pop("paths"), args)
+        questions = make_questions(args.questions, seed=args.seed)
+        latency = bench_latency(agent, questions)
+        throughput = bench_throughput(agent, questions, args.concurrency)
+    return {
+        "version": REPORT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "config": config,
+        "ingestion": ingestion,
+        "latency": latency,
+        "throughput": throughput,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmarks of RAGAgent with local fakes")
+    parser.add_argument("--papers", type=int, default=4, help="Synthetic papers to ingest")
+    parser.add_argument("--pages", type=int, default=8, help="Pages per paper")
+    parser.add_argument("--questions", type=int, default=40, help="Questions per measurement")
+    parser.add_argument(
+        "--concurrency",
+        type=lambda value: [int(v) for v in value.split(",")],
+        default=[1, 4, 16],
+        help="Comma-separated numbers of concurrent sessions",
+    )
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds per synthesis LLM call")
+    parser.add_argument("--router-latency", type=float, default=0.02, help="Seconds per router LLM call")
+    parser.add_argument("--output-tokens", type=int, default=200, help="Tokens per synthesized answer")
+    parser.add_argument("--embed-latency", type=float, default=0.005, help="Seconds per embedding call")
+    parser.add_argument("--search-latency", type=float, default=0.1, help="Seconds per web search")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmarks/results/latest.json", help="Where to write the JSON report")
+    parser.add_argument("--baseline", help="Earlier report to compare against; exits non-zero on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression vs baseline")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    report = run_benchmarks(args)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(
+        f"Ingestion: {report['ingestion']['chunks_per_second']:.1f} chunks/s\n"
+        f"End-to-end latency: p50 {report['latency']['end_to_end']['p50']:.3f}s, "
+        f"p95 {report['latency']['end_to_end']['p95']:.3f}s, p99 {report['latency']['end_to_end']['p99']:.3f}s\n"
+        + "\n".join(
+            f"Throughput x{level['concurrency']}: {level['turns_per_second']:.2f} turns/s"
+            for level in report["throughput"]["levels"]
+        )
+        + f"\nReport written to {args.output}"
+    )
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print("Regressions:\n" + "\n".join(regressions), file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
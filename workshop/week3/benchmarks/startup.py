@@ -0,0 +1,147 @@
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from .corpus import make_corpus
+
+# Modules whose import time is measured, each in a fresh interpreter
+IMPORT_TARGETS = ["src", "src.main", "app"]
+
+# Opens (or first builds) the vector store in a fresh interpreter, as the app's warm-up does, and answers once
+AGENT_START = """
+import json, sys, time, warnings
+warnings.filterwarnings("ignore", message="Relevance scores must be between 0 and 1")
+started = time.perf_counter()
+from benchmarks.fakes import BenchmarkRegistry
+from src import RAGAgent
+imported = time.perf_counter()
+agent = RAGAgent(
+    arxiv_links=json.loads(sys.argv[2]),
+    clients=BenchmarkRegistry(),
+    persist_directory=sys.argv[1],
+    pdf_cache_dir=None,
+    semantic_cache_threshold=None,
+    web_cache_ttl=None,
+    quiet=True,
+)
+built = time.perf_counter()
+agent.ask("What does the first paper propose?")
+print(json.dumps({
+    "import_seconds": imported - started,
+    "construct_seconds": built - imported,
+    "first_answer_seconds": time.perf_counter() - built,
+    "total_seconds": time.perf_counter() - started,
+}))
+"""
+
+_IMPORT_TIME = re.compile(r"^import time:\s+(\d+) \|\s+\d+ \|\s*(\S+)$")
+
+
+def parse_importtime(stderr: str, top: int = 10) -> List[Dict[str, Any]]:
+    """Packages that took longest to import, from `python -X importtime` output, in seconds."""
+    packages: Dict[str, float] = {}
+    for line in stderr.splitlines():
+        match = _IMPORT_TIME.match(line)
+        if match is None:
+            continue
+        self_us, module = match.groups()
+        # Self times are summed per top-level package: nesting (and imports on other threads) can't double count
+        package = module.split(".")[0]
+        packages[package] = packages.get(package, 0.0) + int(self_us) / 1e6
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [{"package": package, "seconds": seconds} for package, seconds in ranked]
+
+
+def _environment() -> Dict[str, str]:
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    return {
+        **os.environ,
+        "RAG_QUIET": "1",
+        "PYTHONPATH": os.pathsep.join(filter(None, [root, os.getenv("PYTHONPATH")])),
+    }
+
+
+def profile_import(module: str, repeats: int, workdir: str) -> Dict[str, Any]:
+    """Median import time of `module`. Runs in `workdir`, so that the app's warm-up never touches ./arxiv_db."""
+    durations = []
+    stderr = ""
+    for _ in range(repeats):
+        started = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=workdir,
+            env=_environment(),
+        )
+        durations.append(time.perf_counter() - started)
+        stderr = completed.stderr
+    return {"seconds": statistics.median(durations), "slowest_imports": parse_importtime(stderr)}
+
+
+def profile_agent_start(persist_directory: str, papers: List[str]) -> Dict[str, float]:
+    completed = subprocess.run(
+        [sys.executable, "-c", AGENT_START, persist_directory, json.dumps(papers)],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=_environment(),
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_profile(args: argparse.Namespace) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as workdir:
+        imports = {module: profile_import(module, args.repeats, workdir) for module in IMPORT_TARGETS}
+        papers = make_corpus(os.path.join(workdir, "papers"), args.papers, args.pages)
+        persist_directory = os.path.join(workdir, "arxiv_db")
+        # The first start has no vector store and ingests the papers; later starts only open it
+        first_start = profile_agent_start(persist_directory, papers)
+        restart = profile_agent_start(persist_directory, papers)
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "config": {"repeats": args.repeats, "papers": args.papers, "pages": args.pages},
+        "imports": imports,
+        "agent_start": {"empty_store": first_start, "existing_store": restart},
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Cold-start profile: import times and agent start-up")
+    parser.add_argument("--repeats", type=int, default=3, help="Fresh interpreters per import measurement")
+    parser.add_argument("--papers", type=int, default=2, help="Synthetic papers in the vector store")
+    parser.add_argument("--pages", type=int, default=4, help="Pages per paper")
+    parser.add_argument("--output", default="benchmarks/results/startup.json", help="Where to write the JSON report")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    report = run_profile(args)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    lines = [f"import {module}: {result['seconds']:.2f}s" for module, result in report["imports"].items()]
+    lines += [
+        f"Agent start ({name.replace('_', ' ')}): {result['total_seconds']:.2f}s "
+        f"(imports {result['import_seconds']:.2f}s, construction {result['construct_seconds']:.2f}s, "
+        f"first answer {result['first_answer_seconds']:.2f}s)"
+        for name, result in report["agent_start"].items()
+    ]
+    print("\n".join(lines) + f"\nReport written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
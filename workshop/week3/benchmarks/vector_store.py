@@ -0,0 +1,195 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from src.flat_index import FlatIndex
+
+from .fakes import ClusteredEmbeddings
+from .run_benchmarks import percentiles
+from .startup import _environment
+
+BACKENDS = ["chroma", "flat-float32", "flat-float16", "flat-int8"]
+
+# Opens a stored index in a fresh interpreter and answers one query: cold open time and resident memory
+OPEN_STORE = """
+import json, resource, sys, time
+import langchain_chroma, src.flat_index
+from benchmarks.fakes import ClusteredEmbeddings
+from benchmarks.vector_store import open_store
+config = json.loads(sys.argv[1])
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 2**20
+    except OSError:
+        # Peak rather than current resident memory
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+embeddings = ClusteredEmbeddings(size=config["dimension"], seed=config["seed"])
+baseline = rss_mb()
+started = time.perf_counter()
+store = open_store(config["backend"], config["directory"], embeddings)
+opened = time.perf_counter()
+store.similarity_search_with_relevance_scores(config["question"], k=config["k"])
+print(json.dumps({
+    "open_seconds": opened - started,
+    "first_query_seconds": time.perf_counter() - opened,
+    "rss_growth_mb": rss_mb() - baseline,
+}))
+"""
+
+
+def open_store(backend: str, directory: str, embeddings: Embeddings) -> Any:
+    """The vector store ArXivProcessor would open for `backend` ("chroma" or "flat-<dtype>")."""
+    if backend == "chroma":
+        from langchain_chroma import Chroma
+
+        return Chroma(persist_directory=directory, embedding_function=embeddings)
+    return FlatIndex(persist_directory=directory, embedding_function=embeddings, dtype=backend.split("-", 1)[1])
+
+
+def exact_neighbours(vectors: np.ndarray, queries: np.ndarray, k: int) -> List[List[int]]:
+    distances = (queries**2).sum(axis=1)[:, None] + (vectors**2).sum(axis=1) - 2 * queries @ vectors.T
+    return np.argsort(distances, axis=1)[:, :k].tolist()
+
+
+def _disk_mb(directory: str) -> float:
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(directory) for f in files) / 2**20
+
+
+def _cold_open(backend: str, directory: str, question: str, args: argparse.Namespace) -> Dict[str, float]:
+    config = {"backend": backend, "directory": directory, "dimension": args.dimension, "seed": args.seed}
+    completed = subprocess.run(
+        [sys.executable, "-c", OPEN_STORE, json.dumps({**config, "question": question, "k": args.k})],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=_environment(),
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def bench_backend(
+    backend: str,
+    workdir: str,
+    texts: List[str],
+    questions: List[str],
+    truth: List[List[int]],
+    args: argparse.Namespace,
+) -> Dict[str, Any]:
+    directory = os.path.join(workdir, backend)
+    store = open_store(backend, directory, ClusteredEmbeddings(size=args.dimension, seed=args.seed))
+    started = time.perf_counter()
+    # Batches of the size ArXivProcessor adds
+    for start in range(0, len(texts), 256):
+        batch = texts[start : start + 256]
+        ids = [str(i) for i in range(start, start + len(batch))]
+        store.add_documents([Document(page_content=text, metadata={"page": 0}) for text in batch], ids=ids)
+    build_seconds = time.perf_counter() - started
+
+    def query(question: str) -> List[Any]:
+        return store.similarity_search_with_relevance_scores(question, k=args.k)
+
+    durations, recalls = [], []
+    for question, expected in zip(questions, truth):
+        started = time.perf_counter()
+        hits = query(question)
+        durations.append(time.perf_counter() - started)
+        recalls.append(len({int(doc.id) for doc, _ in hits} & set(expected)) / args.k)
+
+    results: Dict[str, Any] = {
+        "build_seconds": build_seconds,
+        "disk_mb": _disk_mb(directory),
+        "recall_at_k": sum(recalls) / len(recalls),
+        "latency": percentiles(durations),
+        "throughput": [],
+    }
+    for concurrency in args.concurrency:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            started = time.perf_counter()
+            list(executor.map(query, questions))
+            seconds = time.perf_counter() - started
+        results["throughput"].append({"concurrency": concurrency, "queries_per_second": len(questions) / seconds})
+    results["cold_open"] = _cold_open(backend, directory, questions[0], args)
+    return results
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    # Chroma's l2 relevance can drop below 0 and langchain warns on every such query
+    warnings.filterwarnings("ignore", message="Relevance scores must be between 0 and 1")
+    embeddings = ClusteredEmbeddings(size=args.dimension, seed=args.seed)
+    texts = [f"chunk {i}" for i in range(args.chunks)]
+    questions = [f"question {i}" for i in range(args.queries)]
+    truth = exact_neighbours(
+        np.asarray(embeddings.embed_documents(texts), dtype=np.float32),
+        np.asarray(embeddings.embed_documents(questions), dtype=np.float32),
+        args.k,
+    )
+    with tempfile.TemporaryDirectory() as workdir:
+        backends = {
+            backend: bench_backend(backend, workdir, texts, questions, truth, args) for backend in args.backends
+        }
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "config": {key: getattr(args, key) for key in ["chunks", "dimension", "queries", "k", "concurrency", "seed"]},
+        "backends": backends,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Chroma vs the memory-mapped flat index, on synthetic embeddings")
+    parser.add_argument("--chunks", type=int, default=20000, help="Stored chunks")
+    parser.add_argument("--dimension", type=int, default=1536, help="Embedding size")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per measurement")
+    parser.add_argument("--k", type=int, default=10, help="Hits per query")
+    parser.add_argument(
+        "--concurrency",
+        type=lambda value: [int(v) for v in value.split(",")],
+        default=[1, 8],
+        help="Comma-separated numbers of querying threads",
+    )
+    parser.add_argument(
+        "--backends",
+        type=lambda value: value.split(","),
+        default=BACKENDS,
+        help=f"Comma-separated backends out of {','.join(BACKENDS)}",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmarks/results/vector_store.json", help="Where to write the report")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    report = run_benchmark(args)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    lines = [
+        f"{backend}: build {result['build_seconds']:.1f}s, {result['disk_mb']:.1f} MB on disk, "
+        f"recall@{args.k} {result['recall_at_k']:.3f}, p50 {result['latency']['p50'] * 1000:.2f} ms, "
+        + ", ".join(f"x{t['concurrency']} {t['queries_per_second']:.0f} q/s" for t in result["throughput"])
+        + f", cold open {result['cold_open']['open_seconds']:.2f}s (+{result['cold_open']['rss_growth_mb']:.0f} MB)"
+        for backend, result in report["backends"].items()
+    ]
+    print("\n".join(lines) + f"\nReport written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,27 +1,65 @@
-from typing import Dict
+import argparse
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, List
 
 import dotenv
-from langchain_openai import ChatOpenAI
 from langsmith import Client, wrappers
 from openai import OpenAI
-from pydantic import BaseModel, Field
-from utils import EvaluationDataset, Prompt
+from utils import (
+    EvaluationDataset,
+    EvaluationResult,
+    GradeCache,
+    Grader,
+    ResultStore,
+    config_hash,
+    question_hash,
+    source_hash,
+    summarize_results,
+)
+from utils.path import EVALS_PATH, SRC_PATH
 
 from src import RAGAgent
 
 dotenv.load_dotenv()
-client = Client()
 openai_client = wrappers.wrap_openai(OpenAI())
 
-prompt = Prompt.default_eval_prompt()
+DEFAULT_REPORT_PATH = os.path.join(EVALS_PATH, "results", "latest.json")
 
-agent = RAGAgent(
-    arxiv_links=[
+# Answer and search caches would let one example's answer leak into another's, so they are disabled
+AGENT_CONFIG: Dict[str, Any] = {
+    "arxiv_links": [
         "https://arxiv.org/pdf/2305.10343.pdf",  # Quantum computing paper
         "https://arxiv.org/pdf/2303.04137.pdf",  # LLM research paper
     ],
-    force_recreate=False,
-)
+    "semantic_cache_threshold": None,
+    "web_cache_ttl": None,
+}
+
+
+@lru_cache(maxsize=1)
+def get_client() -> Client:
+    # Created on first use, so that the local backend runs without LangSmith
+    return Client()
+
+
+def build_agent() -> RAGAgent:
+    # Status boxes of concurrent examples would interleave, so they are logged instead
+    return RAGAgent(**AGENT_CONFIG, force_recreate=False, quiet=True)
+
+
+# Modules of `src` whose changes can change an answer: prompts and models (main.py), routing, retrieval and
+# context packing. Serving, caching, ingestion and instrumentation code is left out, so changing it keeps answers
+ANSWER_SOURCES = ["main.py", "clients.py", "routing.py", "policy.py", "lexical.py", "chunking.py", "packing.py"]
+
+
+def agent_config_hash() -> str:
+    """Hash of the agent settings and of the source code that shapes its answers (including the prompts)."""
+    return config_hash({"agent": AGENT_CONFIG, "source": source_hash(SRC_PATH, ANSWER_SOURCES)})
 
 
 def create_dataset(eval_dataset: EvaluationDataset, dataset_name: str) -> str:
@@ -29,10 +67,8 @@ def create_dataset(eval_dataset: EvaluationDataset, dataset_name: str) -> str:
     Create a LangSmith dataset from evaluation questions if it doesn't exist already.
     Return a name of the dataset.
     """
-    datasets = client.list_datasets()
-    dataset_names = [ds.name for ds in datasets]
-
-    if dataset_name in dataset_names:
+    client = get_client()
+    if client.has_dataset(dataset_name=dataset_name):
         print(f"Dataset `{dataset_name}` already exists")
         return dataset_name
 
@@ -44,45 +80,212 @@ def create_dataset(eval_dataset: EvaluationDataset, dataset_name: str) -> str:
 
 # Define the application logic you want to evaluate inside a target function
 # The langsmith SDK will automatically send the inputs from the dataset to your target function
-def target(inputs: Dict[str, str]) -> Dict[str, str]:
-    response = agent.ask(inputs["question"])
-    return {"response": response}
+def make_target(agent: RAGAgent) -> Callable[[Dict[str, str]], Dict[str, Any]]:
+    def target(inputs: Dict[str, str]) -> Dict[str, Any]:
+        # Every example gets its own conversation, so answers never end up in another example's history.
+        # The agent (and its loaded vector store) is shared, which is safe for concurrent examples.
+        session_id = uuid.uuid4().hex
+        started = time.perf_counter()
+        try:
+            response = agent.ask(inputs["question"], session_id=session_id)
+        finally:
+            agent.memory_store.clear(session_id)
+        return {"response": response, "latency": time.perf_counter() - started}
 
+    return target
 
-# Define output schema for the LLM judge
-class Grade(BaseModel):
-    score: bool = Field(
-        description="Boolean that indicates whether the response is accurate relative to the reference answer"
-    )
 
+def accuracy(experiment_results: Any, grader: Grader) -> List[Dict[str, Any]]:
+    """
+    Grade every example of a finished experiment in batches, and attach the grades to its runs as feedback.
+    Returns the experiment rows with their `score`.
+    """
+    rows = list(experiment_results)
+    pairs = [(row["example"].outputs["answer"], (row["run"].outputs or {}).get("response", "")) for row in rows]
+    scores = grader.grade_many(pairs)
+    for row, score in zip(rows, scores):
+        get_client().create_feedback(row["run"].id, key="accuracy", score=score)
+    return [{**row, "score": score} for row, score in zip(rows, scores)]
 
-def accuracy(outputs: Dict[str, str], reference_outputs: Dict[str, str]) -> bool:
-    messages = prompt.to_messages(answer=reference_outputs["answer"], response=outputs["response"])
 
-    model = ChatOpenAI(model="gpt-4o-mini", temperature=0)
-    model_with_structured_output = model.bind_tools([Grade])
-    ai_msg = model_with_structured_output.invoke(messages)
+def run_local(eval_dataset: EvaluationDataset, grader: Grader, max_concurrency: int = 8) -> List[EvaluationResult]:
+    """
+    Evaluate without LangSmith. Answers are stored per (question text, agent config) as soon as they are
+    made, and only questions without a stored answer for the current config are answered again. Every answer
+    is then graded against the current reference answer, with verdicts cached per (reference, response).
+    """
+    store = ResultStore()
+    current_config = agent_config_hash()
+    results = {}
+    pending = []
+    for question in eval_dataset.questions:
+        stored = store.get(question_hash(question), current_config)
+        if stored is not None:
+            results[stored.question_hash] = stored
+        else:
+            pending.append(question)
+    print(f"Reusing {len(results)} stored answers, answering {len(pending)} questions")
 
-    grade = Grade.model_validate(ai_msg.tool_calls[0]["args"])
-    return grade.score
+    if pending:
+        target = make_target(build_agent())
+        with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+            outputs = list(pool.map(lambda q: target({"question": q.question}), pending))
+        answered = [
+            EvaluationResult(
+                question_hash=question_hash(question),
+                config_hash=current_config,
+                question=question.question,
+                answer=question.answer,
+                category=question.category,
+                response=output["response"],
+                latency=output["latency"],
+            )
+            for question, output in zip(pending, outputs)
+        ]
+        # Stored before grading, so that a failed judge request doesn't cost the answers
+        store.put_many(answered)
+        results.update((result.question_hash, result) for result in answered)
 
+    ordered = [
+        results[question_hash(question)].model_copy(update={"answer": question.answer, "category": question.category})
+        for question in eval_dataset.questions
+    ]
+    scores = grader.grade_many([(result.answer, result.response) for result in ordered])
+    graded = [result.model_copy(update={"score": score}) for result, score in zip(ordered, scores)]
+    store.put_many(graded)
+    return graded
 
-def run_evals():
-    # Load evaluation questions
-    eval_dataset = EvaluationDataset.load_default()
 
+def sync_to_langsmith(
+    results: List[EvaluationResult], eval_dataset: EvaluationDataset, dataset_name: str, max_concurrency: int = 8
+) -> None:
+    """Publish local results as a LangSmith experiment, without answering or grading anything again."""
+    dataset_name = create_dataset(eval_dataset, dataset_name=dataset_name)
+    by_question = {result.question: result for result in results}
+
+    def replay(inputs: Dict[str, str]) -> Dict[str, Any]:
+        result = by_question[inputs["question"]]
+        return {"response": result.response, "latency": result.latency}
+
+    experiment_results = get_client().evaluate(replay, data=dataset_name, max_concurrency=max_concurrency)
+    for row in experiment_results:
+        result = by_question.get(row["example"].inputs["question"])
+        if result is not None and result.score is not None:
+            get_client().create_feedback(row["run"].id, key="accuracy", score=result.score)
+    print(f"Explore your results in LangSmith Experiments UI. Experiment name: {experiment_results.experiment_name}")
+
+
+def run_langsmith(
+    eval_dataset: EvaluationDataset, grader: Grader, dataset_name: str, max_concurrency: int = 8
+) -> List[EvaluationResult]:
     # Create dataset
-    dataset_name = create_dataset(eval_dataset, dataset_name="rag_agent_evaluation")
+    dataset_name = create_dataset(eval_dataset, dataset_name=dataset_name)
 
-    # Run evaluations
-    experiment_results = client.evaluate(
-        target,
+    # Run evaluations, up to `max_concurrency` examples at a time
+    experiment_results = get_client().evaluate(
+        make_target(build_agent()),
         data=dataset_name,
-        evaluators=[accuracy],  # can add more evaluators here
+        max_concurrency=max_concurrency,
     )
-
+    # Responses are graded after the run so that the judge sees them in batches; unchanged ones come from the cache
+    graded = accuracy(experiment_results, grader)
     print(f"Explore your results in LangSmith Experiments UI. Experiment name: {experiment_results.experiment_name}")
 
+    questions = {question.question: question for question in eval_dataset.questions}
+    current_config = agent_config_hash()
+    return [
+        EvaluationResult(
+            question_hash=question_hash(questions[row["example"].inputs["question"]]),
+            config_hash=current_config,
+            question=row["example"].inputs["question"],
+            answer=row["example"].outputs["answer"],
+            category=questions[row["example"].inputs["question"]].category,
+            response=(row["run"].outputs or {}).get("response", ""),
+            latency=(row["run"].outputs or {}).get("latency", 0.0),
+            score=row["score"],
+        )
+        for row in graded
+        # The LangSmith dataset is not updated when questions.yaml changes; its stale examples are left out
+        if row["example"].inputs["question"] in questions
+    ]
+
+
+def summarize(results: List[EvaluationResult], wall_seconds: float) -> None:
+    print(f"{'latency (s)':>11}  {'score':<9}{'category':<12}question")
+    for result in sorted(results, key=lambda r: r.latency, reverse=True):
+        score = "-" if result.score is None else "correct" if result.score else "wrong"
+        question = result.question if len(result.question) <= 80 else result.question[:77] + "..."
+        print(f"{result.latency:>11.1f}  {score:<9}{result.category:<12}{question}")
+    print(f"Wall-clock time: {wall_seconds:.1f}s")
+    print(f"{'category':<12}{'count':>7}{'accuracy':>10}{'p50 (s)':>10}{'p95 (s)':>10}")
+    for category, row in summarize_results(results).items():
+        print(
+            f"{category:<12}{row['count']:>7}{row['accuracy']:>10.1%}"
+            f"{row['latency_p50']:>10.1f}{row['latency_p95']:>10.1f}"
+        )
+
+
+def write_report(results: List[EvaluationResult], wall_seconds: float, backend: str, path: str) -> None:
+    """JSON report of the run: per-category summary and every example with its latency and score."""
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "backend": backend,
+        "wall_seconds": wall_seconds,
+        "summary": summarize_results(results),
+        "examples": [
+            {"question": r.question, "category": r.category, "latency": r.latency, "score": r.score} for r in results
+        ],
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {path}")
+
+
+def run_evals(
+    backend: str = "langsmith",
+    max_concurrency: int = 8,
+    dataset_name: str = "rag_agent_evaluation",
+    batch_size: int = 8,
+    sync: bool = False,
+    output: str = DEFAULT_REPORT_PATH,
+):
+    # Load evaluation questions
+    eval_dataset = EvaluationDataset.load_default()
+    grader = Grader(batch_size=batch_size, cache=GradeCache())
+
+    started = time.perf_counter()
+    if backend == "langsmith":
+        results = run_langsmith(eval_dataset, grader, dataset_name, max_concurrency=max_concurrency)
+    else:
+        results = run_local(eval_dataset, grader, max_concurrency=max_concurrency)
+    wall_seconds = time.perf_counter() - started
+    summarize(results, wall_seconds)
+    write_report(results, wall_seconds, backend, output)
+
+    if backend == "local" and sync:
+        sync_to_langsmith(results, eval_dataset, dataset_name, max_concurrency=max_concurrency)
+
 
 if __name__ == "__main__":
-    run_evals()
+    parser = argparse.ArgumentParser(description="Evaluate the RAG agent on the evaluation dataset")
+    parser.add_argument(
+        "--backend",
+        choices=["local", "langsmith"],
+        default="langsmith",
+        help="Evaluate locally with stored results, or run every example as a LangSmith experiment",
+    )
+    parser.add_argument("--sync", action="store_true", help="Publish local results to LangSmith afterwards")
+    parser.add_argument("--max-concurrency", type=int, default=8, help="Examples evaluated at the same time")
+    parser.add_argument("--dataset-name", default="rag_agent_evaluation", help="LangSmith dataset to evaluate on")
+    parser.add_argument("--batch-size", type=int, default=8, help="Responses graded per judge request")
+    parser.add_argument("--output", default=DEFAULT_REPORT_PATH, help="Where to write the JSON report")
+    args = parser.parse_args()
+    run_evals(
+        backend=args.backend,
+        max_concurrency=args.max_concurrency,
+        dataset_name=args.dataset_name,
+        batch_size=args.batch_size,
+        sync=args.sync,
+        output=args.output,
+    )
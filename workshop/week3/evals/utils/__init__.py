@@ -1,4 +1,18 @@
 from .dataset import EvaluationDataset, EvaluationQuestion
+from .grading import GradeCache, Grader
 from .prompt import Prompt
+from .results import EvaluationResult, ResultStore, config_hash, question_hash, source_hash, summarize_results
 
-__all__ = ["Prompt", "EvaluationQuestion", "EvaluationDataset"]
+__all__ = [
+    "Prompt",
+    "EvaluationQuestion",
+    "EvaluationDataset",
+    "Grader",
+    "GradeCache",
+    "EvaluationResult",
+    "ResultStore",
+    "config_hash",
+    "question_hash",
+    "source_hash",
+    "summarize_results",
+]
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_openai import ChatOpenAI
+from pydantic import BaseModel, Field
+
+from .path import EVALS_PATH
+from .prompt import Prompt
+
+DEFAULT_GRADES_PATH = os.path.join(EVALS_PATH, ".cache", "grades.sqlite")
+
+
+# Output schema for the LLM judge
+class Grade(BaseModel):
+    index: int = Field(description="Number of the graded item")
+    score: bool = Field(
+        description="Boolean that indicates whether the response is accurate relative to the reference answer"
+    )
+
+
+class Grades(BaseModel):
+    grades: List[Grade] = Field(description="One grade for every item, in the order given")
+
+
+class GradeCache:
+    """Judge verdicts in SQLite, keyed by a hash of the judge prompt, the reference and the response."""
+
+    def __init__(self, path: str = DEFAULT_GRADES_PATH) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS grades (key TEXT PRIMARY KEY, score INTEGER)")
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bool]:
+        with self._lock:
+            row = self._db.execute("SELECT score FROM grades WHERE key = ?", (key,)).fetchone()
+        return None if row is None else bool(row[0])
+
+    def set_many(self, scores: Dict[str, bool]) -> None:
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO grades (key, score) VALUES (?, ?)", [(k, int(v)) for k, v in scores.items()]
+            )
+            self._db.commit()
+
+
+class Grader:
+    """
+    LLM judge that grades (reference, response) pairs in batches of up to `batch_size` per request.
+
+    One judge model is bound to the `Grades` tool once and reused for every request. Verdicts are cached
+    on disk, so re-grading only pays for responses (or a judge prompt) that changed.
+    """
+
+    def __init__(
+        self,
+        prompt: Optional[Prompt] = None,
+        model: Optional[Any] = None,
+        batch_size: int = 8,
+        cache: Optional[GradeCache] = None,
+    ) -> None:
+        self.prompt = prompt or Prompt.default_eval_prompt()
+        model = model or ChatOpenAI(model="gpt-4o-mini", temperature=0)
+        self.judge = model.bind_tools([Grades], tool_choice="Grades")
+        self.batch_size = batch_size
+        self.cache = cache
+        self._prompt_hash = hashlib.sha256(
+            json.dumps([self.prompt.system_prompt, self.prompt.user_prompt_template]).encode("utf-8")
+        ).hexdigest()
+
+    def key(self, reference: str, response: str) -> str:
+        return hashlib.sha256(json.dumps([self._prompt_hash, reference, response]).encode("utf-8")).hexdigest()
+
+    def grade(self, reference: str, response: str) -> bool:
+        return self.grade_many([(reference, response)])[0]
+
+    def grade_many(self, pairs: Sequence[Tuple[str, str]]) -> List[bool]:
+        """Scores of `pairs` of (reference answer, response), in order."""
+        keys = [self.key(reference, response) for reference, response in pairs]
+        scores: Dict[str, bool] = {}
+        if self.cache is not None:
+            for key in set(keys):
+                cached = self.cache.get(key)
+                if cached is not None:
+                    scores[key] = cached
+        pending = list({key: pair for key, pair in zip(keys, pairs) if key not in scores}.items())
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start : start + self.batch_size]
+            graded = dict(zip([key for key, _ in batch], self._judge([pair for _, pair in batch])))
+            if self.cache is not None:
+                self.cache.set_many(graded)
+            scores.update(graded)
+        return [scores[key] for key in keys]
+
+    def _messages(self, pairs: Sequence[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        messages = self.prompt.to_messages(answer=pairs[0][0], response=pairs[0][1])
+        if len(pairs) > 1:
+            items = [
+                f"Item {i}:\n{self.prompt.user_prompt_template.format(answer=reference, response=response)}"
+                for i, (reference, response) in enumerate(pairs)
+            ]
+            messages[-1]["content"] = f"Grade each of the following {len(pairs)} items.\n\n" + "\n\n".join(items)
+        return messages
+
+    def _judge(self, pairs: Sequence[Tuple[str, str]]) -> List[bool]:
+        ai_msg = self.judge.invoke(self._messages(pairs))
+        grades = Grades.model_validate(ai_msg.tool_calls[0]["args"]).grades
+        if len(pairs) == 1:
+            if not grades:
+                raise ValueError("The judge returned no grade")
+            return [grades[0].score]
+        by_index = {grade.index: grade.score for grade in grades}
+        # Items the judge skipped in a batch are graded on their own
+        return [by_index[i] if i in by_index else self._judge([pair])[0] for i, pair in enumerate(pairs)]
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from pydantic import BaseModel, Field
+
+from .dataset import EvaluationQuestion
+from .path import EVALS_PATH
+
+DEFAULT_RESULTS_PATH = os.path.join(EVALS_PATH, ".cache", "results.sqlite")
+
+
+def _hash(payload: Any) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def question_hash(question: EvaluationQuestion) -> str:
+    """Key of the agent's answer to `question`: its text only, as the reference answer and category don't change it."""
+    return _hash(question.question)
+
+
+def config_hash(config: Dict[str, Any]) -> str:
+    return _hash(config)
+
+
+def source_hash(directory: str, files: Optional[List[str]] = None) -> str:
+    """
+    Hash of the Python files under `directory` (only `files`, paths relative to it, if given), so that code
+    and prompt changes count as a new config.
+    """
+    if files is None:
+        files = []
+        for root, dirs, names in os.walk(directory):
+            dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+            files.extend(os.path.relpath(os.path.join(root, name), directory) for name in names if name.endswith(".py"))
+    digest = hashlib.sha256()
+    for name in sorted(files):
+        digest.update(name.encode("utf-8"))
+        with open(os.path.join(directory, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class EvaluationResult(BaseModel):
+    question_hash: str
+    config_hash: str
+    question: str
+    answer: str
+    category: str
+    response: str
+    latency: float
+    score: Optional[bool] = None
+    created_at: float = Field(default_factory=time.time)
+
+
+class ResultStore:
+    """
+    Evaluation results in SQLite, one per (question hash, agent config hash). A result is stored as soon as
+    the question is answered, with no score until it is graded.
+    """
+
+    def __init__(self, path: str = DEFAULT_RESULTS_PATH) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results "
+            "(question_hash TEXT, config_hash TEXT, payload TEXT, PRIMARY KEY (question_hash, config_hash))"
+        )
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    def get(self, question_key: str, config_key: str) -> Optional[EvaluationResult]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT payload FROM results WHERE question_hash = ? AND config_hash = ?",
+                (question_key, config_key),
+            ).fetchone()
+        return None if row is None else EvaluationResult.model_validate_json(row[0])
+
+    def put_many(self, results: Iterable[EvaluationResult]) -> None:
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO results (question_hash, config_hash, payload) VALUES (?, ?, ?)",
+                [(r.question_hash, r.config_hash, r.model_dump_json()) for r in results],
+            )
+            self._db.commit()
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def summarize_results(results: List[EvaluationResult]) -> Dict[str, Dict[str, float]]:
+    """Count, accuracy and latency percentiles per category, plus an "all" row over every result."""
+    groups: Dict[str, List[EvaluationResult]] = {"all": list(results)}
+    for result in results:
+        groups.setdefault(result.category, []).append(result)
+    summary = {}
+    for category, group in groups.items():
+        scores = [result.score for result in group if result.score is not None]
+        latencies = [result.latency for result in group]
+        summary[category] = {
+            "count": len(group),
+            "accuracy": sum(scores) / len(scores) if scores else 0.0,
+            "latency_p50": _percentile(latencies, 0.5),
+            "latency_p95": _percentile(latencies, 0.95),
+        }
+    return summary
@@ -1,3 +1,17 @@
-from .main import RAGAgent
+from typing import TYPE_CHECKING, Any
 
-__all__ = ["RAGAgent"]
+from .lazy import LazyAgent
+
+if TYPE_CHECKING:
+    from .main import RAGAgent
+
+__all__ = ["RAGAgent", "LazyAgent"]
+
+
+def __getattr__(name: str) -> Any:
+    # src.main pulls in langchain and langgraph, so it is imported on first access to RAGAgent
+    if name == "RAGAgent":
+        from .main import RAGAgent
+
+        return RAGAgent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,82 @@
+import argparse
+import os
+import shutil
+import time
+from typing import Any, List, Optional
+
+from .ingestion import IndexArtifact, embedding_model_name
+
+DEFAULT_ARXIV_LINKS = [
+    "https://arxiv.org/pdf/2305.10343.pdf",  # Quantum computing paper
+    "https://arxiv.org/pdf/2303.04137.pdf",  # LLM research paper
+]
+
+
+def build_index(
+    output: str,
+    links: List[str],
+    pdf_cache_dir: Optional[str] = None,
+    embeddings: Optional[Any] = None,
+    vector_backend: str = "chroma",
+    vector_dtype: str = "float32",
+) -> IndexArtifact:
+    """
+    Ingest `links` into a new, self-contained index directory at `output` and write its artifact manifest.
+
+    The index is built next to `output` and swapped in once complete, so `output` never holds a partial index.
+    """
+    # Imported here so that importing this module (e.g. for DEFAULT_ARXIV_LINKS) stays cheap
+    from .main import ArXivProcessor
+
+    staging = f"{output.rstrip(os.sep)}.building"
+    shutil.rmtree(staging, ignore_errors=True)
+    processor = ArXivProcessor(
+        embeddings=embeddings,
+        persist_directory=staging,
+        pdf_cache_dir=pdf_cache_dir,
+        vector_backend=vector_backend,
+        vector_dtype=vector_dtype,
+    )
+    processor.load_and_process(links, pipelined=True)
+    artifact = IndexArtifact(
+        created_at=time.time(),
+        sources=list(links),
+        splitter=processor.splitter_config,
+        embedding_model=embedding_model_name(processor.embeddings),
+        corpus_version=processor.corpus_version,
+        chunks=sum(len(record.chunk_ids) for record in processor.manifest.sources.values()),
+        vector_backend=vector_backend,
+    )
+    artifact.save(staging)
+    shutil.rmtree(output, ignore_errors=True)
+    os.replace(staging, output)
+    return artifact
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build a prebuilt index artifact that RAGAgent can serve from")
+    parser.add_argument("--output", default="./arxiv_index", help="Directory of the index artifact")
+    parser.add_argument(
+        "--link", action="append", dest="links", help="PDF to index (repeatable; defaults to the app's papers)"
+    )
+    parser.add_argument("--pdf-cache-dir", help="Reuse downloaded PDFs from this directory")
+    parser.add_argument("--vector-backend", choices=["chroma", "flat"], default="chroma", help="Vector store to build")
+    parser.add_argument(
+        "--vector-dtype", choices=["float32", "float16", "int8"], default="float32", help="Storage of flat vectors"
+    )
+    args = parser.parse_args(argv)
+    artifact = build_index(
+        args.output,
+        args.links or DEFAULT_ARXIV_LINKS,
+        pdf_cache_dir=args.pdf_cache_dir,
+        vector_backend=args.vector_backend,
+        vector_dtype=args.vector_dtype,
+    )
+    print(
+        f"Built index {artifact.corpus_version[:12]} at {args.output}: {artifact.chunks} chunks of "
+        f"{len(artifact.sources)} PDFs, embedded with {artifact.embedding_model}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class TTLCache:
+    """
+    LRU cache of JSON-serializable values that expire `ttl_seconds` after being stored.
+
+    Holds at most `maxsize` entries in memory. With `db_path` set, entries are also written to SQLite
+    (bounded to the same size), so the cache survives restarts and memory misses fall through to disk.
+    """
+
+    def __init__(self, maxsize: int = 512, ttl_seconds: float = 3600.0, db_path: Optional[str] = None) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT, expires_at REAL, stored_at REAL)"
+            )
+            self._db.commit()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            now = time.time()
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                entry = self._load(key, now)
+                if entry is not None:
+                    self._remember(key, entry)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            now = time.time()
+            entry = (value, now + self.ttl_seconds)
+            self._remember(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, expires_at, stored_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), entry[1], now),
+                )
+                self._db.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+                self._db.execute(
+                    "DELETE FROM cache WHERE key NOT IN (SELECT key FROM cache ORDER BY stored_at DESC LIMIT ?)",
+                    (self.maxsize,),
+                )
+                self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM cache")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "size": len(self._entries),
+            }
+
+    def _remember(self, key: str, entry: Tuple[Any, float]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def _load(self, key: str, now: float) -> Optional[Tuple[Any, float]]:
+        if self._db is None:
+            return None
+        row = self._db.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] <= now:
+            return None
+        return json.loads(row[0]), row[1]
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a query, ignoring trailing punctuation."""
+    return " ".join(query.lower().split()).rstrip("?!. ")
+
+
+def web_search_key(query: str, params: Dict[str, Any]) -> str:
+    """Cache key of a web search: the normalized query plus every search parameter."""
+    payload = json.dumps({"query": normalize_query(query), **params}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def semantic_context_key(history: str, corpus_version: str) -> str:
+    """What a cached answer depends on besides the question: the history window and the indexed corpus."""
+    return hashlib.sha256(f"{corpus_version}\0{history}".encode("utf-8")).hexdigest()
+
+
+class SemanticCache:
+    """
+    LRU cache of answers looked up by question embedding.
+
+    A lookup hits when an entry with the same context key (see `semantic_context_key`) has a question
+    embedding with cosine similarity of at least `threshold`, so rephrasings of a question share an answer
+    while a new history window or corpus version never sees answers made for another one. Entries expire
+    `ttl_seconds` after being stored, since answers may include time-sensitive web results.
+    """
+
+    def __init__(self, threshold: float = 0.95, maxsize: int = 256, ttl_seconds: Optional[float] = 3600.0) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[int, Tuple[str, np.ndarray, Any, float]]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, embedding: Sequence[float], context_key: str) -> Optional[Tuple[Any, float]]:
+        """The value cached for the most similar question and its similarity, or None."""
+        query = _unit(embedding)
+        with self._lock:
+            now = time.time()
+            for i in [i for i, entry in self._entries.items() if entry[3] <= now]:
+                del self._entries[i]
+            candidates = [(i, vector) for i, (key, vector, _, _) in self._entries.items() if key == context_key]
+            best, similarity = None, -1.0
+            if candidates:
+                sims = np.stack([vector for _, vector in candidates]) @ query
+                index = int(np.argmax(sims))
+                best, similarity = candidates[index][0], float(sims[index])
+            if best is None or similarity < self.threshold:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(best)
+            self._hits += 1
+            return self._entries[best][2], similarity
+
+    def set(self, embedding: Sequence[float], context_key: str, value: Any) -> None:
+        with self._lock:
+            expires_at = time.time() + self.ttl_seconds if self.ttl_seconds is not None else float("inf")
+            self._entries[self._next_id] = (context_key, _unit(embedding), value, expires_at)
+            self._next_id += 1
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "size": len(self._entries),
+            }
+
+
+def _unit(embedding: Sequence[float]) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    return vector / (np.linalg.norm(vector) or 1.0)
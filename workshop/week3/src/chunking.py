@@ -0,0 +1,107 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+DEFAULT_SPLITTER_CONFIG: Dict[str, Any] = {
+    "chunk_size": 1000,
+    "chunk_overlap": 200,
+    "separators": ["\n\n", "\n", "(?<=\\. )", " ", ""],
+}
+
+# Markdown headers tracked as chunk metadata, longest first as MarkdownHeaderTextSplitter matches them
+HEADERS = [("###", "Subsubsection"), ("##", "Subsection"), ("#", "Section")]
+
+
+def _normalize_line(line: str) -> str:
+    """A line as MarkdownHeaderTextSplitter reads it: stripped, without non-printable characters."""
+    line = line.strip()
+    return line if line.isprintable() else "".join(filter(str.isprintable, line))
+
+
+def _header(line: str) -> Optional[Tuple[int, str, str]]:
+    """(level, metadata key, text) if `line` is a tracked markdown header."""
+    if not line.startswith("#"):
+        return None
+    for sep, name in HEADERS:
+        if line.startswith(sep) and (len(line) == len(sep) or line[len(sep)] == " "):
+            return sep.count("#"), name, line[len(sep) :].strip()
+    return None
+
+
+class PageChunker:
+    """
+    Splits PDF pages into chunks tagged with their source and page, one page at a time.
+
+    Chunks are the same, text and metadata, as those of the former two-stage splitting: MarkdownHeaderTextSplitter
+    over "# <source>\\n## Page <n>\\n<page text>", then RecursiveCharacterTextSplitter over each resulting
+    Document. The page lines are normalized as the header splitter does it (stripped, blank lines joining
+    paragraphs with "  \\n", markdown headers in the text starting new sections) and each section goes straight
+    to the text splitter, without the synthetic markdown text, intermediate Documents or metadata deep copies.
+    """
+
+    def __init__(self, splitter_config: Dict[str, Any]) -> None:
+        self.splitter_config = splitter_config
+        self.text_splitter = RecursiveCharacterTextSplitter(**splitter_config)
+
+    def split_pages(self, pages: List[Document]) -> List[Document]:
+        chunks: List[Document] = []
+        for page in pages:
+            chunks.extend(self.split_page(page.page_content, page.metadata["source"], page.metadata["page"]))
+        return chunks
+
+    def split_page(self, text: str, source: str, page: Any) -> List[Document]:
+        chunks = []
+        for metadata, section in self._sections(text, source, page):
+            for chunk in self.text_splitter.split_text(section):
+                chunks.append(Document(page_content=chunk, metadata={**metadata, "source": source, "page": page}))
+        return chunks
+
+    @staticmethod
+    def _sections(text: str, source: str, page: Any) -> List[Tuple[Dict[str, str], str]]:
+        """
+        Runs of the page with the same header metadata, as MarkdownHeaderTextSplitter (with its default
+        settings) aggregates them: paragraphs joined by "  \\n", header lines left out, code blocks kept as is.
+        """
+        sections: List[Tuple[Dict[str, str], List[str]]] = []
+        headers: Dict[str, str] = {}
+        stack: List[Tuple[int, str]] = []
+        paragraph: List[str] = []
+
+        def flush() -> None:
+            if sections and sections[-1][0] == headers:
+                sections[-1][1].append("\n".join(paragraph))
+            else:
+                sections.append((dict(headers), ["\n".join(paragraph)]))
+            paragraph.clear()
+
+        fence = ""
+        for line in [f"# {source}", f"## Page {page}", *text.split("\n")]:
+            line = _normalize_line(line)
+            if not fence:
+                if line.startswith("```") and line.count("```") == 1:
+                    fence = "```"
+                elif line.startswith("~~~"):
+                    fence = "~~~"
+            elif line.startswith(fence):
+                fence = ""
+            if fence:
+                paragraph.append(line)
+                continue
+            header = _header(line)
+            if header is not None:
+                # Text before the header keeps the metadata it was written under
+                if paragraph:
+                    flush()
+                level, name, value = header
+                while stack and stack[-1][0] >= level:
+                    headers.pop(stack.pop()[1], None)
+                stack.append((level, name))
+                headers[name] = value
+            elif line:
+                paragraph.append(line)
+            elif paragraph:
+                flush()
+        if paragraph:
+            flush()
+        return [(metadata, "  \n".join(paragraphs)) for metadata, paragraphs in sections]
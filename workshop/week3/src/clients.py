@@ -0,0 +1,128 @@
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+from tavily import MissingAPIKeyError
+
+from .instrumentation import TokenUsageHandler, arecord_http_request, record_http_request
+
+
+class TavilySearchClient:
+    """
+    Tavily search over pooled, keep-alive HTTP connections.
+
+    The tavily SDK opens a new connection (and TLS handshake) for every request, so this issues the same
+    `/search` call through the registry's shared httpx clients instead.
+    """
+
+    base_url = "https://api.tavily.com"
+
+    def __init__(
+        self, http_client: httpx.Client, http_async_client: httpx.AsyncClient, api_key: Optional[str] = None
+    ) -> None:
+        self.api_key = api_key or os.getenv("TAVILY_API_KEY")
+        if not self.api_key:
+            raise MissingAPIKeyError()
+        self.http_client = http_client
+        self.http_async_client = http_async_client
+
+    def _request(self, query: str, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "url": f"{self.base_url}/search",
+            "json": {"query": query, **kwargs},
+            "headers": {"Authorization": f"Bearer {self.api_key}"},
+        }
+
+    def search(self, query: str, **kwargs: Any) -> Dict[str, Any]:
+        response = self.http_client.post(**self._request(query, kwargs))
+        response.raise_for_status()
+        return response.json()
+
+    async def asearch(self, query: str, **kwargs: Any) -> Dict[str, Any]:
+        response = await self.http_async_client.post(**self._request(query, kwargs))
+        response.raise_for_status()
+        return response.json()
+
+
+class ClientRegistry:
+    """
+    Long-lived LLM, embedding and search clients shared by every graph node.
+
+    Clients are built once on first use and reuse one pair of connection-pooled httpx clients (sync and
+    async), so requests keep their connections alive instead of paying connection setup every call.
+    Chat models report their token usage, and the HTTP clients their requests, to the active turn's
+    instrumentation.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 50,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 60.0,
+        timeout: float = 60.0,
+    ) -> None:
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http_client = httpx.Client(limits=limits, timeout=timeout, event_hooks={"request": [record_http_request]})
+        self.http_async_client = httpx.AsyncClient(
+            limits=limits, timeout=timeout, event_hooks={"request": [arecord_http_request]}
+        )
+        self.token_usage = TokenUsageHandler()
+        self._chat_models: Dict[Tuple[Any, ...], Any] = {}
+        self._embeddings: Optional[Any] = None
+        self._web_search: Optional[Any] = None
+        self._lock = threading.Lock()
+
+    def chat_model(self, model: str = "gpt-4o-mini", **kwargs: Any) -> Any:
+        """Return the shared chat model for this model name and settings."""
+        key = (model, *sorted(kwargs.items()))
+        with self._lock:
+            if key not in self._chat_models:
+                chat_model = self._build_chat_model(model, **kwargs)
+                chat_model.callbacks = [*(chat_model.callbacks or []), self.token_usage]
+                self._chat_models[key] = chat_model
+            return self._chat_models[key]
+
+    def embeddings(self) -> Any:
+        with self._lock:
+            if self._embeddings is None:
+                self._embeddings = self._build_embeddings()
+            return self._embeddings
+
+    def web_search(self) -> Any:
+        with self._lock:
+            if self._web_search is None:
+                self._web_search = self._build_web_search()
+            return self._web_search
+
+    def _build_chat_model(self, model: str, **kwargs: Any) -> Any:
+        # langchain_openai (and the openai SDK) take a while to import, so they are only imported once needed
+        from langchain_openai import ChatOpenAI
+
+        # stream_usage makes streamed responses report token usage too
+        return ChatOpenAI(
+            model=model,
+            http_client=self.http_client,
+            http_async_client=self.http_async_client,
+            stream_usage=True,
+            **kwargs,
+        )
+
+    def _build_embeddings(self) -> Any:
+        from langchain_openai import OpenAIEmbeddings
+
+        return OpenAIEmbeddings(http_client=self.http_client, http_async_client=self.http_async_client)
+
+    def _build_web_search(self) -> Any:
+        return TavilySearchClient(self.http_client, self.http_async_client)
+
+    def close(self) -> None:
+        self.http_client.close()
+
+    async def aclose(self) -> None:
+        self.http_client.close()
+        await self.http_async_client.aclose()
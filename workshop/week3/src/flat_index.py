@@ -0,0 +1,435 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+FLAT_INDEX_FILENAME = "flat_index.json"
+FLAT_VECTORS_FILENAME = "flat_vectors.bin"
+FLAT_TABLE_FILENAME = "flat_index.sqlite"
+FLAT_FORMAT_VERSION = 1
+
+# float16 halves the file but NumPy converts it back slowly; int8 is a quarter of float32 and nearly as fast
+DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+# Same distance functions (and so the same relevance scores) as Chroma's "hnsw:space" settings
+DISTANCES = ["l2", "cosine", "ip"]
+
+# SQLite limits the number of parameters of a statement
+_SQL_BATCH = 500
+
+
+class FlatIndex(VectorStore):
+    """
+    Vector store doing exact nearest neighbour search over a memory-mapped NumPy matrix of embeddings.
+
+    Embeddings are kept as float32, float16 or int8 (one scale per vector) rows of `flat_vectors.bin`, and
+    chunk ids, texts and metadata in a SQLite side table that is only read for the hits of a query. A query
+    scans the matrix block by block, so memory stays bounded and the OS pages in only what is used;
+    concurrent queries are answered together by one matrix product per block.
+
+    Distances are those of Chroma (squared L2 by default), so relevance scores and thresholds carry over.
+    Only the parts of Chroma's API the ArXiv processor uses are offered: `get`, `get_by_ids`, `add_documents`,
+    `delete` (by ids or a metadata equality filter) and the similarity searches.
+    """
+
+    def __init__(
+        self,
+        persist_directory: str,
+        embedding_function: Embeddings,
+        dtype: str = "float32",
+        distance: str = "l2",
+        block_size: int = 1024,
+        read_only: bool = False,
+    ) -> None:
+        if dtype not in DTYPES:
+            raise ValueError(f"Unknown dtype {dtype}, expected one of {list(DTYPES)}")
+        if distance not in DISTANCES:
+            raise ValueError(f"Unknown distance {distance}, expected one of {DISTANCES}")
+        self.persist_directory = persist_directory
+        self.embedding_function = embedding_function
+        self.block_size = block_size
+        self.read_only = read_only
+        self._lock = threading.RLock()
+        # Queries waiting for the next batch, and whether a batch is being searched (see _search_batched)
+        self._batch_condition = threading.Condition()
+        self._pending: List[Tuple[np.ndarray, int, Future]] = []
+        self._searching = False
+        header = self._load_header()
+        if header is not None and (header["dtype"], header["distance"]) != (dtype, distance):
+            raise ValueError(
+                f"The flat index at {persist_directory} stores {header['dtype']} vectors with {header['distance']} "
+                f"distance, not {dtype} with {distance}"
+            )
+        self.dtype = dtype
+        self.distance = distance
+        self.dimension: Optional[int] = header["dimension"] if header else None
+        if not read_only:
+            os.makedirs(persist_directory, exist_ok=True)
+        table = os.path.join(persist_directory, FLAT_TABLE_FILENAME)
+        self._db = (
+            sqlite3.connect(f"file:{table}?mode=ro", uri=True, check_same_thread=False)
+            if read_only
+            else sqlite3.connect(table, check_same_thread=False)
+        )
+        if not read_only:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS chunks "
+                "(row INTEGER PRIMARY KEY, id TEXT UNIQUE, document TEXT, metadata TEXT, scale REAL, norm REAL)"
+            )
+            self._db.commit()
+        # Per row of the vector file: chunk id, int8 scale, norm and whether it holds a chunk (see _load_rows)
+        self._vectors = np.empty((0, self.dimension or 0), dtype=DTYPES[dtype])
+        self._ids: List[Optional[str]] = []
+        self._scales = np.ones(0, dtype=np.float32)
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._rows: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._size = 0
+        self._load_rows()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding_function
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        """Embed and store `texts`; an id that is already stored is overwritten."""
+        texts = list(texts)
+        ids = list(ids) if ids is not None else [str(uuid.uuid4()) for _ in texts]
+        metadatas = metadatas or [{} for _ in texts]
+        if not texts:
+            return []
+        vectors = np.asarray(self.embedding_function.embed_documents(texts), dtype=np.float32)
+        self._write(ids, texts, metadatas, vectors)
+        return ids
+
+    def delete(
+        self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> Optional[bool]:
+        """Delete chunks by id or, like Chroma, every chunk whose metadata matches `where`."""
+        self._check_writable()
+        with self._lock:
+            rows = [self._rows[i] for i in ids or [] if i in self._rows]
+            if where is not None:
+                rows += [row for row, _ in self._select_where(where)]
+            for start in range(0, len(rows), _SQL_BATCH):
+                batch = rows[start : start + _SQL_BATCH]
+                self._db.execute(f"DELETE FROM chunks WHERE row IN ({','.join('?' * len(batch))})", batch)
+            self._db.commit()
+            for row in set(rows):
+                del self._rows[self._ids[row]]
+                self._ids[row] = None
+                self._alive[row] = False
+                self._free.append(row)
+        return True
+
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        include: Sequence[str] = ("documents", "metadatas"),
+    ) -> Dict[str, Any]:
+        """Stored chunks as Chroma returns them: a dict of parallel "ids", "documents", "metadatas", "embeddings"."""
+        with self._lock:
+            if ids is not None:
+                rows = [self._rows[i] for i in ids if i in self._rows]
+            elif where is not None:
+                rows = [row for row, _ in self._select_where(where)]
+            else:
+                rows = sorted(self._rows.values())
+            rows = rows[offset or 0 :]
+            rows = rows[:limit] if limit is not None else rows
+            result: Dict[str, Any] = {"ids": [self._ids[row] for row in rows]}
+            if "documents" in include or "metadatas" in include:
+                records = self._records(result["ids"])
+                if "documents" in include:
+                    result["documents"] = [records[i][0] for i in result["ids"]]
+                if "metadatas" in include:
+                    result["metadatas"] = [records[i][1] for i in result["ids"]]
+            if "embeddings" in include:
+                result["embeddings"] = list(self._dequantize(np.asarray(rows, dtype=np.int64)))
+        return result
+
+    def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
+        records = self._records(ids)
+        return [self._document(i, records[i]) for i in ids if i in records]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, **kwargs)]
+
+    def similarity_search_with_score(self, *args: Any, **kwargs: Any) -> List[Tuple[Document, float]]:
+        """The `k` nearest chunks to `query` and their distances, nearest first; called as `(query, k=4)`."""
+        query, k = self._query_and_k(*args, **kwargs)
+        return self.similarity_search_by_vector_with_score(self.embedding_function.embed_query(query), k=k)
+
+    async def asimilarity_search_with_score(self, *args: Any, **kwargs: Any) -> List[Tuple[Document, float]]:
+        query, k = self._query_and_k(*args, **kwargs)
+        embedding = await self.embedding_function.aembed_query(query)
+        # The search itself is NumPy work that releases the GIL, so it runs on a worker thread
+        return await asyncio.to_thread(self.similarity_search_by_vector_with_score, embedding, k)
+
+    @staticmethod
+    def _query_and_k(query: str, k: int = 4, **kwargs: Any) -> Tuple[str, int]:
+        """
+        Arguments of VectorStore's `*_with_score` searches, which it declares as `*args, **kwargs`. Other
+        keyword arguments (e.g. Chroma's `filter`) are accepted for compatibility and ignored.
+        """
+        return query, k
+
+    def similarity_search_by_vector_with_score(
+        self, embedding: Sequence[float], k: int = 4, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        hits = self._search_batched(np.asarray(embedding, dtype=np.float32), k)
+        records = self._records([chunk_id for chunk_id, _ in hits])
+        # Chunks deleted since the search are left out
+        return [(self._document(i, records[i]), distance) for i, distance in hits if i in records]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        if self.distance == "cosine":
+            return self._cosine_relevance_score_fn
+        if self.distance == "ip":
+            return self._max_inner_product_relevance_score_fn
+        return self._euclidean_relevance_score_fn
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+        persist_directory: str = "./flat_index",
+        **kwargs: Any,
+    ) -> FlatIndex:
+        store = cls(persist_directory=persist_directory, embedding_function=embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+    def _search_batched(self, query: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        """
+        Search for `query` together with the queries of other threads: whoever finds no batch running takes
+        every waiting query and searches them at once, the others wait for their result or their turn.
+        """
+        request: Tuple[np.ndarray, int, Future] = (query, k, Future())
+        with self._batch_condition:
+            self._pending.append(request)
+            while self._searching and not request[2].done():
+                self._batch_condition.wait()
+            if request[2].done():
+                return request[2].result()
+            self._searching = True
+            batch, self._pending = self._pending, []
+        try:
+            results = self._search(np.stack([q for q, _, _ in batch]), max(k for _, k, _ in batch))
+            for (_, k_, future), hits in zip(batch, results):
+                future.set_result(hits[:k_])
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+        finally:
+            with self._batch_condition:
+                self._searching = False
+                self._batch_condition.notify_all()
+        return request[2].result()
+
+    def _search(self, queries: np.ndarray, k: int) -> List[List[Tuple[str, float]]]:
+        """Exact top `k` (chunk id, distance) pairs of each query (row of `queries`), nearest first."""
+        with self._lock:
+            if not self._rows or k < 1:
+                return [[] for _ in queries]
+            if queries.shape[1] != self.dimension:
+                raise ValueError(f"Query has {queries.shape[1]} dimensions, the index {self.dimension}")
+            query_norms = np.linalg.norm(queries, axis=1)
+            best_distances = np.empty((len(queries), 0), dtype=np.float32)
+            best_rows = np.empty((len(queries), 0), dtype=np.int64)
+            for start in range(0, self._size, self.block_size):
+                end = min(start + self.block_size, self._size)
+                # Quantized blocks are converted to float32 one at a time, small enough to stay in cache
+                dots = queries @ np.asarray(self._vectors[start:end], dtype=np.float32).T
+                dots *= self._scales[start:end]
+                distances = self._distances(dots, query_norms, self._norms[start:end])
+                distances[:, ~self._alive[start:end]] = np.inf
+                best_distances = np.concatenate([best_distances, distances], axis=1)
+                best_rows = np.concatenate([best_rows, np.broadcast_to(np.arange(start, end), distances.shape)], axis=1)
+                if best_distances.shape[1] > k:
+                    keep = np.argpartition(best_distances, k - 1, axis=1)[:, :k]
+                    best_distances = np.take_along_axis(best_distances, keep, axis=1)
+                    best_rows = np.take_along_axis(best_rows, keep, axis=1)
+            order = np.argsort(best_distances, axis=1)
+            return [
+                [
+                    (self._ids[row], float(distance))
+                    for row, distance in zip(best_rows[i, order[i]], best_distances[i, order[i]])
+                    if np.isfinite(distance)
+                ]
+                for i in range(len(queries))
+            ]
+
+    def _distances(self, dots: np.ndarray, query_norms: np.ndarray, norms: np.ndarray) -> np.ndarray:
+        if self.distance == "l2":
+            # Squared L2, as Chroma reports it
+            return np.maximum(query_norms[:, None] ** 2 + norms**2 - 2 * dots, 0.0)
+        if self.distance == "cosine":
+            return 1.0 - dots / np.maximum(query_norms[:, None] * norms, 1e-12)
+        return 1.0 - dots
+
+    def _write(self, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]], vectors: np.ndarray) -> None:
+        self._check_writable()
+        with self._lock:
+            if self.dimension is None:
+                self.dimension = vectors.shape[1]
+                self._save_header()
+            if vectors.shape[1] != self.dimension:
+                raise ValueError(f"Embeddings have {vectors.shape[1]} dimensions, the index {self.dimension}")
+            quantized, scales = self._quantize(vectors)
+            norms = np.linalg.norm(quantized.astype(np.float32) * scales[:, None], axis=1)
+            rows = []
+            for chunk_id in ids:
+                if chunk_id in self._rows:
+                    rows.append(self._rows[chunk_id])
+                elif self._free:
+                    rows.append(self._free.pop())
+                else:
+                    rows.append(self._size)
+                    self._size += 1
+            self._reserve(self._size)
+            # Vectors are flushed before their rows are committed, so the table never points at unwritten data
+            self._vectors[rows] = quantized
+            self._vectors.flush()
+            self._db.executemany(
+                "INSERT OR REPLACE INTO chunks (row, id, document, metadata, scale, norm) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (row, chunk_id, text, json.dumps(metadata), float(scale), float(norm))
+                    for row, chunk_id, text, metadata, scale, norm in zip(rows, ids, texts, metadatas, scales, norms)
+                ],
+            )
+            self._db.commit()
+            for row, chunk_id, scale, norm in zip(rows, ids, scales, norms):
+                self._rows[chunk_id] = row
+                self._ids[row] = chunk_id
+                self._scales[row] = scale
+                self._norms[row] = norm
+                self._alive[row] = True
+
+    def _quantize(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Vectors in the stored dtype and the per-vector scale that restores them (1 unless int8)."""
+        if self.dtype != "int8":
+            return vectors.astype(DTYPES[self.dtype]), np.ones(len(vectors), dtype=np.float32)
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        return np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8), scales.astype(np.float32)
+
+    def _dequantize(self, rows: np.ndarray) -> np.ndarray:
+        if not len(rows):
+            return np.empty((0, self.dimension or 0), dtype=np.float32)
+        return np.asarray(self._vectors[rows], dtype=np.float32) * self._scales[rows, None]
+
+    def _reserve(self, size: int) -> None:
+        """Grow the vector file (doubling) and the row arrays to hold at least `size` rows."""
+        capacity = len(self._alive)
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity, 1024)
+        path = os.path.join(self.persist_directory, FLAT_VECTORS_FILENAME)
+        with open(path, "ab") as f:
+            f.truncate(capacity * self.dimension * np.dtype(DTYPES[self.dtype]).itemsize)
+        self._vectors = np.memmap(path, dtype=DTYPES[self.dtype], mode="r+", shape=(capacity, self.dimension))
+        self._scales = np.resize(self._scales, capacity)
+        self._norms = np.resize(self._norms, capacity)
+        self._alive = np.concatenate([self._alive, np.zeros(capacity - len(self._alive), dtype=bool)])
+        self._ids.extend([None] * (capacity - len(self._ids)))
+
+    def _load_rows(self) -> None:
+        """Open the vector file and read the row of every stored chunk (not its text) from the side table."""
+        table = self._db.execute("SELECT row, id, scale, norm FROM chunks ORDER BY row").fetchall()
+        path = os.path.join(self.persist_directory, FLAT_VECTORS_FILENAME)
+        capacity = 0
+        if self.dimension is not None and os.path.exists(path):
+            capacity = os.path.getsize(path) // (self.dimension * np.dtype(DTYPES[self.dtype]).itemsize)
+        if capacity:
+            mode = "r" if self.read_only else "r+"
+            self._vectors = np.memmap(path, dtype=DTYPES[self.dtype], mode=mode, shape=(capacity, self.dimension))
+        self._scales = np.ones(capacity, dtype=np.float32)
+        self._norms = np.zeros(capacity, dtype=np.float32)
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._ids = [None] * capacity
+        for row, chunk_id, scale, norm in table:
+            self._rows[chunk_id] = row
+            self._ids[row] = chunk_id
+            self._scales[row] = scale
+            self._norms[row] = norm
+            self._alive[row] = True
+        self._size = table[-1][0] + 1 if table else 0
+        # Rows of deleted chunks are reused by the next chunks added
+        self._free = [row for row in range(self._size - 1, -1, -1) if not self._alive[row]]
+
+    def _records(self, ids: Sequence[str]) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+        """Text and metadata of the chunks among `ids` that are stored."""
+        records = {}
+        with self._lock:
+            for start in range(0, len(ids), _SQL_BATCH):
+                batch = list(ids[start : start + _SQL_BATCH])
+                for chunk_id, text, metadata in self._db.execute(
+                    f"SELECT id, document, metadata FROM chunks WHERE id IN ({','.join('?' * len(batch))})", batch
+                ):
+                    records[chunk_id] = (text, json.loads(metadata))
+        return records
+
+    def _select_where(self, where: Dict[str, Any]) -> List[Tuple[int, str]]:
+        """(row, id) of chunks whose metadata has every key of `where` with the same value."""
+        if any(key.startswith("$") for key in where):
+            raise ValueError("Only metadata equality filters are supported, e.g. {'generation': 2}")
+        clauses = " AND ".join("json_extract(metadata, ?) = ?" for _ in where)
+        params = [param for key, value in where.items() for param in (f'$."{key}"', value)]
+        return self._db.execute(f"SELECT row, id FROM chunks WHERE {clauses} ORDER BY row", params).fetchall()
+
+    @staticmethod
+    def _document(chunk_id: str, record: Tuple[str, Dict[str, Any]]) -> Document:
+        return Document(id=chunk_id, page_content=record[0], metadata=record[1])
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise ValueError(f"The flat index at {self.persist_directory} was opened read-only")
+
+    def _load_header(self) -> Optional[Dict[str, Any]]:
+        path = os.path.join(self.persist_directory, FLAT_INDEX_FILENAME)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            header = json.load(f)
+        if header.get("format_version") != FLAT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported flat index format {header.get('format_version')} at {path}")
+        return header
+
+    def _save_header(self) -> None:
+        path = os.path.join(self.persist_directory, FLAT_INDEX_FILENAME)
+        header = {
+            "format_version": FLAT_FORMAT_VERSION,
+            "dimension": self.dimension,
+            "dtype": self.dtype,
+            "distance": self.distance,
+        }
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(header, f, indent=2)
+        os.replace(f"{path}.tmp", path)
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+from langchain_core.documents import Document
+from pydantic import BaseModel, Field, PrivateAttr
+
+MANIFEST_FILENAME = "ingest_manifest.json"
+INDEX_ARTIFACT_FILENAME = "index_artifact.json"
+INDEX_FORMAT_VERSION = 1
+
+
+def embedding_model_name(embeddings: Any) -> str:
+    """Name of the model behind `embeddings`; vectors of different models can't share an index."""
+    return getattr(embeddings, "model", None) or type(embeddings).__name__
+
+
+def _sha256(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def content_hash(texts: Iterable[str]) -> str:
+    """Hash of a source's page texts, used to detect that a paper changed."""
+    return _sha256(*texts)
+
+
+def chunk_ids(chunks: List[Document]) -> List[str]:
+    """
+    Content-derived ids of chunks: identical chunks of the same source and page get the same id across
+    runs, so they can be recognized and skipped instead of embedded again.
+    """
+    seen: Counter = Counter()
+    ids = []
+    for chunk in chunks:
+        base = _sha256(str(chunk.metadata.get("source")), str(chunk.metadata.get("page")), chunk.page_content)
+        # Repeated text on the same page (e.g. headers) still needs distinct ids
+        ids.append(base if not seen[base] else f"{base}-{seen[base]}")
+        seen[base] += 1
+    return ids
+
+
+class SourceRecord(BaseModel):
+    content_hash: Optional[str] = None
+    chunk_ids: List[str] = Field(default_factory=list)
+
+
+class IngestionManifest(BaseModel):
+    """What is indexed in a vector store: the chunk ids of every source and the splitter that made them."""
+
+    splitter: Dict[str, Any] = Field(default_factory=dict)
+    sources: Dict[str, SourceRecord] = Field(default_factory=dict)
+    # Latest published generation of papers added at runtime; their chunks carry it in their metadata
+    generation: int = 0
+    # Vector store the chunks are embedded in (see ArXivProcessor's vector_backend)
+    vector_backend: str = "chroma"
+    _corpus_version: Optional[str] = PrivateAttr(default=None)
+
+    @classmethod
+    def load(cls, directory: str) -> Optional[IngestionManifest]:
+        path = os.path.join(directory, MANIFEST_FILENAME)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.model_validate(json.load(f))
+
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, MANIFEST_FILENAME)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(self.model_dump(), f, indent=2)
+        os.replace(f"{path}.tmp", path)
+        self._corpus_version = self._hash_corpus()
+
+    @property
+    def corpus_version(self) -> str:
+        """
+        Hash identifying the indexed content; changes whenever any chunk is added or removed. It is read on
+        every turn (semantic cache keys), so it is computed once and then only again by `save`, which every
+        ingestion and generation publish ends with.
+        """
+        if self._corpus_version is None:
+            self._corpus_version = self._hash_corpus()
+        return self._corpus_version
+
+    def _hash_corpus(self) -> str:
+        return _sha256(
+            json.dumps(self.splitter, sort_keys=True),
+            *(f"{source}:{','.join(sorted(r.chunk_ids))}" for source, r in sorted(self.sources.items())),
+        )
+
+
+class IndexArtifact(BaseModel):
+    """
+    Manifest of a prebuilt, self-contained index directory (vector store, ingestion manifest and BM25 index).
+
+    It records what the index was built from, so that an agent only serves from it when its papers, splitter
+    settings and embedding model are the same.
+    """
+
+    format_version: int = INDEX_FORMAT_VERSION
+    created_at: float
+    sources: List[str]
+    splitter: Dict[str, Any]
+    embedding_model: str
+    corpus_version: str
+    chunks: int
+    vector_backend: str = "chroma"
+
+    @classmethod
+    def load(cls, directory: str) -> Optional[IndexArtifact]:
+        path = os.path.join(directory, INDEX_ARTIFACT_FILENAME)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.model_validate(json.load(f))
+
+    def save(self, directory: str) -> None:
+        path = os.path.join(directory, INDEX_ARTIFACT_FILENAME)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(self.model_dump(), f, indent=2)
+        os.replace(f"{path}.tmp", path)
+
+    def mismatches(
+        self, sources: List[str], splitter: Dict[str, Any], embedding_model: str, vector_backend: str = "chroma"
+    ) -> List[str]:
+        """Why this index can't serve an agent configured with these settings (empty if it can)."""
+        problems = []
+        if self.format_version != INDEX_FORMAT_VERSION:
+            problems.append(f"format version {self.format_version}, expected {INDEX_FORMAT_VERSION}")
+        if sorted(self.sources) != sorted(sources):
+            missing = sorted(set(sources) - set(self.sources))
+            extra = sorted(set(self.sources) - set(sources))
+            problems.append(f"sources differ (missing {missing}, not configured {extra})")
+        # Through JSON, so that tuples and lists compare equal
+        if json.loads(json.dumps(self.splitter)) != json.loads(json.dumps(splitter)):
+            problems.append(f"splitter {self.splitter}, expected {splitter}")
+        if self.embedding_model != embedding_model:
+            problems.append(f"embedding model {self.embedding_model}, expected {embedding_model}")
+        if self.vector_backend != vector_backend:
+            problems.append(f"vector backend {self.vector_backend}, expected {vector_backend}")
+        return problems
@@ -0,0 +1,392 @@
+import contextvars
+import inspect
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Protocol, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from pyboxen import boxen
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+# USD per million (input, output) tokens
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+}
+
+_quiet = os.getenv("RAG_QUIET", "").lower() in ["1", "true", "yes"]
+# Set by `quiet_reports` for the code running in a context (an agent's turns); None follows `_quiet`
+_quiet_context: contextvars.ContextVar[Optional[bool]] = contextvars.ContextVar("rag_quiet", default=None)
+
+
+def set_quiet(quiet: bool = True) -> None:
+    """Log status messages of the whole process instead of rendering them as boxes (also enabled by RAG_QUIET=1)."""
+    global _quiet
+    _quiet = quiet
+
+
+@contextmanager
+def quiet_reports(quiet: Optional[bool] = True) -> Iterator[None]:
+    """Log (or with False, render) the status messages of the code run inside, whatever the process setting."""
+    token = _quiet_context.set(quiet)
+    try:
+        yield
+    finally:
+        _quiet_context.reset(token)
+
+
+def report(message: str, **box: Any) -> None:
+    """Show a status message as a pyboxen box, or as a log record in quiet mode."""
+    quiet = _quiet_context.get()
+    if _quiet if quiet is None else quiet:
+        logger.info("%s %s", box.get("title") or "", message)
+    else:
+        print(boxen(message, **box))
+
+
+class SpanRecord(BaseModel):
+    name: str
+    kind: str
+    seconds: float
+    retries: int = 0
+    error: Optional[str] = None
+
+
+class TurnRecord(BaseModel):
+    """Everything measured while answering one question."""
+
+    turn_id: str = Field(default_factory=lambda: uuid.uuid4().hex)
+    session_id: str = "default"
+    started_at: float = Field(default_factory=time.time)
+    seconds: float = 0.0
+    spans: List[SpanRecord] = Field(default_factory=list)
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+    retries: int = 0
+    cache_hits: Dict[str, int] = Field(default_factory=dict)
+    cache_misses: Dict[str, int] = Field(default_factory=dict)
+
+
+class RollingHistogram:
+    """Quantiles over the last `window` observations, plus all-time count and sum."""
+
+    def __init__(self, window: int = 1024) -> None:
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.samples.append(value)
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+class Exporter(Protocol):
+    def export(self, turn: TurnRecord, instrumentation: "Instrumentation") -> None: ...
+
+
+class JSONLinesExporter:
+    """Appends one JSON record per turn to `path`."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def export(self, turn: TurnRecord, instrumentation: "Instrumentation") -> None:
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(turn.model_dump_json() + "\n")
+
+
+class PrometheusExporter:
+    """Rewrites `path` with all metrics in Prometheus text format after every turn (textfile collector)."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def export(self, turn: TurnRecord, instrumentation: "Instrumentation") -> None:
+        with tempfile.NamedTemporaryFile("w", dir=os.path.dirname(self.path) or ".", suffix=".tmp", delete=False) as f:
+            f.write(instrumentation.prometheus_text())
+        os.replace(f.name, self.path)
+
+
+MetricKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class Instrumentation:
+    """
+    Rolling latency histograms, counters and gauges of the RAG graph, fed by the turn, span and cache helpers
+    below.
+
+    `turn` scopes one answered question; spans, token usage, retries and cache lookups made while it is
+    active (in any thread or task started from it) are added to its `TurnRecord`, which is handed to every
+    exporter when the turn ends. Exporters write files, so they run on a background thread, in turn order,
+    rather than on the thread (or event loop) that answered; `flush` waits for them.
+    """
+
+    def __init__(self, window: int = 1024, exporters: Optional[List[Exporter]] = None) -> None:
+        self.window = window
+        self.exporters = list(exporters or [])
+        self._histograms: Dict[MetricKey, RollingHistogram] = {}
+        self._counters: Dict[MetricKey, float] = {}
+        self._gauges: Dict[MetricKey, float] = {}
+        self._lock = threading.Lock()
+        self._export_executor: Optional[ThreadPoolExecutor] = None
+        self._last_export: Optional[Future] = None
+
+    @contextmanager
+    def turn(self, session_id: str = "default") -> Iterator[TurnRecord]:
+        record = TurnRecord(session_id=session_id)
+        token = _active.set((self, record))
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.seconds = time.perf_counter() - started
+            try:
+                _active.reset(token)
+            except ValueError:
+                # Async generators may be resumed in another context; the turn is over either way
+                pass
+            self.observe("rag_turn_seconds", record.seconds)
+            if self.exporters:
+                with self._lock:
+                    if self._export_executor is None:
+                        self._export_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="metrics-export")
+                    self._last_export = self._export_executor.submit(self._export, record)
+
+    def reset(self) -> None:
+        """Forget every metric recorded so far (exporters are kept), e.g. between benchmark phases."""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Wait until the turns ended so far are exported."""
+        with self._lock:
+            last = self._last_export
+        if last is not None:
+            last.result(timeout)
+
+    def _export(self, record: TurnRecord) -> None:
+        for exporter in self.exporters:
+            try:
+                exporter.export(record, self)
+            except Exception as e:
+                logger.warning("Metrics export failed: %s", e)
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = RollingHistogram(self.window)
+            self._histograms[key].observe(value)
+
+    def increment(self, name: str, amount: float = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set_gauge(self, name: str, value: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "histograms": {_key_name(key): h.summary() for key, h in self._histograms.items()},
+                "counters": {_key_name(key): value for key, value in self._counters.items()},
+                "gauges": {_key_name(key): value for key, value in self._gauges.items()},
+            }
+
+    def prometheus_text(self) -> str:
+        lines: List[str] = []
+        typed = set()
+        with self._lock:
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} summary")
+                    typed.add(name)
+                for q in [0.5, 0.95, 0.99]:
+                    lines.append(f"{name}{_labels(labels + (('quantile', str(q)),))} {histogram.quantile(q)}")
+                lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+            for kind, values in [("counter", self._counters), ("gauge", self._gauges)]:
+                for (name, labels), value in sorted(values.items()):
+                    if name not in typed:
+                        lines.append(f"# TYPE {name} {kind}")
+                        typed.add(name)
+                    lines.append(f"{name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels) + "}"
+
+
+def _key_name(key: MetricKey) -> str:
+    name, labels = key
+    return name + _labels(labels)
+
+
+class _Span:
+    def __init__(self) -> None:
+        self.requests = 0
+
+
+_active: contextvars.ContextVar[Optional[Tuple[Instrumentation, TurnRecord]]] = contextvars.ContextVar(
+    "rag_turn", default=None
+)
+_span: contextvars.ContextVar[Optional[_Span]] = contextvars.ContextVar("rag_span", default=None)
+
+
+@contextmanager
+def span(name: str, kind: str = "call") -> Iterator[None]:
+    """Time an external call (or, with kind="node", a graph node) of the active turn."""
+    active = _active.get()
+    current = _Span()
+    token = _span.set(current)
+    started = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        _span.reset(token)
+        if active is not None:
+            instrumentation, record = active
+            # Every HTTP request after the first one of a call is a retry by the client
+            retries = max(0, current.requests - 1) if kind == "call" else 0
+            record.spans.append(SpanRecord(name=name, kind=kind, seconds=seconds, retries=retries, error=error))
+            record.retries += retries
+            instrumentation.observe(f"rag_{kind}_seconds", seconds, **{kind: name})
+            if retries:
+                instrumentation.increment("rag_retries_total", retries, call=name)
+            if error:
+                instrumentation.increment("rag_errors_total", **{kind: name})
+
+
+def timed_node(name: str, fn: Callable) -> Callable:
+    """Wrap a (sync or async) graph node so that each run is recorded as a node span."""
+    if inspect.iscoroutinefunction(fn):
+
+        @wraps(fn)
+        async def anode(state: Any) -> Any:
+            with span(name, kind="node"):
+                return await fn(state)
+
+        return anode
+
+    @wraps(fn)
+    def node(state: Any) -> Any:
+        with span(name, kind="node"):
+            return fn(state)
+
+    return node
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    active = _active.get()
+    if active is None:
+        return
+    instrumentation, record = active
+    counts = record.cache_hits if hit else record.cache_misses
+    counts[cache] = counts.get(cache, 0) + 1
+    instrumentation.increment("rag_cache_lookups_total", cache=cache, result="hit" if hit else "miss")
+
+
+def record_tokens(model: str, prompt_tokens: int, completion_tokens: int) -> None:
+    active = _active.get()
+    if active is None:
+        return
+    instrumentation, record = active
+    input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    cost = (prompt_tokens * input_price + completion_tokens * output_price) / 1e6
+    record.prompt_tokens += prompt_tokens
+    record.completion_tokens += completion_tokens
+    record.cost_usd += cost
+    instrumentation.increment("rag_tokens_total", prompt_tokens, model=model, kind="prompt")
+    instrumentation.increment("rag_tokens_total", completion_tokens, model=model, kind="completion")
+    instrumentation.increment("rag_cost_usd_total", cost, model=model)
+
+
+def record_http_request(request: Any) -> None:
+    """httpx request hook: counts requests of the current span, to detect client retries."""
+    current = _span.get()
+    if current is not None:
+        current.requests += 1
+
+
+async def arecord_http_request(request: Any) -> None:
+    record_http_request(request)
+
+
+class TokenUsageHandler(BaseCallbackHandler):
+    """Callback handler that adds the token usage of every chat model call to the active turn."""
+
+    run_inline = True
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        model = (response.llm_output or {}).get("model_name") or ""
+        prompt, completion = usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+        if not usage:
+            # Streamed responses report usage on the message instead
+            for generations in response.generations:
+                for generation in generations:
+                    message = getattr(generation, "message", None)
+                    if message is None:
+                        continue
+                    metadata = getattr(message, "usage_metadata", None) or {}
+                    prompt += metadata.get("input_tokens", 0)
+                    completion += metadata.get("output_tokens", 0)
+                    model = model or message.response_metadata.get("model_name", "")
+        if prompt or completion:
+            record_tokens(_base_model(model), prompt, completion)
+
+
+def _base_model(model: str) -> str:
+    """Model family of a dated model name, e.g. gpt-4o-mini-2024-07-18 -> gpt-4o-mini."""
+    for name in sorted(MODEL_PRICES, key=len, reverse=True):
+        if model.startswith(name):
+            return name
+    return model
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Generic, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class LazyAgent(Generic[T]):
+    """
+    Builds an agent with `factory` on first use, or ahead of time on a background thread with `warm_up`.
+
+    Construction happens exactly once, however many threads or tasks ask for the agent at the same time;
+    `ready` tells whether it has finished, so a server can accept connections (and answer health checks)
+    while the vector store is still being opened. A failed construction is tried again up to `retries` times,
+    waiting `retry_delay` seconds and twice as long before each further attempt; if every attempt fails, the
+    last error is re-raised to every caller.
+    """
+
+    def __init__(self, factory: Callable[[], T], retries: int = 0, retry_delay: float = 1.0) -> None:
+        self.factory = factory
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._attempts = 0
+        self._agent: Optional[T] = None
+        self._error: Optional[BaseException] = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started_at: Optional[float] = None
+        self._seconds: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set() and self._error is None
+
+    def warm_up(self) -> None:
+        """Start building the agent on a background thread, unless that has already started."""
+        with self._lock:
+            if self._thread is not None or self._done.is_set():
+                return
+            self._thread = threading.Thread(target=self._build, name="agent-warm-up", daemon=True)
+            self._thread.start()
+
+    def get(self, timeout: Optional[float] = None) -> T:
+        """The agent, built on this thread if no warm-up has started; waits up to `timeout` seconds for it."""
+        with self._lock:
+            build_here = self._thread is None and not self._done.is_set()
+            if build_here:
+                # Mark construction as started so that concurrent callers wait instead of building again
+                self._thread = threading.current_thread()
+        if build_here:
+            self._build()
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"Agent was not ready after {timeout} seconds")
+        if self._error is not None:
+            raise self._error
+        return self._agent
+
+    async def aget(self, timeout: Optional[float] = None) -> T:
+        """`get` without blocking the event loop."""
+        if self.ready:
+            return self._agent
+        return await asyncio.get_running_loop().run_in_executor(None, self.get, timeout)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "building": self._thread is not None and not self._done.is_set(),
+            "error": repr(self._error) if self._error is not None else None,
+            "attempts": self._attempts,
+            "build_seconds": self._seconds,
+        }
+
+    def _build(self) -> None:
+        self._started_at = time.perf_counter()
+        try:
+            self._agent = self._construct()
+        except BaseException as e:
+            logger.exception("Agent construction failed")
+            self._error = e
+        finally:
+            self._seconds = time.perf_counter() - self._started_at
+            self._done.set()
+
+    def _construct(self) -> T:
+        for attempt in range(self.retries):
+            self._attempts += 1
+            try:
+                return self.factory()
+            except Exception:
+                delay = self.retry_delay * 2**attempt
+                logger.warning("Agent construction failed, retrying in %.1fs", delay, exc_info=True)
+                time.sleep(delay)
+        self._attempts += 1
+        return self.factory()
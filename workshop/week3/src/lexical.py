@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+LEXICAL_INDEX_FILENAME = "lexical_index.json"
+
+_TOKEN = re.compile(r"\w+")
+
+# Function words nearly every chunk contains: sharing only these with a question is no evidence of relevance
+STOPWORDS = frozenset(
+    """
+    a about above after again against all am an and any are as at be because been before being below between both
+    but by can could did do does doing down during each few for from further had has have having he her here hers
+    him his how i if in into is it its itself just me more most my no nor not now of off on once only or other our
+    ours out over own same she should so some such than that the their theirs them then there these they this
+    those through to too under until up very was we were what when where which while who whom why will with would
+    you your yours
+    """.split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token.lower() for token in _TOKEN.findall(text)]
+
+
+def query_terms(query: str) -> List[str]:
+    """Distinct terms of `query` that count towards a lexical match, i.e. without stopwords."""
+    return list(dict.fromkeys(term for term in tokenize(query) if term not in STOPWORDS))
+
+
+class BM25Index:
+    """
+    In-memory BM25 index over chunk ids, persisted as JSON next to the vector store.
+
+    It is kept in step with the vector store by adding and removing the same chunk ids, so exact terms
+    (acronyms, equation and author names) can be found even when the embedding misses them.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self._term_counts: Dict[str, Dict[str, int]] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._lengths: Dict[str, int] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._term_counts)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._term_counts
+
+    @property
+    def ids(self) -> List[str]:
+        return list(self._term_counts)
+
+    def add(self, ids: Sequence[str], texts: Iterable[str]) -> None:
+        """Index `texts` under `ids`; ids already indexed are left as they are."""
+        with self._lock:
+            for chunk_id, text in zip(ids, texts):
+                if chunk_id not in self._term_counts:
+                    self._add_counts(chunk_id, dict(Counter(tokenize(text))))
+
+    def remove(self, ids: Iterable[str]) -> None:
+        with self._lock:
+            for chunk_id in ids:
+                counts = self._term_counts.pop(chunk_id, None)
+                if counts is None:
+                    continue
+                for term in counts:
+                    postings = self._postings[term]
+                    del postings[chunk_id]
+                    if not postings:
+                        del self._postings[term]
+                self._total_length -= self._lengths.pop(chunk_id)
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[str, float]]:
+        """
+        Top `k` (chunk id, score) pairs for `query`, best first; only chunks sharing a term other than a stopword.
+
+        Scores are BM25 scores divided by the most a chunk could score for the query (every query term, at a
+        very high frequency). They fall in [0, 1), so one threshold applies to every query: a chunk of average
+        length scores 0.4 with each query term once and about 0.57 with each twice.
+        """
+        terms = query_terms(query)
+        with self._lock:
+            count = len(self._term_counts)
+            if not count or not terms:
+                return []
+            average_length = self._total_length / count
+            scores: Dict[str, float] = {}
+            best = 0.0
+            for term in terms:
+                postings = self._postings.get(term, {})
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                best += idf * (self.k1 + 1)
+                for chunk_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[chunk_id] / average_length)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(chunk_id, score / best) for chunk_id, score in ranked]
+
+    def copy(self) -> BM25Index:
+        """Independent copy, to be changed while searches keep using this one."""
+        with self._lock:
+            # Term counts of a chunk are never changed once added, so they can be shared
+            term_counts = dict(self._term_counts)
+        return self._from_counts(self.k1, self.b, term_counts)
+
+    def _add_counts(self, chunk_id: str, counts: Dict[str, int]) -> None:
+        self._term_counts[chunk_id] = counts
+        for term, tf in counts.items():
+            self._postings.setdefault(term, {})[chunk_id] = tf
+        self._lengths[chunk_id] = sum(counts.values())
+        self._total_length += self._lengths[chunk_id]
+
+    @classmethod
+    def load(cls, directory: str) -> Optional[BM25Index]:
+        path = os.path.join(directory, LEXICAL_INDEX_FILENAME)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls._from_counts(data["k1"], data["b"], data["documents"])
+
+    @classmethod
+    def _from_counts(cls, k1: float, b: float, term_counts: Dict[str, Dict[str, int]]) -> BM25Index:
+        index = cls(k1=k1, b=b)
+        for chunk_id, counts in term_counts.items():
+            index._add_counts(chunk_id, counts)
+        return index
+
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, LEXICAL_INDEX_FILENAME)
+        with self._lock:
+            payload = {"k1": self.k1, "b": self.b, "documents": self._term_counts}
+            with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(payload, f)
+        os.replace(f"{path}.tmp", path)
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fuse ranked id lists: each id scores the sum of 1 / (k + rank) over the rankings it appears in."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -1,35 +1,84 @@
+import asyncio
+import contextvars
 import os
 import shutil
-from typing import Any, Dict, List, Literal, Optional, TypedDict
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    Literal,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypedDict,
+    TypeVar,
+)
 
 import dotenv
-from langchain.memory import ConversationBufferMemory
-from langchain_chroma import Chroma
-from langchain_community.document_loaders import PyPDFLoader
+import numpy as np
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_text_splitters import MarkdownHeaderTextSplitter, RecursiveCharacterTextSplitter
+from langchain_core.runnables import RunnableLambda
+from langgraph.config import get_stream_writer
 from langgraph.graph import END, StateGraph
-from pyboxen import boxen
-from tavily import TavilyClient
+
+from .cache import SemanticCache, TTLCache, semantic_context_key, web_search_key
+from .chunking import DEFAULT_SPLITTER_CONFIG, PageChunker
+from .clients import ClientRegistry
+from .flat_index import FlatIndex
+from .ingestion import (
+    IndexArtifact,
+    IngestionManifest,
+    SourceRecord,
+    chunk_ids,
+    content_hash,
+    embedding_model_name,
+)
+from .instrumentation import Exporter, Instrumentation, quiet_reports, record_cache, report, span, timed_node
+from .lexical import BM25Index, reciprocal_rank_fusion
+from .memory import SessionMemoryStore, SummarizingMemory, llm_summarizer
+from .packing import ContextPacker
+from .pdf_cache import PDFCache
+from .pipeline import IngestionPipeline
+from .policy import RetrievalPolicy
+from .routing import EmbeddingRouter, RouterConfig
 
 dotenv.load_dotenv()
 
+T = TypeVar("T")
+
+VECTOR_BACKENDS = ["chroma", "flat"]
+
 
 class AgentState(TypedDict, total=False):
     question: str  # User query
+    question_embedding: Optional[List[float]]  # Computed once per turn for the semantic cache and local router
     routing_decision: Literal["arxiv", "web", "both"]
     arxiv_results: Optional[List[Document]]
+    arxiv_scores: Optional[List[float]]  # Relevance scores of the retrieved chunks, best first
     web_results: Optional[List[Dict[str, Any]]]
     direct_answer: Optional[str]
     answer: str
+    answer_body: str  # Answer without the context header and citation footer, as stored in memory
     conversation_history: str
+    router_history: str  # Shorter history view given to the router
     memory: Any
     arxiv_processor: Any
     web_searcher: Any
-    next_node: Optional[Literal["web_search", "synthesize"]]
+    clients: Any  # ClientRegistry with the shared LLM clients
+    local_router: Any  # Optional EmbeddingRouter tried before the router LLM
+    web_cache: Any  # Optional TTLCache of web search responses
+    context_packer: Any  # Optional ContextPacker applied to retrieved ArXiv chunks
+    retrieval_policy: Any  # RetrievalPolicy deciding thresholds and when web search can be skipped
+    retrieval_timeout: Optional[float]  # Cap (seconds) on how long to wait for a single retriever
+    timeout_runner: Any  # TimeoutRunner of the agent, running synchronous retriever calls with the timeout
 
 
 # Router prompt with three-way decision
@@ -62,111 +111,308 @@ Your decision should be a single word only (either "arxiv", "web" or "both"). Do
 )
 
 
+def _router_inputs(state: AgentState) -> Dict[str, str]:
+    history = state.get("router_history", state["conversation_history"])
+    return {"question": state["question"], "conversation_history": history}
+
+
+def _parse_decision(raw: str) -> str:
+    decision = raw.strip().lower()
+    if decision not in ["arxiv", "web", "both"]:
+        report(
+            f"Router Warning: Unexpected decision '{decision}'. Defaulting to 'web'.",
+            title=">>> Router Node",
+            color="yellow",
+            padding=1,
+        )
+        decision = "web"
+    report(f"Router raw decision: {decision}", title=">>> Router Node", color="blue", padding=1)
+    return decision
+
+
+def _report_fast_route(decision: str) -> None:
+    report(f"Local router decision: {decision}", title=">>> Router Node", color="blue", padding=1)
+
+
 def router_node(state: AgentState) -> Dict[str, str]:
-    llm = ChatOpenAI(model="gpt-4o-mini")
+    local_router = state.get("local_router")
+    if local_router is not None:
+        try:
+            # The router LLM decides follow-up questions, in the context of the conversation
+            history = state.get("router_history", state["conversation_history"])
+            embedding = state.get("question_embedding")
+            decision = (
+                local_router.decide(embedding, history) if embedding else local_router.route(state["question"], history)
+            )
+        except Exception as e:
+            report(f"Local router failed: {e}", title=">>> Router Node", color="yellow", padding=1)
+            decision = None
+        if decision:
+            _report_fast_route(decision)
+            return {"routing_decision": decision}
+    llm = state["clients"].chat_model("gpt-4o-mini")
     chain = router_prompt | llm | StrOutputParser()
-    decision = (
-        chain.invoke(
-            {
-                "question": state["question"],
-                "conversation_history": state["conversation_history"],
-            }
-        )
-        .strip()
-        .lower()
-    )
-    if decision not in ["arxiv", "web", "both"]:
-        print(
-            boxen(
-                f"Router Warning: Unexpected decision '{decision}'. Defaulting to 'web'.",
-                title=">>> Router Node",
+    with span("router_llm"):
+        raw = chain.invoke(_router_inputs(state))
+    return {"routing_decision": _parse_decision(raw)}
+
+
+async def arouter_node(state: AgentState) -> Dict[str, str]:
+    local_router = state.get("local_router")
+    if local_router is not None:
+        try:
+            history = state.get("router_history", state["conversation_history"])
+            embedding = state.get("question_embedding")
+            if not local_router.ready:
+                # Embedding the examples and scanning the corpus would block every session on the event loop
+                await asyncio.to_thread(local_router.warm_up)
+            decision = (
+                local_router.decide(embedding, history)
+                if embedding
+                else await local_router.aroute(state["question"], history)
+            )
+        except Exception as e:
+            report(f"Local router failed: {e}", title=">>> Router Node", color="yellow", padding=1)
+            decision = None
+        if decision:
+            _report_fast_route(decision)
+            return {"routing_decision": decision}
+    llm = state["clients"].chat_model("gpt-4o-mini")
+    chain = router_prompt | llm | StrOutputParser()
+    with span("router_llm"):
+        raw = await chain.ainvoke(_router_inputs(state))
+    return {"routing_decision": _parse_decision(raw)}
+
+
+WEB_SEARCH_PARAMS: Dict[str, Any] = {"max_results": 5, "include_answer": True, "search_depth": "advanced"}
+
+
+class TimeoutRunner:
+    """
+    Runs blocking calls on worker threads and gives up waiting for them after a timeout.
+
+    A call that timed out keeps its worker until it returns. At most `max_workers` calls are in flight, so
+    each one starts on a free worker right away; when stragglers hold them all, a new call fails at once
+    with TimeoutError instead of queueing behind them past its own timeout.
+    """
+
+    def __init__(self, max_workers: int) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="retrieval-timeout")
+        self._slots = threading.BoundedSemaphore(max_workers)
+
+    def call(self, fn: Callable[[], T], timeout: Optional[float]) -> T:
+        """Run `fn` and give up waiting for it after `timeout` seconds (no cap if None)."""
+        if timeout is None:
+            return fn()
+        if not self._slots.acquire(blocking=False):
+            raise TimeoutError("Every worker is still busy with calls that timed out")
+        # The worker runs in a copy of this context so the call is attributed to the current turn and span.
+        # A straggler is not waited for; its result is simply discarded
+        future = self._executor.submit(contextvars.copy_context().run, fn)
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result(timeout=timeout)
+
+
+def route_retrievers(state: AgentState) -> List[str]:
+    """
+    Fan out to the retrievers picked by the router. "both" runs them in parallel, unless the retrieval
+    policy enables an early exit: then ArXiv goes first and `after_arxiv` decides whether the web is needed.
+    """
+    decision = state["routing_decision"]
+    if decision == "both" and not state["retrieval_policy"].early_exit:
+        return ["arxiv_retrieval", "web_search"]
+    if decision in ["arxiv", "both"]:
+        return ["arxiv_retrieval"]
+    return ["web_search"]
+
+
+def after_arxiv(state: AgentState) -> str:
+    """Continue to web search if the policy finds the ArXiv evidence insufficient for the route."""
+    decision = state["routing_decision"]
+    if decision == "both" and not state["retrieval_policy"].early_exit:
+        # web_search is already running in parallel
+        return "synthesize"
+    if state["retrieval_policy"].needs_web(decision, state.get("arxiv_scores") or []):
+        if decision == "arxiv":
+            report(
+                "No ArXiv chunk cleared the threshold, falling back to web search.",
+                title=">>> Retrieval Policy",
                 color="yellow",
-                padding=1,
+                padding=(1, 2),
             )
+        return "web_search"
+    if decision == "both":
+        report(
+            "ArXiv evidence is strong enough, skipping web search.",
+            title=">>> Retrieval Policy",
+            color="green",
+            padding=(1, 2),
         )
-        decision = "web"
-    print(boxen(f"Router raw decision: {decision}", title=">>> Router Node", color="blue", padding=1))
-    return {"routing_decision": decision}
+    return "synthesize"
+
+
+def _report_timeout(what: str, timeout: Optional[float], title: str) -> None:
+    report(f"{what} timed out after {timeout}s.", title=title, color="yellow", padding=(1, 2))
+
+
+def _report_arxiv_chunks(chunks: List[Document]) -> None:
+    report(
+        f"Found {len(chunks)} relevant ArXiv chunks.",
+        title=">>> ArXiv Retrieval Node",
+        color="blue",
+        padding=(1, 2),
+    )
+
+
+def _report_web_results(results: List[Dict[str, Any]], direct: Optional[str]) -> None:
+    info = f"Found {len(results)} web results." + (" Direct answer found." if direct else "")
+    report(info, title=">>> Web Search Node", color="blue", padding=(1, 2))
+
+
+def _report_web_cache_hit() -> None:
+    report("Serving web results from cache.", title=">>> Web Search Node", color="cyan", padding=(1, 2))
+
+
+def _fetch_k(state: AgentState) -> int:
+    packer = state.get("context_packer")
+    return packer.fetch_k if packer else 5
+
+
+def _pack_chunks(state: AgentState, chunks: List[Document]) -> List[Document]:
+    packer = state.get("context_packer")
+    if not packer or not chunks:
+        return chunks
+    packed = packer.pack(chunks)
+    report(
+        f"Packed {len(chunks)} chunks into {len(packed)} passages "
+        f"({sum(len(d.page_content) for d in chunks)} -> {sum(len(d.page_content) for d in packed)} chars)",
+        title=">>> ArXiv Retrieval Node",
+        color="cyan",
+        padding=(1, 2),
+    )
+    return packed
+
+
+def _arxiv_update(state: AgentState, chunks: List[Document]) -> Dict[str, Any]:
+    scores = sorted((d.metadata.get("relevance_score", 0.0) for d in chunks), reverse=True)
+    return {"arxiv_results": _pack_chunks(state, chunks), "arxiv_scores": scores}
 
 
 def arxiv_retrieval_node(state: AgentState) -> Dict[str, Any]:
     question = state["question"]
-    decision = state["routing_decision"]
+    timeout = state.get("retrieval_timeout")
     chunks: List[Document] = []
-    next_dest = "synthesize"
     try:
-        chunks = state["arxiv_processor"].retrieve(
-            question=question,
-            confidence_threshold=0.5,
-        )
-        print(
-            boxen(
-                f"Found {len(chunks)} relevant ArXiv chunks.",
-                title=">>> ArXiv Retrieval Node",
-                color="blue",
-                padding=(1, 2),
+        with span("chroma_query"):
+            chunks = state["timeout_runner"].call(
+                lambda: state["arxiv_processor"].retrieve(question=question, k=_fetch_k(state)), timeout
             )
-        )
+        _report_arxiv_chunks(chunks)
+    except TimeoutError:
+        _report_timeout("ArXiv retrieval", timeout, ">>> ArXiv Retrieval Node")
     except Exception as e:
-        print(
-            boxen(f"Error during ArXiv retrieval: {e}", title=">>> ArXiv Retrieval Node", color="red", padding=(1, 2))
-        )
-    if decision == "both":
-        print(
-            boxen(
-                "Routing decision was 'both', proceeding to Web Search next.",
-                title=">>> Routing",
-                color="green",
-                padding=(1, 2),
-            )
-        )
-        next_dest = "web_search"
-    else:
-        print(
-            boxen(
-                "Routing decision was 'arxiv', proceeding to Synthesize next.",
-                title=">>> Routing",
-                color="green",
-                padding=(1, 2),
+        report(f"Error during ArXiv retrieval: {e}", title=">>> ArXiv Retrieval Node", color="red", padding=(1, 2))
+    return _arxiv_update(state, chunks)
+
+
+async def aarxiv_retrieval_node(state: AgentState) -> Dict[str, Any]:
+    question = state["question"]
+    timeout = state.get("retrieval_timeout")
+    chunks: List[Document] = []
+    try:
+        with span("chroma_query"):
+            chunks = await asyncio.wait_for(
+                state["arxiv_processor"].aretrieve(question=question, k=_fetch_k(state)), timeout
             )
-        )
-    return {"arxiv_results": chunks, "next_node": next_dest}
+        _report_arxiv_chunks(chunks)
+    except TimeoutError:
+        _report_timeout("ArXiv retrieval", timeout, ">>> ArXiv Retrieval Node")
+    except Exception as e:
+        report(f"Error during ArXiv retrieval: {e}", title=">>> ArXiv Retrieval Node", color="red", padding=(1, 2))
+    return _arxiv_update(state, chunks)
+
+
+def _cached_web_search(cache: Optional[TTLCache], key: str) -> Optional[Dict[str, Any]]:
+    if cache is None:
+        return None
+    resp = cache.get(key)
+    record_cache("web_search", resp is not None)
+    return resp
 
 
 def web_search_node(state: AgentState) -> Dict[str, Any]:
+    timeout = state.get("retrieval_timeout")
     results: List[Dict[str, Any]] = []
     direct = None
+    cache = state.get("web_cache")
+    key = web_search_key(state["question"], WEB_SEARCH_PARAMS)
     try:
-        client = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
-        resp = client.search(query=state["question"], max_results=5, include_answer=True, search_depth="advanced")
+        resp = _cached_web_search(cache, key)
+        if resp is None:
+            searcher = state["web_searcher"]
+            with span("tavily"):
+                resp = state["timeout_runner"].call(
+                    lambda: searcher.search(query=state["question"], **WEB_SEARCH_PARAMS), timeout
+                )
+            if cache is not None:
+                cache.set(key, resp)
+        else:
+            _report_web_cache_hit()
         results = resp.get("results", [])
         direct = resp.get("answer")
-        info = f"Found {len(results)} web results." + (" Direct answer found." if direct else "")
-        print(boxen(info, title=">>> Web Search Node", color="blue", padding=(1, 2)))
+        _report_web_results(results, direct)
+    except TimeoutError:
+        _report_timeout("Web search", timeout, ">>> Web Search Node")
     except Exception as e:
-        print(boxen(f"Error during Web search: {e}", title=">>> Web Search Node", color="red", padding=(1, 2)))
+        report(f"Error during Web search: {e}", title=">>> Web Search Node", color="red", padding=(1, 2))
     return {"web_results": results, "direct_answer": direct}
 
 
-def synthesize_answer_node(state: AgentState) -> Dict[str, str]:
-    q = state["question"]
+async def aweb_search_node(state: AgentState) -> Dict[str, Any]:
+    timeout = state.get("retrieval_timeout")
+    results: List[Dict[str, Any]] = []
+    direct = None
+    cache = state.get("web_cache")
+    key = web_search_key(state["question"], WEB_SEARCH_PARAMS)
+    try:
+        resp = _cached_web_search(cache, key)
+        if resp is None:
+            with span("tavily"):
+                resp = await asyncio.wait_for(
+                    state["web_searcher"].asearch(query=state["question"], **WEB_SEARCH_PARAMS), timeout
+                )
+            if cache is not None:
+                cache.set(key, resp)
+        else:
+            _report_web_cache_hit()
+        results = resp.get("results", [])
+        direct = resp.get("answer")
+        _report_web_results(results, direct)
+    except TimeoutError:
+        _report_timeout("Web search", timeout, ">>> Web Search Node")
+    except Exception as e:
+        report(f"Error during Web search: {e}", title=">>> Web Search Node", color="red", padding=(1, 2))
+    return {"web_results": results, "direct_answer": direct}
+
+
+NO_INFORMATION_ANSWER = "I could not find relevant information to answer your question."
+CACHED_ANSWER_MARKER = '> _Served from cache: answer to the similar question "{question}"._\n\n'
+
+
+def _synthesis_plan(state: AgentState) -> Tuple[str, str, str]:
+    """Pick the prompt for the available sources. Returns (source type, prompt template, context)."""
     arxiv = state.get("arxiv_results") or []
     web = state.get("web_results") or []
     direct = state.get("direct_answer")
-    history = state["conversation_history"]
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.1)
-    final = ""
     src_type = "None"
     prompt_txt = ""
     context = ""
     if arxiv and web:
-        print(
-            boxen(
-                "Synthesizing from Both ArXiv and Web Results",
-                title=">>> Synthesize Answer Node",
-                color="blue",
-                padding=(1, 2),
-            )
+        report(
+            "Synthesizing from Both ArXiv and Web Results",
+            title=">>> Synthesize Answer Node",
+            color="blue",
+            padding=(1, 2),
         )
         src_type = "Combined ArXiv and Web"
         arxiv_src = "\n\n".join(
@@ -208,9 +454,7 @@ def synthesize_answer_node(state: AgentState) -> Dict[str, str]:
         Synthesized Answer:
 """
     elif arxiv:
-        print(
-            boxen("Synthesizing from ArXiv Results", title=">>> Synthesize Answer Node", color="blue", padding=(1, 2))
-        )
+        report("Synthesizing from ArXiv Results", title=">>> Synthesize Answer Node", color="blue", padding=(1, 2))
         src_type = "ArXiv Papers"
         context = "\n\n".join(
             [
@@ -248,7 +492,7 @@ def synthesize_answer_node(state: AgentState) -> Dict[str, str]:
         Your answer:
 """
     elif web:
-        print(boxen("Synthesizing from Web Results", title=">>> Synthesize Answer Node", color="blue", padding=(1, 2)))
+        report("Synthesizing from Web Results", title=">>> Synthesize Answer Node", color="blue", padding=(1, 2))
         src_type = "Web Search Results"
         context = "\n\n".join(
             [f"--- Web Source [{i+1}]: {r.get('title')} ---\n{r.get('content')}" for i, r in enumerate(web)]
@@ -275,140 +519,983 @@ def synthesize_answer_node(state: AgentState) -> Dict[str, str]:
         Your answer:
 """
     else:
-        print(boxen("No relevant information found to synthesize answer."))
-        final = "I could not find relevant information to answer your question."
-    if src_type != "None":
-        prompt = ChatPromptTemplate.from_template(prompt_txt)
-        chain = prompt | llm | StrOutputParser()
-        final = chain.invoke({"question": q, "sources": context, "conversation_history": history})
-        if src_type in ["Web Search Results", "Combined ArXiv and Web"] and web:
-            citations = "\n\n**Web Sources:**\n" + "\n".join([f"[{i+1}] {r.get('url')}" for i, r in enumerate(web)])
-            final += citations
-    output = f"""## Context
-**Question:** {q}
+        report("No relevant information found to synthesize answer.")
+    return src_type, prompt_txt, context
+
+
+def _synthesis_chain(state: AgentState, prompt_txt: str) -> Any:
+    llm = state["clients"].chat_model("gpt-4o-mini", temperature=0.1)
+    return ChatPromptTemplate.from_template(prompt_txt) | llm | StrOutputParser()
+
+
+def _synthesis_inputs(state: AgentState, context: str) -> Dict[str, str]:
+    return {"question": state["question"], "sources": context, "conversation_history": state["conversation_history"]}
+
+
+def _answer_header(state: AgentState, src_type: str) -> str:
+    return f"""## Context
+**Question:** {state["question"]}
 **Source(s) Used:** {src_type}
 
 ## Response
-{final}
 """
-    return {"answer": output}
+
+
+def _answer_footer(state: AgentState, src_type: str) -> str:
+    web = state.get("web_results") or []
+    citations = ""
+    if src_type in ["Web Search Results", "Combined ArXiv and Web"] and web:
+        citations = "\n\n**Web Sources:**\n" + "\n".join([f"[{i+1}] {r.get('url')}" for i, r in enumerate(web)])
+    return citations + "\n"
+
+
+def synthesize_answer_node(state: AgentState) -> Dict[str, str]:
+    src_type, prompt_txt, context = _synthesis_plan(state)
+    # Header and footer go to the custom stream so streaming callers can show them around the LLM tokens
+    write = get_stream_writer()
+    header, footer = _answer_header(state, src_type), _answer_footer(state, src_type)
+    write({"header": header})
+    final = NO_INFORMATION_ANSWER
+    if src_type != "None":
+        with span("synthesis_llm"):
+            final = _synthesis_chain(state, prompt_txt).invoke(_synthesis_inputs(state, context))
+    else:
+        write({"body": final})
+    write({"footer": footer})
+    return {"answer": header + final + footer, "answer_body": final}
+
+
+async def asynthesize_answer_node(state: AgentState) -> Dict[str, str]:
+    src_type, prompt_txt, context = _synthesis_plan(state)
+    write = get_stream_writer()
+    header, footer = _answer_header(state, src_type), _answer_footer(state, src_type)
+    write({"header": header})
+    final = NO_INFORMATION_ANSWER
+    if src_type != "None":
+        with span("synthesis_llm"):
+            final = await _synthesis_chain(state, prompt_txt).ainvoke(_synthesis_inputs(state, context))
+    else:
+        write({"body": final})
+    write({"footer": footer})
+    return {"answer": header + final + footer, "answer_body": final}
 
 
 def update_memory_node(state: AgentState) -> Dict[str, Any]:
     mem = state["memory"]
-    mem.save_context({"question": state["question"]}, {"answer": state["answer"]})
-    return {"conversation_history": mem.load_memory_variables({}).get("history", "")}
+    # Summarizing older turns happens in the background, so this is cheap in both variants
+    with span("memory_update"):
+        mem.add_turn(state["question"], state.get("answer_body", state["answer"]))
+        return {"conversation_history": mem.history("synthesis"), "router_history": mem.history("router")}
+
+
+async def aupdate_memory_node(state: AgentState) -> Dict[str, Any]:
+    return update_memory_node(state)
+
+
+class IndexGeneration(NamedTuple):
+    """What one query sees: chunks up to generation `number`, and the BM25 index over exactly those chunks."""
+
+    number: int
+    lexical_index: BM25Index
+
+
+class IngestionJob(NamedTuple):
+    sources: List[str]
+    submitted_at: float
 
 
 class ArXivProcessor:
-    def __init__(self) -> None:
-        self.header_splitter = MarkdownHeaderTextSplitter(
-            headers_to_split_on=[("#", "Section"), ("##", "Subsection"), ("###", "Subsubsection")]
-        )
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000, chunk_overlap=200, separators=["\n\n", "\n", "(?<=\\. )", " ", ""]
-        )
+    def __init__(
+        self,
+        embeddings: Optional[Embeddings] = None,
+        persist_directory: str = "./arxiv_db",
+        pdf_cache_dir: Optional[str] = "./pdf_cache",
+        retrieval_mode: str = "hybrid",
+        policy: Optional[RetrievalPolicy] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        vector_backend: str = "chroma",
+        vector_dtype: str = "float32",
+    ) -> None:
+        if vector_backend not in VECTOR_BACKENDS:
+            raise ValueError(f"Unknown vector backend {vector_backend}, expected one of {VECTOR_BACKENDS}")
+        if embeddings is None:
+            from langchain_openai import OpenAIEmbeddings
+
+            embeddings = OpenAIEmbeddings()
+        self.embeddings = embeddings
+        self.policy = policy or RetrievalPolicy()
+        self.persist_directory = persist_directory
+        # Local copies of downloaded PDFs and their parsed pages (None always downloads and parses)
+        self.pdf_cache_dir = pdf_cache_dir
+        self.splitter_config: Dict[str, Any] = dict(DEFAULT_SPLITTER_CONFIG)
+        self.chunker = PageChunker(self.splitter_config)
+        # "chroma", or "flat" for exact search over a memory-mapped matrix stored as `vector_dtype` (see FlatIndex)
+        self.vector_backend = vector_backend
+        self.vector_dtype = vector_dtype
         self.vector_store = None
+        self.manifest = IngestionManifest(splitter=self.splitter_config)
+        # BM25 index over the same chunk ids, fused with vector search unless `retrieval_mode` says otherwise.
+        # It is published together with the generation of papers it covers; queries read both at once
+        self._published = IndexGeneration(0, BM25Index())
+        self.retrieval_mode = retrieval_mode
+        # Set when serving from a prebuilt index artifact in place, which is never modified
+        self.read_only = False
+        # Papers added at runtime are indexed one job at a time on this worker (see add_sources)
+        self.instrumentation = instrumentation
+        # Called with {source: chunk ids} of the papers of every generation published
+        self.publish_callbacks: List[Callable[[Dict[str, List[str]]], None]] = []
+        self._ingest_executor: Optional[ThreadPoolExecutor] = None
+        self._ingest_jobs: List[IngestionJob] = []
+        self._ingest_lock = threading.Lock()
+        self._ingest_counts = {"published": 0, "failed": 0}
+        self._last_publish_lag: Optional[float] = None
 
-    def load_and_process(self, pdf_urls: List[str], force_recreate: bool = False) -> None:
-        if os.path.exists("./arxiv_db") and not force_recreate:
-            print(
-                boxen(
-                    "Loading existing vector store from ./arxiv_db", title=">>> Initialization", color="cyan", padding=1
-                )
-            )
-            self.vector_store = Chroma(persist_directory="./arxiv_db", embedding_function=OpenAIEmbeddings())
-            return
-        if force_recreate and os.path.exists("./arxiv_db"):
-            shutil.rmtree("./arxiv_db")
-        all_chunks: List[Document] = []
-        for url in pdf_urls:
-            print(boxen(f"Loading PDF from {url}", title=">>> PDF Loading", color="blue", padding=1))
-            pages = PyPDFLoader(url).load()
-            for page in pages:
-                text = f"# {page.metadata['source']}\n## Page {page.metadata['page']}\n{page.page_content}"
-                header_chunks = self.header_splitter.split_text(text)
-                small_chunks = self.text_splitter.split_documents(header_chunks)
-                all_chunks.extend(small_chunks)
-        print(
-            boxen(
-                f"Created {len(all_chunks)} chunks from {len(pdf_urls)} PDFs",
-                title=">>> Processing Complete",
-                color="green",
+    @property
+    def lexical_index(self) -> BM25Index:
+        return self._published.lexical_index
+
+    @lexical_index.setter
+    def lexical_index(self, index: BM25Index) -> None:
+        self._published = self._published._replace(lexical_index=index)
+
+    @property
+    def generation(self) -> int:
+        return self._published.number
+
+    @property
+    def corpus_version(self) -> str:
+        return self.manifest.corpus_version
+
+    def load_and_process(
+        self,
+        pdf_urls: List[str],
+        force_recreate: bool = False,
+        refresh: bool = False,
+        pipelined: bool = False,
+        download_workers: int = 8,
+        parse_workers: Optional[int] = None,
+    ) -> None:
+        """
+        Bring the vector store in line with `pdf_urls`. Only new papers are downloaded and embedded and
+        papers no longer listed are deleted; `refresh` re-checks known papers: those whose content hash
+        changed are chunked again and their changed chunks re-embedded, the others are left as they are.
+
+        With `pipelined`, PDFs are downloaded concurrently and parsed/chunked in a process pool while
+        finished papers are embedded, instead of one paper after another.
+        """
+        if self.read_only:
+            raise ValueError(f"The index at {self.persist_directory} is a prebuilt artifact and can't be changed")
+        if force_recreate and os.path.exists(self.persist_directory):
+            shutil.rmtree(self.persist_directory)
+        if os.path.exists(self.persist_directory):
+            report(
+                f"Loading existing vector store from {self.persist_directory}",
+                title=">>> Initialization",
+                color="cyan",
                 padding=1,
             )
+        self.vector_store = self._open_vector_store(self.persist_directory)
+        self.manifest = IngestionManifest.load(self.persist_directory) or self._adopt_existing_store()
+        if self.manifest.vector_backend != self.vector_backend:
+            # The chunks are in the other backend's store, so every paper is ingested into this one
+            self.manifest = IngestionManifest(
+                splitter=self.splitter_config, generation=self.manifest.generation, vector_backend=self.vector_backend
+            )
+        self._published = IndexGeneration(
+            self.manifest.generation, BM25Index.load(self.persist_directory) or BM25Index()
+        )
+        # Chunk ids depend on the splitter, so new settings mean re-chunking every paper
+        splitter_changed = self.manifest.splitter != self.splitter_config
+        rechunk = refresh or splitter_changed
+        # Otherwise papers with the same content hash as when they were indexed keep their chunks
+        known_hashes = (
+            {}
+            if splitter_changed
+            else {url: record.content_hash for url, record in self.manifest.sources.items() if record.content_hash}
         )
-        self.vector_store = Chroma.from_documents(
-            documents=all_chunks, embedding=OpenAIEmbeddings(), persist_directory="./arxiv_db"
+        self.manifest.splitter = self.splitter_config
+        removed = [source for source in self.manifest.sources if source not in pdf_urls]
+        for source in removed:
+            self._remove_source(source)
+        pending = [url for url in pdf_urls if url not in self.manifest.sources or rechunk]
+        embedded = 0
+        unchanged = 0
+        if pipelined:
+            pipeline = IngestionPipeline(
+                self.splitter_config,
+                download_workers=download_workers,
+                parse_workers=parse_workers,
+                pdf_cache_dir=self.pdf_cache_dir,
+            )
+            for parsed in pipeline.run(pending, known_hashes):
+                if parsed.unchanged:
+                    unchanged += 1
+                    report(pipeline.stats.progress(parsed), title=">>> PDF Pipeline", color="blue", padding=1)
+                    continue
+                started = time.perf_counter()
+                new_chunks = self._sync_source(parsed.source, parsed.chunks, parsed.content_hash)
+                pipeline.stats.record_embedded(new_chunks, time.perf_counter() - started)
+                embedded += new_chunks
+                report(pipeline.stats.progress(parsed), title=">>> PDF Pipeline", color="blue", padding=1)
+            summary = pipeline.stats.summary()
+            if pipeline.pdf_cache is not None:
+                summary += "\n" + pipeline.pdf_cache.describe()
+            report(summary, title=">>> PDF Pipeline", color="green", padding=1)
+        else:
+            pdf_cache = PDFCache(self.pdf_cache_dir) if self.pdf_cache_dir and pending else None
+            for url in pending:
+                pages = self._load_pages(url, pdf_cache)
+                digest = content_hash(p.page_content for p in pages)
+                if digest == known_hashes.get(url):
+                    unchanged += 1
+                    continue
+                embedded += self._sync_source(url, self.chunker.split_pages(pages), digest)
+        self._reconcile_lexical_index()
+        self.manifest.save(self.persist_directory)
+        self.lexical_index.save(self.persist_directory)
+        report(
+            f"Indexed {len(self.manifest.sources)} PDFs: embedded {embedded} new chunks, "
+            f"removed {len(removed)} PDFs, {unchanged} PDFs unchanged",
+            title=">>> Processing Complete",
+            color="green",
+            padding=1,
         )
 
-    def retrieve(self, question: str, confidence_threshold: float = 0.75, k: int = 5) -> List[Document]:
+    def index_mismatches(self, artifact: IndexArtifact, pdf_urls: List[str]) -> List[str]:
+        """Why `artifact` can't serve `pdf_urls` with this processor's splitter, embeddings and backend."""
+        return artifact.mismatches(
+            pdf_urls, self.splitter_config, embedding_model_name(self.embeddings), self.vector_backend
+        )
+
+    def open_index(self, index_path: str, pdf_urls: List[str], copy_to: Optional[str] = None) -> None:
+        """
+        Serve from a prebuilt index artifact (see `src.build_index`) instead of ingesting: nothing is
+        downloaded, embedded or written. Refuses an index built from other papers, splitter settings or
+        embedding model.
+
+        The artifact is read-only, so `add_sources` refuses it. With `copy_to`, a fresh copy of it is made
+        there (replacing what was there before, papers added at runtime included) and served instead, which
+        papers can be added to.
+        """
+        artifact = IndexArtifact.load(index_path)
+        manifest = IngestionManifest.load(index_path)
+        lexical_index = BM25Index.load(index_path)
+        if artifact is None or manifest is None or lexical_index is None:
+            raise ValueError(f"No complete index artifact at {index_path}")
+        problems = self.index_mismatches(artifact, pdf_urls)
+        if problems:
+            raise ValueError(f"The index at {index_path} does not match this agent: " + "; ".join(problems))
+        if copy_to is not None:
+            if os.path.abspath(copy_to) == os.path.abspath(index_path):
+                raise ValueError(f"Can't copy the index at {index_path} onto itself")
+            shutil.rmtree(copy_to, ignore_errors=True)
+            shutil.copytree(index_path, copy_to)
+        self.read_only = copy_to is None
+        self.persist_directory = index_path if copy_to is None else copy_to
+        self.vector_store = self._open_vector_store(self.persist_directory, read_only=self.read_only)
+        self.manifest = manifest
+        self._published = IndexGeneration(manifest.generation, lexical_index)
+        report(
+            f"Serving {artifact.chunks} chunks of {len(artifact.sources)} PDFs from the prebuilt index at "
+            f"{index_path} (version {artifact.corpus_version[:12]})"
+            + ("" if copy_to is None else f", copied to {copy_to}"),
+            title=">>> Initialization",
+            color="cyan",
+            padding=1,
+        )
+
+    def _open_vector_store(self, directory: str, read_only: bool = False) -> Any:
+        if self.vector_backend == "flat":
+            return FlatIndex(
+                persist_directory=directory,
+                embedding_function=self.embeddings,
+                dtype=self.vector_dtype,
+                read_only=read_only,
+            )
+        # Chroma (and the PDF loaders) take seconds to import, so they are only imported once needed
+        from langchain_chroma import Chroma
+
+        return Chroma(persist_directory=directory, embedding_function=self.embeddings)
+
+    @staticmethod
+    def _load_pages(url: str, pdf_cache: Optional[PDFCache]) -> List[Document]:
+        report(f"Loading PDF from {url}", title=">>> PDF Loading", color="blue", padding=1)
+        if pdf_cache is not None:
+            return pdf_cache.load_pages(pdf_cache.fetch(url), url)
+        from langchain_community.document_loaders import PyPDFLoader
+
+        return PyPDFLoader(url).load()
+
+    def add_sources(self, pdf_urls: List[str]) -> "Future[int]":
+        """
+        Index more papers (URLs or local PDF files) on a background worker while queries go on. Their chunks
+        become visible all at once, as a new index generation; the returned future resolves to its number.
+        Papers already indexed are skipped.
+        """
+        if self.read_only:
+            raise ValueError(f"The index at {self.persist_directory} is a prebuilt artifact and can't be changed")
         if not self.vector_store:
             raise ValueError("No ArXiv documents loaded. Run load_and_process first.")
-        results = self.vector_store.similarity_search_with_relevance_scores(question, k=k)
-        filtered = [doc for doc, score in results if score >= confidence_threshold]
-        print(
-            boxen(
-                f"Found {len(filtered)} relevant chunks above threshold {confidence_threshold}",
-                title=">>> ArXivProcessor",
-                color="yellow",
-                padding=1,
-            )
+        job = IngestionJob(list(pdf_urls), time.time())
+        with self._ingest_lock:
+            if self._ingest_executor is None:
+                self._ingest_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingestion")
+            self._ingest_jobs.append(job)
+            # The job runs in a copy of the caller's context, e.g. with its agent's report settings
+            future = self._ingest_executor.submit(contextvars.copy_context().run, self._ingest, job)
+        self._report_queue()
+        return future
+
+    def _ingest(self, job: IngestionJob) -> int:
+        """
+        Index the papers of `job` into copies of the manifest and BM25 index, then publish them. Their chunks
+        are stored with the new generation number, which keeps them out of queries started before the publish.
+        """
+        generation = self.generation + 1
+        try:
+            manifest = self.manifest.model_copy(deep=True)
+            pending = [url for url in dict.fromkeys(job.sources) if url not in manifest.sources]
+            if not pending:
+                return self.generation
+            lexical_index = self.lexical_index.copy()
+            pdf_cache = PDFCache(self.pdf_cache_dir) if self.pdf_cache_dir else None
+            embedded = 0
+            for url in pending:
+                pages = self._load_pages(url, pdf_cache)
+                chunks = self.chunker.split_pages(pages)
+                for chunk in chunks:
+                    chunk.metadata["generation"] = generation
+                embedded += self._sync_source(
+                    url,
+                    chunks,
+                    content_hash(p.page_content for p in pages),
+                    manifest=manifest,
+                    lexical_index=lexical_index,
+                )
+            manifest.generation = generation
+            manifest.save(self.persist_directory)
+            lexical_index.save(self.persist_directory)
+            # The swap: queries in flight keep the snapshot they started with, new ones see this generation
+            self.manifest = manifest
+            self._published = IndexGeneration(generation, lexical_index)
+        except Exception:
+            # Chunks of an unpublished generation would show up once a later one is published
+            self.vector_store.delete(where={"generation": generation})
+            self._ingest_counts["failed"] += 1
+            raise
+        finally:
+            with self._ingest_lock:
+                self._ingest_jobs.remove(job)
+            self._report_queue()
+        lag = time.time() - job.submitted_at
+        self._ingest_counts["published"] += 1
+        self._last_publish_lag = lag
+        if self.instrumentation is not None:
+            self.instrumentation.observe("rag_ingestion_lag_seconds", lag)
+            self.instrumentation.increment("rag_ingested_sources_total", len(pending))
+        published = {url: manifest.sources[url].chunk_ids for url in pending}
+        for callback in self.publish_callbacks:
+            callback(published)
+        report(
+            f"Published generation {generation}: {len(pending)} PDFs, {embedded} new chunks, {lag:.1f}s after "
+            "they were submitted",
+            title=">>> Ingestion",
+            color="green",
+            padding=1,
+        )
+        return generation
+
+    def _report_queue(self) -> None:
+        if self.instrumentation is not None:
+            stats = self.ingestion_stats()
+            self.instrumentation.set_gauge("rag_ingestion_queue_depth", stats["queue_depth"])
+            self.instrumentation.set_gauge("rag_ingestion_pending_sources", stats["pending_sources"])
+
+    def ingestion_stats(self) -> Dict[str, Any]:
+        """Runtime ingestion queue: jobs not yet published, and how long the oldest has been waiting."""
+        with self._ingest_lock:
+            jobs = list(self._ingest_jobs)
+        return {
+            "generation": self.generation,
+            "queue_depth": len(jobs),
+            "pending_sources": sum(len(job.sources) for job in jobs),
+            "lag_seconds": time.time() - min(job.submitted_at for job in jobs) if jobs else 0.0,
+            "last_publish_lag_seconds": self._last_publish_lag,
+            **self._ingest_counts,
+        }
+
+    def _sync_source(
+        self,
+        source: str,
+        chunks: List[Document],
+        digest: str,
+        batch_size: int = 256,
+        manifest: Optional[IngestionManifest] = None,
+        lexical_index: Optional[BM25Index] = None,
+    ) -> int:
+        """
+        Replace the chunks of `source` with `chunks`, embedding only chunks not stored yet. Updates this
+        processor's manifest and BM25 index unless others are given.
+        """
+        manifest = self.manifest if manifest is None else manifest
+        lexical_index = self.lexical_index if lexical_index is None else lexical_index
+        ids = chunk_ids(chunks)
+        record = manifest.sources.get(source, SourceRecord())
+        known = set(record.chunk_ids)
+        new = [(i, c) for i, c in zip(ids, chunks) if i not in known]
+        # Chunks may already be stored under the same content id, e.g. if the manifest was lost
+        stored = set(self.vector_store.get(ids=[i for i, _ in new], include=[])["ids"]) if new else set()
+        new = [(i, c) for i, c in new if i not in stored]
+        for start in range(0, len(new), batch_size):
+            batch = new[start : start + batch_size]
+            self.vector_store.add_documents([c for _, c in batch], ids=[i for i, _ in batch])
+        lexical_index.add(ids, (c.page_content for c in chunks))
+        stale = list(known - set(ids))
+        if stale:
+            self.vector_store.delete(ids=stale)
+            lexical_index.remove(stale)
+        manifest.sources[source] = SourceRecord(content_hash=digest, chunk_ids=ids)
+        return len(new)
+
+    def _remove_source(self, source: str) -> None:
+        record = self.manifest.sources.pop(source)
+        if record.chunk_ids:
+            self.vector_store.delete(ids=record.chunk_ids)
+            self.lexical_index.remove(record.chunk_ids)
+
+    def _reconcile_lexical_index(self, batch_size: int = 5000) -> None:
+        """Index chunks the lexical index is missing (e.g. a store built before it existed) and drop extras."""
+        expected = {i for record in self.manifest.sources.values() for i in record.chunk_ids}
+        self.lexical_index.remove([i for i in self.lexical_index.ids if i not in expected])
+        missing = [i for i in expected if i not in self.lexical_index]
+        for start in range(0, len(missing), batch_size):
+            batch = self.vector_store.get(ids=missing[start : start + batch_size], include=["documents"])
+            self.lexical_index.add(batch["ids"], batch["documents"])
+
+    def _adopt_existing_store(self) -> IngestionManifest:
+        """Build a manifest for a store created before manifests existed, from its chunk metadata."""
+        manifest = IngestionManifest(splitter=self.splitter_config, vector_backend=self.vector_backend)
+        existing = self.vector_store.get(include=["metadatas"])
+        for chunk_id, metadata in zip(existing["ids"], existing["metadatas"]):
+            source = (metadata or {}).get("source") or (metadata or {}).get("Section", "")
+            manifest.sources.setdefault(source, SourceRecord()).chunk_ids.append(chunk_id)
+        return manifest
+
+    def retrieve(
+        self, question: str, confidence_threshold: Optional[float] = None, k: int = 5, mode: Optional[str] = None
+    ) -> List[Document]:
+        """
+        Chunks relevant to `question` (above the policy's threshold unless `confidence_threshold` is given).
+        `mode` (default `retrieval_mode`) is "vector", "lexical" (BM25) or "hybrid", which fuses both
+        rankings with reciprocal rank fusion.
+        """
+        mode = self._check_mode(mode)
+        confidence_threshold = (
+            self.policy.confidence_threshold if confidence_threshold is None else confidence_threshold
+        )
+        snapshot = self._published
+        vector = []
+        if mode != "lexical":
+            fetch_k = k
+            while True:
+                results = self.vector_store.similarity_search_with_relevance_scores(question, k=fetch_k)
+                vector = self._visible(results, snapshot)
+                if self._enough_visible(vector, results, k, fetch_k):
+                    break
+                fetch_k *= 2
+            vector = vector[:k]
+        lexical = [] if mode == "vector" else self._lexical_search(question, k, vector, snapshot.lexical_index)
+        return self._fuse(vector, lexical, confidence_threshold, self.policy.lexical_threshold, k)
+
+    async def aretrieve(
+        self, question: str, confidence_threshold: Optional[float] = None, k: int = 5, mode: Optional[str] = None
+    ) -> List[Document]:
+        mode = self._check_mode(mode)
+        confidence_threshold = (
+            self.policy.confidence_threshold if confidence_threshold is None else confidence_threshold
+        )
+        snapshot = self._published
+        vector = []
+        if mode != "lexical":
+            fetch_k = k
+            while True:
+                results = await self.vector_store.asimilarity_search_with_relevance_scores(question, k=fetch_k)
+                vector = self._visible(results, snapshot)
+                if self._enough_visible(vector, results, k, fetch_k):
+                    break
+                fetch_k *= 2
+            vector = vector[:k]
+        lexical = []
+        if mode != "vector":
+            lexical = await asyncio.to_thread(self._lexical_search, question, k, vector, snapshot.lexical_index)
+        return self._fuse(vector, lexical, confidence_threshold, self.policy.lexical_threshold, k)
+
+    @staticmethod
+    def _enough_visible(
+        visible: List[Tuple[Document, float]], results: List[Tuple[Document, float]], k: int, fetch_k: int
+    ) -> bool:
+        """
+        Whether a search for `fetch_k` hits found `k` visible ones, or all the store has. While a new
+        generation is being written, hits of it are left out and the search is repeated with a larger `fetch_k`.
+        """
+        return len(visible) >= k or len(results) < fetch_k
+
+    @staticmethod
+    def _visible(results: List[Tuple[Document, float]], snapshot: IndexGeneration) -> List[Tuple[Document, float]]:
+        """Hits published in `snapshot`; chunks of a generation still being indexed are left out."""
+        return [(doc, score) for doc, score in results if doc.metadata.get("generation", 0) <= snapshot.number]
+
+    def _check_mode(self, mode: Optional[str]) -> str:
+        if not self.vector_store:
+            raise ValueError("No ArXiv documents loaded. Run load_and_process first.")
+        mode = mode or self.retrieval_mode
+        if mode not in ["vector", "lexical", "hybrid"]:
+            raise ValueError(f"Unknown retrieval mode: {mode}")
+        return mode
+
+    def _lexical_search(
+        self, question: str, k: int, vector: List[Tuple[Document, float]], lexical_index: BM25Index
+    ) -> List[Tuple[Document, float]]:
+        """
+        BM25 hits for `question` with their normalized scores, best first, reusing documents already returned by
+        vector search.
+        """
+        hits = lexical_index.search(question, k=k)
+        known = {doc.id: doc for doc, _ in vector}
+        missing = [i for i, _ in hits if i not in known]
+        # Chroma rejects an empty id list
+        fetched = {doc.id: doc for doc in self.vector_store.get_by_ids(missing)} if missing else {}
+        return [(known.get(i) or fetched[i], score) for i, score in hits if i in known or i in fetched]
+
+    @staticmethod
+    def _fuse(
+        vector: List[Tuple[Document, float]],
+        lexical: List[Tuple[Document, float]],
+        confidence_threshold: float,
+        lexical_threshold: float,
+        k: int,
+    ) -> List[Document]:
+        """
+        Hits whose relevance score reaches `confidence_threshold` or whose normalized BM25 score reaches
+        `lexical_threshold`, ranked by reciprocal rank fusion. Hits found by BM25 only have no relevance score
+        and are reported with 0.0, so that they don't count as strong evidence for the retrieval policy.
+        """
+        if not lexical:
+            return ArXivProcessor._filter_by_confidence(vector, confidence_threshold)
+        scores = {doc.id: score for doc, score in vector}
+        lexical_scores = {doc.id: score for doc, score in lexical}
+        documents = {doc.id: doc for doc, _ in vector}
+        documents.update({doc.id: doc for doc, _ in lexical})
+        fused = reciprocal_rank_fusion([[doc.id for doc, _ in vector], [doc.id for doc, _ in lexical]])
+        results = []
+        for chunk_id, _ in fused:
+            relevant = scores.get(chunk_id, -np.inf) >= confidence_threshold
+            if relevant or lexical_scores.get(chunk_id, 0.0) >= lexical_threshold:
+                doc = documents[chunk_id]
+                doc.metadata["relevance_score"] = scores.get(chunk_id, 0.0)
+                results.append(doc)
+        results = results[:k]
+        lexical_only = [d for d in results if scores.get(d.id, -np.inf) < confidence_threshold]
+        report(
+            f"Found {len(results)} relevant chunks (vector above threshold {confidence_threshold} "
+            f"or BM25 above {lexical_threshold}: {len(lexical_only)} by BM25 only)",
+            title=">>> ArXivProcessor",
+            color="yellow",
+            padding=1,
+        )
+        return results
+
+    def centroid_sums(self, ids: Optional[List[str]] = None, batch_size: int = 5000) -> Dict[str, np.ndarray]:
+        """
+        Sum of the normalized chunk embeddings of every source document, over all stored chunks or only `ids`.
+        Normalized, a sum is the direction of the source's mean embedding.
+        """
+        if not self.vector_store:
+            raise ValueError("No ArXiv documents loaded. Run load_and_process first.")
+        sums: Dict[str, np.ndarray] = {}
+        offset = 0
+        while True:
+            if ids is None:
+                batch = self.vector_store.get(include=["embeddings", "metadatas"], limit=batch_size, offset=offset)
+            else:
+                # Chroma rejects an empty id list
+                batch_ids = ids[offset : offset + batch_size]
+                batch = self.vector_store.get(ids=batch_ids, include=["embeddings", "metadatas"]) if batch_ids else None
+            if not batch or not batch["ids"]:
+                break
+            for vector, metadata in zip(batch["embeddings"], batch["metadatas"]):
+                source = (metadata or {}).get("source") or (metadata or {}).get("Section", "")
+                vector = np.asarray(vector, dtype=np.float32)
+                sums[source] = sums.get(source, 0) + vector / (np.linalg.norm(vector) or 1.0)
+            offset += batch_size if ids is not None else len(batch["ids"])
+        return sums
+
+    @staticmethod
+    def _filter_by_confidence(results: List[Tuple[Document, float]], confidence_threshold: float) -> List[Document]:
+        filtered = []
+        for doc, score in results:
+            if score >= confidence_threshold:
+                doc.metadata["relevance_score"] = score
+                filtered.append(doc)
+        report(
+            f"Found {len(filtered)} relevant chunks above threshold {confidence_threshold}",
+            title=">>> ArXivProcessor",
+            color="yellow",
+            padding=1,
         )
         return filtered
 
 
+def _status_message(node: str, update: Dict[str, Any]) -> Optional[str]:
+    if node == "router":
+        return f"Routing decision: {update.get('routing_decision')}"
+    if node == "arxiv_retrieval":
+        return f"Found {len(update.get('arxiv_results') or [])} relevant ArXiv chunks"
+    if node == "web_search":
+        return f"Found {len(update.get('web_results') or [])} web results"
+    return None
+
+
+def _node(name: str, fn: Callable, afn: Callable) -> RunnableLambda:
+    """Graph node with a sync and an async variant, both timed by the instrumentation."""
+    return RunnableLambda(timed_node(name, fn), afunc=timed_node(name, afn))
+
+
 class RAGAgent:
-    def __init__(self, arxiv_links: List[str], force_recreate: bool = False):
-        self.memory = ConversationBufferMemory(return_messages=False, output_key="answer", input_key="question")
-        self.arxiv_processor = ArXivProcessor()
-        self.arxiv_processor.load_and_process(arxiv_links, force_recreate=force_recreate)
-        self.web_searcher = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
-        self.workflow = StateGraph(AgentState)
-        self.workflow.add_node("router", router_node)
-        self.workflow.add_node("arxiv_retrieval", arxiv_retrieval_node)
-        self.workflow.add_node("web_search", web_search_node)
-        self.workflow.add_node("synthesize", synthesize_answer_node)
-        self.workflow.add_node("update_memory", update_memory_node)
-        self.workflow.set_entry_point("router")
-        self.workflow.add_conditional_edges(
-            "router",
-            lambda state: state["routing_decision"],
-            {"arxiv": "arxiv_retrieval", "web": "web_search", "both": "arxiv_retrieval"},
+    def __init__(
+        self,
+        arxiv_links: List[str],
+        force_recreate: bool = False,
+        retrieval_timeout: Optional[float] = None,
+        max_concurrent_turns: int = 16,
+        max_sessions: int = 256,
+        session_ttl: Optional[float] = 3600.0,
+        memory_db_path: Optional[str] = None,
+        clients: Optional[ClientRegistry] = None,
+        local_routing: bool = True,
+        router_config: Optional[RouterConfig] = None,
+        web_cache_ttl: Optional[float] = 3600.0,
+        web_cache_size: int = 512,
+        web_cache_path: Optional[str] = None,
+        memory_recent_turns: int = 3,
+        memory_token_budget: int = 1500,
+        router_history_budget: int = 300,
+        context_token_budget: Optional[int] = 2000,
+        retrieval_mode: str = "hybrid",
+        retrieval_policy: Optional[RetrievalPolicy] = None,
+        semantic_cache_threshold: Optional[float] = 0.95,
+        semantic_cache_size: int = 256,
+        semantic_cache_ttl: Optional[float] = 3600.0,
+        metrics_exporters: Optional[List[Exporter]] = None,
+        quiet: bool = False,
+        persist_directory: str = "./arxiv_db",
+        pdf_cache_dir: Optional[str] = "./pdf_cache",
+        index_path: Optional[str] = None,
+        writable_index: bool = False,
+        vector_backend: str = "chroma",
+        vector_dtype: str = "float32",
+    ):
+        # Status messages of this agent (not of others in the process) are logged instead of shown as boxes
+        self.quiet: Optional[bool] = True if quiet else None
+        # Per-node and per-call latency, tokens, retries and cache hits of every turn
+        self.instrumentation = Instrumentation(exporters=metrics_exporters)
+        # Pooled LLM, embedding and search clients shared by all nodes and sessions
+        self.clients = clients or ClientRegistry()
+        self.retrieval_timeout = retrieval_timeout
+        # Two retrievers per turn ("both" routes fan out to ArXiv and the web), for `max_concurrent_turns` turns
+        self.timeout_runner = TimeoutRunner(max_workers=2 * max_concurrent_turns)
+        # One conversation memory per chat session, bounded in count and idle time. Each keeps its recent
+        # turns verbatim within a token budget; older turns are summarized on a single background thread
+        self.summary_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-summary")
+        summarize = llm_summarizer(self.clients.chat_model("gpt-4o-mini", temperature=0))
+        self.memory_store = SessionMemoryStore(
+            memory_factory=lambda: SummarizingMemory(
+                summarize=summarize,
+                executor=self.summary_executor,
+                recent_turns=memory_recent_turns,
+                token_budget=memory_token_budget,
+                router_token_budget=router_history_budget,
+            ),
+            max_sessions=max_sessions,
+            ttl_seconds=session_ttl,
+            db_path=memory_db_path,
+        )
+        # Retrieval thresholds and when "both" may skip (or "arxiv" fall back to) web search
+        self.retrieval_policy = retrieval_policy or RetrievalPolicy()
+        self.arxiv_processor = ArXivProcessor(
+            embeddings=self.clients.embeddings(),
+            persist_directory=persist_directory,
+            pdf_cache_dir=pdf_cache_dir,
+            retrieval_mode=retrieval_mode,
+            policy=self.retrieval_policy,
+            instrumentation=self.instrumentation,
+            vector_backend=vector_backend,
+            vector_dtype=vector_dtype,
+        )
+        # A prebuilt index artifact, if there is one, is served as is (or, with `writable_index`, from a copy in
+        # `persist_directory` that papers can be added to); otherwise, or if it was built for other settings,
+        # papers are ingested
+        with quiet_reports(self.quiet):
+            artifact = IndexArtifact.load(index_path) if index_path else None
+            problems = self.arxiv_processor.index_mismatches(artifact, arxiv_links) if artifact is not None else []
+            if artifact is not None and not problems:
+                self.arxiv_processor.open_index(
+                    index_path, arxiv_links, copy_to=persist_directory if writable_index else None
+                )
+            else:
+                if problems:
+                    report(
+                        f"The index at {index_path} does not match this agent ({'; '.join(problems)}), "
+                        "ingesting the papers instead",
+                        title=">>> Initialization",
+                        color="yellow",
+                        padding=1,
+                    )
+                    # A copy of an earlier index may hold chunks of another embedding model, so it is rebuilt
+                    if os.path.abspath(persist_directory) != os.path.abspath(index_path):
+                        force_recreate = force_recreate or IndexArtifact.load(persist_directory) is not None
+                self.arxiv_processor.load_and_process(arxiv_links, force_recreate=force_recreate)
+        self.web_searcher = self.clients.web_search()
+        # Cache of web search responses keyed by normalized query and search parameters (None disables it)
+        self.web_cache = (
+            TTLCache(maxsize=web_cache_size, ttl_seconds=web_cache_ttl, db_path=web_cache_path)
+            if web_cache_ttl is not None
+            else None
+        )
+        # Embedding router that answers confident routing cases without an LLM call
+        self.local_router = (
+            EmbeddingRouter(self.clients.embeddings(), self.arxiv_processor.centroid_sums, config=router_config)
+            if local_routing
+            else None
         )
-        self.workflow.add_conditional_edges(
-            "arxiv_retrieval",
-            lambda state: state.get("next_node", "synthesize"),
-            {"web_search": "web_search", "synthesize": "synthesize"},
+        if self.local_router is not None:
+            # Papers added at runtime get centroids of their own
+            self.arxiv_processor.publish_callbacks.append(self.local_router.add_sources)
+            try:
+                self.local_router.warm_up()
+            except Exception as e:
+                # Routing falls back to the LLM until a later request gets the router ready
+                with quiet_reports(self.quiet):
+                    report(f"Local router warm-up failed: {e}", title=">>> Router Node", color="yellow", padding=1)
+        # Answers reused for close rephrasings of a question in the same context (None disables it)
+        self.semantic_cache = (
+            SemanticCache(
+                threshold=semantic_cache_threshold, maxsize=semantic_cache_size, ttl_seconds=semantic_cache_ttl
+            )
+            if semantic_cache_threshold is not None
+            else None
         )
+        # Merges overlapping chunks and keeps a diverse set within the token budget (None disables it)
+        self.context_packer = ContextPacker(token_budget=context_token_budget) if context_token_budget else None
+        self.workflow = StateGraph(AgentState)
+        # Each node has a sync and an async variant; `ask` runs the former, `aask` the latter
+        self.workflow.add_node("router", _node("router", router_node, arouter_node))
+        self.workflow.add_node("arxiv_retrieval", _node("arxiv_retrieval", arxiv_retrieval_node, aarxiv_retrieval_node))
+        self.workflow.add_node("web_search", _node("web_search", web_search_node, aweb_search_node))
+        self.workflow.add_node("synthesize", _node("synthesize", synthesize_answer_node, asynthesize_answer_node))
+        self.workflow.add_node("update_memory", _node("update_memory", update_memory_node, aupdate_memory_node))
+        self.workflow.set_entry_point("router")
+        # "both" fans out to the two retrievers in the same step and synthesize runs once both have finished,
+        # or, with early exit, web search only runs if the ArXiv evidence turns out too weak
+        self.workflow.add_conditional_edges("router", route_retrievers, ["arxiv_retrieval", "web_search"])
+        self.workflow.add_conditional_edges("arxiv_retrieval", after_arxiv, ["web_search", "synthesize"])
         self.workflow.add_edge("web_search", "synthesize")
         self.workflow.add_edge("synthesize", "update_memory")
         self.workflow.add_edge("update_memory", END)
         self.app = self.workflow.compile()
 
-    def ask(self, question: str) -> str:
-        history = self.memory.load_memory_variables({}).get("history", "")
-        initial_state: AgentState = {
+    def _initial_state(self, question: str, memory: Any, embedding: Optional[List[float]] = None) -> AgentState:
+        return {
             "question": question,
+            "question_embedding": embedding,
             "routing_decision": None,
             "arxiv_results": None,
+            "arxiv_scores": None,
             "web_results": None,
             "direct_answer": None,
             "answer": "",
-            "conversation_history": history,
-            "memory": self.memory,
+            "conversation_history": memory.history("synthesis"),
+            "router_history": memory.history("router"),
+            "memory": memory,
             "arxiv_processor": self.arxiv_processor,
             "web_searcher": self.web_searcher,
-            "next_node": None,
+            "clients": self.clients,
+            "local_router": self.local_router,
+            "web_cache": self.web_cache,
+            "context_packer": self.context_packer,
+            "retrieval_policy": self.retrieval_policy,
+            "retrieval_timeout": self.retrieval_timeout,
+            "timeout_runner": self.timeout_runner,
         }
-        result = self.app.invoke(initial_state)
-        if "memory" in result:
-            self.memory = result["memory"]
+
+    def _needs_embedding(self) -> bool:
+        return self.semantic_cache is not None or self.local_router is not None
+
+    def _embed_question(self, question: str) -> Optional[List[float]]:
+        if not self._needs_embedding():
+            return None
+        try:
+            with span("embed_question"):
+                return self.clients.embeddings().embed_query(question)
+        except Exception as e:
+            report(f"Could not embed question: {e}", title=">>> Semantic Cache", color="yellow", padding=1)
+            return None
+
+    async def _aembed_question(self, question: str) -> Optional[List[float]]:
+        if not self._needs_embedding():
+            return None
+        try:
+            with span("embed_question"):
+                return await self.clients.embeddings().aembed_query(question)
+        except Exception as e:
+            report(f"Could not embed question: {e}", title=">>> Semantic Cache", color="yellow", padding=1)
+            return None
+
+    def _cache_key(self, state: AgentState) -> str:
+        return semantic_context_key(state["router_history"], self.arxiv_processor.corpus_version)
+
+    def _cached_answer(self, state: AgentState, key: str) -> Optional[str]:
+        """Answer of a similar earlier question in the same context, recorded as this turn; None on a miss."""
+        if self.semantic_cache is None or not state["question_embedding"]:
+            return None
+        hit = self.semantic_cache.get(state["question_embedding"], key)
+        record_cache("semantic_answer", hit is not None)
+        if hit is None:
+            return None
+        cached, similarity = hit
+        report(
+            f"Served from cache (similarity {similarity:.3f} to: {cached['question']})",
+            title=">>> Semantic Cache",
+            color="green",
+            padding=1,
+        )
+        state["memory"].add_turn(state["question"], cached["answer_body"])
+        return CACHED_ANSWER_MARKER.format(question=cached["question"]) + cached["answer"]
+
+    def _remember_answer(self, state: AgentState, key: str, result: Dict[str, Any]) -> None:
+        if self.semantic_cache is None or not state["question_embedding"]:
+            return
+        if result.get("answer_body", NO_INFORMATION_ANSWER) == NO_INFORMATION_ANSWER:
+            return
+        self.semantic_cache.set(
+            state["question_embedding"],
+            key,
+            {"question": state["question"], "answer": result["answer"], "answer_body": result["answer_body"]},
+        )
+
+    def ask(self, question: str, session_id: str = "default") -> str:
+        # The session's memory is kept live until the turn is recorded in it, even if it is the least recent
+        with (
+            self.instrumentation.turn(session_id),
+            quiet_reports(self.quiet),
+            self.memory_store.using(session_id) as memory,
+        ):
+            return self._ask(question, memory)
+
+    def _ask(self, question: str, memory: Any) -> str:
+        state = self._initial_state(question, memory, self._embed_question(question))
+        key = self._cache_key(state)
+        cached = self._cached_answer(state, key)
+        if cached is not None:
+            return cached
+        result = self.app.invoke(state)
+        self._remember_answer(state, key, result)
         return result.get("answer", "")
 
+    async def aask(self, question: str, session_id: str = "default") -> str:
+        """Async counterpart of `ask` that does not block the caller's event loop."""
+        with (
+            self.instrumentation.turn(session_id),
+            quiet_reports(self.quiet),
+            self.memory_store.using(session_id) as memory,
+        ):
+            return await self._aask(question, memory)
+
+    async def _aask(self, question: str, memory: Any) -> str:
+        state = self._initial_state(question, memory, await self._aembed_question(question))
+        key = self._cache_key(state)
+        cached = self._cached_answer(state, key)
+        if cached is not None:
+            return cached
+        result = await self.app.ainvoke(state)
+        self._remember_answer(state, key, result)
+        return result.get("answer", "")
+
+    async def astream(self, question: str, session_id: str = "default") -> AsyncIterator[Dict[str, str]]:
+        """
+        Answer like `aask`, yielding events as the turn progresses: {"type": "status"} after each step,
+        {"type": "token"} for the answer text as it is generated (header, synthesis tokens, citation
+        footer) and a final {"type": "answer"} with the complete answer.
+        """
+        with (
+            self.instrumentation.turn(session_id),
+            quiet_reports(self.quiet),
+            self.memory_store.using(session_id) as memory,
+        ):
+            async for event in self._astream(question, memory):
+                yield event
+
+    async def _astream(self, question: str, memory: Any) -> AsyncIterator[Dict[str, str]]:
+        state = self._initial_state(question, memory, await self._aembed_question(question))
+        key = self._cache_key(state)
+        cached = self._cached_answer(state, key)
+        if cached is not None:
+            yield {"type": "status", "node": "cache", "content": "Served from cache"}
+            yield {"type": "token", "content": cached}
+            yield {"type": "answer", "content": cached}
+            return
+        answer = ""
+        result: Dict[str, Any] = {}
+        async for mode, chunk in self.app.astream(state, stream_mode=["updates", "messages", "custom"]):
+            if mode == "updates":
+                for node, update in chunk.items():
+                    status = _status_message(node, update or {})
+                    if status:
+                        yield {"type": "status", "node": node, "content": status}
+                    if node == "synthesize":
+                        result = update
+                        answer = update["answer"]
+            elif mode == "custom":
+                for part in ["header", "body", "footer"]:
+                    if chunk.get(part):
+                        yield {"type": "token", "content": chunk[part]}
+            else:
+                message, metadata = chunk
+                if metadata.get("langgraph_node") == "synthesize" and message.content:
+                    yield {"type": "token", "content": message.content}
+        if result:
+            self._remember_answer(state, key, result)
+        yield {"type": "answer", "content": answer}
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters of the agent's fast paths, for monitoring the deployment."""
+        return {
+            "local_router": self.local_router.stats() if self.local_router else None,
+            "web_cache": self.web_cache.stats() if self.web_cache is not None else None,
+            "semantic_cache": self.semantic_cache.stats() if self.semantic_cache is not None else None,
+            "ingestion": self.arxiv_processor.ingestion_stats(),
+            "metrics": self.instrumentation.snapshot(),
+        }
+
+    def add_papers(self, pdf_urls: List[str]) -> "Future[int]":
+        """
+        Add papers (URLs or local PDF files) to the running agent. They are indexed in the background and
+        answer questions once the returned future resolves; see `ArXivProcessor.add_sources`.
+        """
+        with quiet_reports(self.quiet):
+            return self.arxiv_processor.add_sources(pdf_urls)
+
+    async def aadd_papers(self, pdf_urls: List[str]) -> int:
+        """Add papers and wait (without blocking the event loop) until they are searchable."""
+        return await asyncio.wrap_future(self.add_papers(pdf_urls))
+
+    def end_session(self, session_id: str) -> None:
+        """Release the memory of a finished session (spilled to SQLite if configured)."""
+        self.memory_store.release(session_id)
+
 
 if __name__ == "__main__":
-    # Example usage
+    # Example usage: python -m src.main
     agent = RAGAgent(
         arxiv_links=[
             "https://arxiv.org/pdf/2305.10343.pdf",
@@ -0,0 +1,270 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Optional, Set, Tuple
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+Turn = Tuple[str, str]
+Summarizer = Callable[[str, List[Turn]], str]
+
+summary_prompt = ChatPromptTemplate.from_template(
+    """
+    Update the running summary of a conversation between a user and a research assistant.
+    Keep the topics, papers, names and facts the user asked about or was told; leave out formatting.
+    Answer with the updated summary only, in at most a few sentences.
+
+    Current summary: {summary}
+
+    New turns:
+    {turns}
+    """
+)
+
+
+def approximate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English text)."""
+    return (len(text) + 3) // 4
+
+
+def format_turns(turns: List[Turn]) -> str:
+    return "\n".join(f"Human: {question}\nAI: {answer}" for question, answer in turns)
+
+
+def llm_summarizer(llm: BaseChatModel) -> Summarizer:
+    """Summarizer that folds turns into the running summary with `llm`."""
+    chain = summary_prompt | llm | StrOutputParser()
+
+    def summarize(summary: str, turns: List[Turn]) -> str:
+        return chain.invoke({"summary": summary or "(none)", "turns": format_turns(turns)}).strip()
+
+    return summarize
+
+
+class SummarizingMemory:
+    """
+    Conversation memory bounded by a token budget.
+
+    The last `recent_turns` turns are kept verbatim; older turns are folded into a rolling summary by
+    `summarize`, run on `executor` so the request that added the turn does not wait for it. Until the
+    summary is ready the older turns stay verbatim. `history("synthesis")` returns the summary and recent
+    turns within `token_budget`, `history("router")` only the summary and the last turn within
+    `router_token_budget`. Without a summarizer, older turns are dropped.
+    """
+
+    def __init__(
+        self,
+        summarize: Optional[Summarizer] = None,
+        executor: Optional[Executor] = None,
+        recent_turns: int = 3,
+        token_budget: int = 1500,
+        router_token_budget: int = 300,
+        count_tokens: Callable[[str], int] = approximate_tokens,
+    ) -> None:
+        self.summarize = summarize
+        self.executor = executor
+        self.recent_turns = recent_turns
+        self.token_budget = token_budget
+        self.router_token_budget = router_token_budget
+        self.count_tokens = count_tokens
+        self.summary = ""
+        self.turns: List[Turn] = []
+        self._summarizing = False
+        self._lock = threading.Lock()
+
+    def add_turn(self, question: str, answer: str) -> None:
+        with self._lock:
+            self.turns.append((question, answer))
+            older = self.turns[: -self.recent_turns] if len(self.turns) > self.recent_turns else []
+            if not older or self._summarizing:
+                return
+            if self.summarize is None:
+                del self.turns[: len(older)]
+                return
+            self._summarizing = True
+            summary = self.summary
+        if self.executor is None:
+            self._compress(summary, older)
+        else:
+            self.executor.submit(self._compress, summary, older)
+
+    def _compress(self, summary: str, older: List[Turn]) -> None:
+        try:
+            updated = self.summarize(summary, older)
+        except Exception:
+            # Keep the turns verbatim and retry with the next turn
+            updated = None
+        with self._lock:
+            if updated is not None:
+                self.summary = updated
+                del self.turns[: len(older)]
+            self._summarizing = False
+
+    def history(self, view: str = "synthesis") -> str:
+        """Prompt-ready history for the router ("router") or the answer prompt ("synthesis")."""
+        with self._lock:
+            summary = self.summary
+            turns = list(self.turns)
+        if view == "router":
+            budget, turns = self.router_token_budget, turns[-1:]
+        else:
+            budget = self.token_budget
+        header = f"Summary of earlier conversation: {summary}" if summary else ""
+        # Drop the oldest verbatim turns first, then clip whatever still does not fit; the last turn is always
+        # kept, clipped if need be, so that follow-up questions keep their context
+        while len(turns) > 1 and self.count_tokens("\n".join(filter(None, [header, format_turns(turns)]))) > budget:
+            turns = turns[1:]
+        text = "\n".join(filter(None, [header, format_turns(turns)]))
+        while text and self.count_tokens(text) > budget:
+            text = text[len(text) - len(text) * budget // self.count_tokens(text) :]
+        return text
+
+    def dump(self) -> str:
+        with self._lock:
+            return json.dumps({"summary": self.summary, "turns": self.turns})
+
+    def load(self, payload: str) -> None:
+        data = json.loads(payload)
+        with self._lock:
+            self.summary = data.get("summary", "")
+            self.turns = [tuple(turn) for turn in data.get("turns", [])]
+
+
+class SessionMemoryStore:
+    """
+    Conversation memories keyed by session id.
+
+    At most `max_sessions` memories are kept live; the least recently used one is evicted when a new
+    session arrives, and sessions idle for longer than `ttl_seconds` are evicted on the next access.
+    If `db_path` is set, evicted sessions are spilled to SQLite and restored when the session returns,
+    otherwise they are dropped. Sessions in the middle of a turn (see `using`) are not evicted until it ends,
+    so that the turn is not written to a memory that was already spilled.
+    """
+
+    def __init__(
+        self,
+        memory_factory: Callable[[], Any] = SummarizingMemory,
+        max_sessions: int = 256,
+        ttl_seconds: Optional[float] = 3600.0,
+        db_path: Optional[str] = None,
+        dump: Callable[[Any], str] = SummarizingMemory.dump,
+        load: Callable[[Any, str], None] = SummarizingMemory.load,
+    ) -> None:
+        if max_sessions < 1:
+            raise ValueError("max_sessions must be at least 1")
+        self.memory_factory = memory_factory
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.dump = dump
+        self.load = load
+        self._sessions: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        # Turns in progress per session, and sessions released while one was
+        self._pins: Counter = Counter()
+        self._released: Set[str] = set()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (session_id TEXT PRIMARY KEY, payload TEXT, updated_at REAL)"
+            )
+            self._db.commit()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def get(self, session_id: str) -> Any:
+        """Return the memory of `session_id`, restoring it from SQLite or creating it if needed."""
+        with self._lock:
+            return self._get(session_id)
+
+    @contextmanager
+    def using(self, session_id: str) -> Iterator[Any]:
+        """The memory of `session_id`, which is not evicted before the block (e.g. a turn) exits."""
+        with self._lock:
+            memory = self._get(session_id)
+            self._pins[session_id] += 1
+        try:
+            yield memory
+        finally:
+            with self._lock:
+                self._pins[session_id] -= 1
+                if not self._pins[session_id]:
+                    del self._pins[session_id]
+                    if session_id in self._released and session_id in self._sessions:
+                        self._evict(session_id)
+                    self._released.discard(session_id)
+                    self._evict_over_capacity()
+
+    def release(self, session_id: str) -> None:
+        """Evict `session_id` right away (or once its turn in progress ends), e.g. when the chat ends."""
+        with self._lock:
+            if session_id in self._pins:
+                self._released.add(session_id)
+            elif session_id in self._sessions:
+                self._evict(session_id)
+
+    def _get(self, session_id: str) -> Any:
+        now = time.monotonic()
+        self._evict_expired(now)
+        if session_id in self._sessions:
+            memory, _ = self._sessions.pop(session_id)
+        else:
+            memory = self._restore(session_id)
+        self._sessions[session_id] = (memory, now)
+        self._evict_over_capacity(keep=session_id)
+        return memory
+
+    def _evict_over_capacity(self, keep: Optional[str] = None) -> None:
+        """Evict the least recently used sessions beyond `max_sessions`, except those in a turn and `keep`."""
+        for sid in [sid for sid in self._sessions if sid not in self._pins and sid != keep]:
+            if len(self._sessions) <= self.max_sessions:
+                return
+            self._evict(sid)
+
+    def clear(self, session_id: str) -> None:
+        """Forget `session_id` entirely, including any spilled copy."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                self._db.commit()
+
+    def _evict_expired(self, now: float) -> None:
+        if self.ttl_seconds is None:
+            return
+        expired = [
+            sid
+            for sid, (_, last_used) in self._sessions.items()
+            if now - last_used > self.ttl_seconds and sid not in self._pins
+        ]
+        for sid in expired:
+            self._evict(sid)
+
+    def _evict(self, session_id: str) -> None:
+        memory, _ = self._sessions.pop(session_id)
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, payload, updated_at) VALUES (?, ?, ?)",
+                (session_id, self.dump(memory), time.time()),
+            )
+            self._db.commit()
+
+    def _restore(self, session_id: str) -> Any:
+        memory = self.memory_factory()
+        if self._db is not None:
+            row = self._db.execute("SELECT payload FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            if row:
+                self.load(memory, row[0])
+        return memory
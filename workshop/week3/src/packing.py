@@ -0,0 +1,116 @@
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from .memory import approximate_tokens
+
+_WORD = re.compile(r"\w+")
+
+
+def merge_overlap(first: str, second: str, min_overlap: int = 20) -> Optional[str]:
+    """
+    Join two texts if one contains the other or the end of `first` repeats the start of `second`
+    (as neighbouring chunks of the text splitter do); None if they do not overlap.
+    """
+    if second in first:
+        return first
+    if first in second:
+        return second
+    for size in range(min(len(first), len(second)), min_overlap - 1, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+    return None
+
+
+def _terms(text: str) -> frozenset:
+    return frozenset(word.lower() for word in _WORD.findall(text))
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+class ContextPacker:
+    """
+    Turns retrieved ArXiv chunks into a compact synthesis context.
+
+    Overlapping chunks of the same source and page are merged into one passage (keeping the best score),
+    passages are ordered by maximal marginal relevance with lexical (Jaccard) similarity so near-duplicates
+    sink, and passages are taken in that order while they fit in `token_budget`. The best passage is
+    always kept. Retrieval should fetch `fetch_k` candidates so there is something to choose from.
+    Scores are read from the `relevance_score` metadata set by `ArXivProcessor`.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 2000,
+        fetch_k: int = 10,
+        diversity: float = 0.3,
+        min_overlap: int = 20,
+        count_tokens: Callable[[str], int] = approximate_tokens,
+    ) -> None:
+        self.token_budget = token_budget
+        self.fetch_k = fetch_k
+        self.diversity = diversity
+        self.min_overlap = min_overlap
+        self.count_tokens = count_tokens
+
+    def pack(self, chunks: List[Document]) -> List[Document]:
+        passages = self.merge(chunks)
+        packed: List[Document] = []
+        used = 0
+        for passage in self.rank(passages):
+            tokens = self.count_tokens(passage.page_content)
+            if packed and used + tokens > self.token_budget:
+                continue
+            packed.append(passage)
+            used += tokens
+        return packed
+
+    def merge(self, chunks: List[Document]) -> List[Document]:
+        """Merge overlapping chunks of the same source and page, best-scored chunks first."""
+        groups: Dict[Tuple[str, str], List[Document]] = {}
+        for chunk in sorted(chunks, key=_score, reverse=True):
+            key = (str(chunk.metadata.get("source")), str(chunk.metadata.get("page")))
+            passages = groups.setdefault(key, [])
+            current = Document(page_content=chunk.page_content, metadata=dict(chunk.metadata))
+            # A merge can make the passage overlap others of the group, so keep folding until nothing joins
+            merged = True
+            while merged:
+                merged = False
+                for i, passage in enumerate(passages):
+                    text = merge_overlap(passage.page_content, current.page_content, self.min_overlap)
+                    if text is None:
+                        text = merge_overlap(current.page_content, passage.page_content, self.min_overlap)
+                    if text is not None:
+                        del passages[i]
+                        metadata = passage.metadata if _score(passage) >= _score(current) else current.metadata
+                        current = Document(
+                            page_content=text,
+                            metadata={**metadata, "relevance_score": max(_score(passage), _score(current))},
+                        )
+                        merged = True
+                        break
+            passages.append(current)
+        return [passage for passages in groups.values() for passage in passages]
+
+    def rank(self, passages: List[Document]) -> List[Document]:
+        """Order passages by maximal marginal relevance."""
+        terms = [_terms(p.page_content) for p in passages]
+        remaining = list(range(len(passages)))
+        ranked: List[int] = []
+        while remaining:
+
+            def mmr(i: int) -> float:
+                redundancy = max((jaccard(terms[i], terms[j]) for j in ranked), default=0.0)
+                return (1 - self.diversity) * _score(passages[i]) - self.diversity * redundancy
+
+            best = max(remaining, key=mmr)
+            ranked.append(best)
+            remaining.remove(best)
+        return [passages[i] for i in ranked]
+
+
+def _score(doc: Document) -> float:
+    return float(doc.metadata.get("relevance_score", 0.0))
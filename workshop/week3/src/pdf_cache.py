@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+from langchain_core.documents import Document
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class PDFCache:
+    """
+    Local cache of PDFs and their parsed page text.
+
+    PDFs are stored content-addressed under `root/blobs` and `root/index.json` maps each URL to its blob
+    and HTTP validators. Entries older than `max_age` seconds are revalidated with ETag/Last-Modified
+    (a 304 keeps the cached file), and the cached file is used as is when the network is unavailable.
+    Parsed pages are stored per blob under `root/pages`, so re-chunking skips both download and parse.
+    """
+
+    def __init__(
+        self, root: str = "./pdf_cache", max_age: Optional[float] = 86400.0, client: Optional[httpx.Client] = None
+    ) -> None:
+        self.root = root
+        self.max_age = max_age
+        self.client = client
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "revalidated": 0, "downloaded": 0, "offline": 0, "bytes": 0}
+        os.makedirs(os.path.join(root, "blobs"), exist_ok=True)
+        os.makedirs(os.path.join(root, "pages"), exist_ok=True)
+        self._index: Dict[str, Dict[str, Any]] = self._read_index()
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.root, "index.json")
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, "blobs", f"{digest}.pdf")
+
+    def fetch(self, url: str) -> str:
+        """Return the path of a local copy of `url`, downloading or revalidating it if needed."""
+        if os.path.exists(url):
+            return url
+        with self._lock:
+            entry = dict(self._index.get(url, {}))
+        cached = entry and os.path.exists(self.blob_path(entry["sha256"]))
+        if cached and self.max_age is not None and time.time() - entry["checked_at"] < self.max_age:
+            self._count("hits")
+            return self.blob_path(entry["sha256"])
+        headers = {}
+        if cached and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if cached and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        client = self.client or httpx.Client(follow_redirects=True, timeout=120.0)
+        try:
+            with client.stream("GET", url, headers=headers) as response:
+                if cached and response.status_code == 304:
+                    entry["checked_at"] = time.time()
+                    self._update_index(url, entry)
+                    self._count("revalidated")
+                    return self.blob_path(entry["sha256"])
+                response.raise_for_status()
+                path = self._store_blob(response)
+                self._count("downloaded")
+                self._count("bytes", os.path.getsize(path))
+                self._update_index(
+                    url,
+                    {
+                        "sha256": os.path.basename(path)[: -len(".pdf")],
+                        "etag": response.headers.get("etag"),
+                        "last_modified": response.headers.get("last-modified"),
+                        "checked_at": time.time(),
+                    },
+                )
+                return path
+        except httpx.HTTPError:
+            if cached:
+                # Offline or server error: the cached copy is better than failing the rebuild
+                self._count("offline")
+                return self.blob_path(entry["sha256"])
+            raise
+        finally:
+            if self.client is None:
+                client.close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def describe(self) -> str:
+        counts = self.stats()
+        return (
+            f"PDF cache: {counts['hits']} hits, {counts['revalidated']} revalidated, "
+            f"{counts['downloaded']} downloaded ({counts['bytes'] / 1e6:.1f} MB), {counts['offline']} served offline"
+        )
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counts[key] += amount
+
+    def load_pages(self, path: str, source: str) -> List[Document]:
+        """Pages of the PDF at `path`, attributed to `source`; parsed once per PDF content."""
+        digest = os.path.basename(path)[: -len(".pdf")] if self._is_blob(path) else file_sha256(path)
+        pages_path = os.path.join(self.root, "pages", f"{digest}.json")
+        if os.path.exists(pages_path):
+            with open(pages_path, "r", encoding="utf-8") as f:
+                pages = json.load(f)
+        else:
+            from langchain_community.document_loaders import PyPDFLoader
+
+            pages = [{"page": p.metadata["page"], "text": p.page_content} for p in PyPDFLoader(path).load()]
+            self._write_json(pages_path, pages)
+        return [Document(page_content=p["text"], metadata={"source": source, "page": p["page"]}) for p in pages]
+
+    def _is_blob(self, path: str) -> bool:
+        return os.path.dirname(os.path.abspath(path)) == os.path.abspath(os.path.join(self.root, "blobs"))
+
+    def _store_blob(self, response: httpx.Response) -> str:
+        digest = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(dir=self.root, suffix=".part", delete=False) as f:
+            for data in response.iter_bytes():
+                digest.update(data)
+                f.write(data)
+        path = self.blob_path(digest.hexdigest())
+        shutil.move(f.name, path)
+        return path
+
+    def _update_index(self, url: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._index[url] = entry
+            self._write_json(self.index_path, self._index)
+
+    def _read_index(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.index_path):
+            return {}
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_json(self, path: str, payload: Any) -> None:
+        with tempfile.NamedTemporaryFile("w", dir=os.path.dirname(path), suffix=".tmp", delete=False) as f:
+            json.dump(payload, f)
+        os.replace(f.name, path)
@@ -0,0 +1,200 @@
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import httpx
+from langchain_core.documents import Document
+from pydantic import BaseModel
+
+from .chunking import PageChunker
+from .ingestion import content_hash
+from .pdf_cache import PDFCache
+
+
+class ParsedSource(BaseModel):
+    source: str
+    content_hash: str
+    chunks: List[Document]
+    pages: int
+    parse_seconds: float
+    # Same content hash as when the source was last indexed: it was not chunked again and has no chunks here
+    unchanged: bool = False
+
+
+class PipelineStats:
+    """Per-stage counters of an ingestion run, reported as progress and throughput."""
+
+    def __init__(self, total: int) -> None:
+        self.total = total
+        self.started = time.perf_counter()
+        self.downloaded = 0
+        self.download_bytes = 0
+        self.download_seconds = 0.0
+        self.parsed = 0
+        self.pages = 0
+        self.parse_seconds = 0.0
+        self.chunks = 0
+        self.embedded = 0
+        self.embed_seconds = 0.0
+
+    def record_download(self, size: int, seconds: float) -> None:
+        self.downloaded += 1
+        self.download_bytes += size
+        self.download_seconds += seconds
+
+    def record_parse(self, parsed: ParsedSource) -> None:
+        self.parsed += 1
+        self.pages += parsed.pages
+        self.chunks += len(parsed.chunks)
+        self.parse_seconds += parsed.parse_seconds
+
+    def record_embedded(self, chunks: int, seconds: float) -> None:
+        self.embedded += chunks
+        self.embed_seconds += seconds
+
+    def progress(self, parsed: ParsedSource) -> str:
+        chunks = "unchanged" if parsed.unchanged else f"{len(parsed.chunks)} chunks"
+        return f"[{self.parsed}/{self.total}] {parsed.source}: {parsed.pages} pages, {chunks}"
+
+    def summary(self) -> str:
+        wall = time.perf_counter() - self.started
+        return (
+            f"Processed {self.parsed}/{self.total} PDFs in {wall:.1f}s\n"
+            f"Download: {self.download_bytes / 1e6:.1f} MB, {self.download_bytes / 1e6 / max(wall, 1e-9):.2f} MB/s\n"
+            f"Parse + chunk: {self.pages} pages, {self.pages / max(wall, 1e-9):.1f} pages/s "
+            f"({self.parse_seconds:.1f} worker-seconds)\n"
+            f"Chunked: {self.chunks} chunks, {self.chunks / max(wall, 1e-9):.1f} chunks/s\n"
+            f"Embedded: {self.embedded} new chunks, {self.embedded / max(self.embed_seconds, 1e-9):.1f} chunks/s"
+        )
+
+
+def download_pdf(source: str, directory: str, client: httpx.Client) -> Tuple[str, int, float]:
+    """
+    Fetch `source` into `directory`; local files are used in place.
+    Returns (path, bytes downloaded, seconds spent).
+    """
+    if os.path.exists(source):
+        return source, 0, 0.0
+    started = time.perf_counter()
+    path = os.path.join(directory, hashlib.sha256(source.encode("utf-8")).hexdigest() + ".pdf")
+    with client.stream("GET", source) as response:
+        response.raise_for_status()
+        with open(path, "wb") as f:
+            for data in response.iter_bytes():
+                f.write(data)
+    return path, os.path.getsize(path), time.perf_counter() - started
+
+
+_WORKER_CHUNKERS: Dict[str, PageChunker] = {}
+
+
+def parse_and_chunk(
+    source: str,
+    path: str,
+    splitter_config: Dict[str, Any],
+    pdf_cache_dir: Optional[str] = None,
+    known_hash: Optional[str] = None,
+) -> ParsedSource:
+    """
+    Process-pool task: parse one PDF (or read its cached pages) and split it into chunks of `source`, unless
+    its pages hash to `known_hash`.
+    """
+    started = time.perf_counter()
+    key = repr(sorted(splitter_config.items()))
+    if key not in _WORKER_CHUNKERS:
+        _WORKER_CHUNKERS[key] = PageChunker(splitter_config)
+    if pdf_cache_dir:
+        pages = PDFCache(pdf_cache_dir).load_pages(path, source)
+    else:
+        from langchain_community.document_loaders import PyPDFLoader
+
+        pages = PyPDFLoader(path).load()
+        for page in pages:
+            page.metadata["source"] = source
+    digest = content_hash(p.page_content for p in pages)
+    unchanged = digest == known_hash
+    return ParsedSource(
+        source=source,
+        content_hash=digest,
+        chunks=[] if unchanged else _WORKER_CHUNKERS[key].split_pages(pages),
+        pages=len(pages),
+        parse_seconds=time.perf_counter() - started,
+        unchanged=unchanged,
+    )
+
+
+class IngestionPipeline:
+    """
+    Concurrent PDF ingestion: downloads run in a thread pool and parsing/chunking in a process pool.
+
+    `run` yields each paper as soon as it is chunked, so the caller can embed it while the remaining
+    papers are still downloading and parsing, and only one paper's chunks are held at a time.
+    """
+
+    def __init__(
+        self,
+        splitter_config: Dict[str, Any],
+        download_workers: int = 8,
+        parse_workers: Optional[int] = None,
+        pdf_cache_dir: Optional[str] = None,
+    ) -> None:
+        self.splitter_config = splitter_config
+        self.pdf_cache_dir = pdf_cache_dir
+        self.pdf_cache: Optional[PDFCache] = None
+        self.download_workers = download_workers
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self.stats = PipelineStats(total=0)
+
+    def _download(self, source: str, directory: str, client: httpx.Client) -> Tuple[str, int, float]:
+        if self.pdf_cache is None:
+            return download_pdf(source, directory, client)
+        started = time.perf_counter()
+        before = self.pdf_cache.stats()["bytes"]
+        path = self.pdf_cache.fetch(source)
+        return path, self.pdf_cache.stats()["bytes"] - before, time.perf_counter() - started
+
+    def run(self, sources: List[str], known_hashes: Optional[Dict[str, str]] = None) -> Iterator[ParsedSource]:
+        """Ingest `sources`; those whose content hash is in `known_hashes` are yielded unchanged, without chunks."""
+        known_hashes = known_hashes or {}
+        self.stats = PipelineStats(total=len(sources))
+        if not sources:
+            return
+        with (
+            tempfile.TemporaryDirectory() as directory,
+            httpx.Client(follow_redirects=True, timeout=120.0) as client,
+            ThreadPoolExecutor(self.download_workers) as downloads,
+            ProcessPoolExecutor(self.parse_workers, mp_context=multiprocessing.get_context("spawn")) as parsers,
+        ):
+            if self.pdf_cache_dir:
+                self.pdf_cache = PDFCache(self.pdf_cache_dir, client=client)
+            downloading = {downloads.submit(self._download, source, directory, client): source for source in sources}
+            parsing: Dict[Future, str] = {}
+            pending: Set[Future] = set(downloading)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in downloading:
+                        source = downloading.pop(future)
+                        path, size, seconds = future.result()
+                        self.stats.record_download(size, seconds)
+                        parse = parsers.submit(
+                            parse_and_chunk,
+                            source,
+                            path,
+                            self.splitter_config,
+                            self.pdf_cache_dir,
+                            known_hashes.get(source),
+                        )
+                        parsing[parse] = path
+                        pending.add(parse)
+                    else:
+                        path = parsing.pop(future)
+                        if path.startswith(directory):
+                            os.remove(path)
+                        parsed = future.result()
+                        self.stats.record_parse(parsed)
+                        yield parsed
@@ -0,0 +1,35 @@
+from typing import List
+
+from pydantic import BaseModel
+
+
+class RetrievalPolicy(BaseModel):
+    """
+    When ArXiv evidence is enough to answer without web search, and when it is too weak to go without.
+
+    Chunks are retrieved if their relevance score reaches `confidence_threshold`, or in hybrid retrieval if
+    their BM25 score, normalized to [0, 1) (see BM25Index.search), reaches `lexical_threshold`. "both" routes run
+    both retrievers in parallel; with `early_exit`, they search ArXiv first instead and skip the web when the
+    best `min_strong_chunks` chunks all score at least `strong_threshold`, which saves web searches at the cost
+    of serial latency when the web is still needed. With `web_fallback`, "arxiv" routes fall back to web search
+    when no retrieved chunk reaches `confidence_threshold` (none retrieved, or only BM25 hits).
+    """
+
+    confidence_threshold: float = 0.5
+    lexical_threshold: float = 0.35
+    strong_threshold: float = 0.75
+    min_strong_chunks: int = 2
+    early_exit: bool = False
+    web_fallback: bool = True
+
+    def strong_evidence(self, scores: List[float]) -> bool:
+        strong = [score for score in scores if score >= self.strong_threshold]
+        return len(strong) >= self.min_strong_chunks
+
+    def needs_web(self, decision: str, scores: List[float]) -> bool:
+        """Whether a turn routed to `decision` should still search the web after ArXiv returned `scores`."""
+        if decision == "both":
+            return not (self.early_exit and self.strong_evidence(scores))
+        if decision == "arxiv":
+            return self.web_fallback and (not scores or max(scores) < self.confidence_threshold)
+        return decision == "web"
@@ -0,0 +1,196 @@
+import threading
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from pydantic import BaseModel
+
+# Small labeled set of questions whose route is unambiguous
+DEFAULT_ROUTING_EXAMPLES: Dict[str, List[str]] = {
+    "arxiv": [
+        "What method does the paper propose?",
+        "Explain the main theorem proved in the paper.",
+        "What experimental results are reported in the paper?",
+        "How does the proposed model differ from prior work according to the authors?",
+        "What assumptions does the paper make in its analysis?",
+        "Summarize the related work section of the paper.",
+    ],
+    "web": [
+        "What is the weather forecast for tomorrow?",
+        "What are today's top news headlines?",
+        "What is the current stock price of Nvidia?",
+        "Who won the football game last night?",
+        "What is the capital of Australia?",
+        "What time does the store open on Sunday?",
+    ],
+    "both": [
+        "How is the approach from the paper being used in industry today?",
+        "What recent developments build on the method described in the paper?",
+        "Compare the paper's findings with the latest news on this topic.",
+        "Which companies currently apply the techniques discussed in the paper?",
+    ],
+}
+
+
+class RouterConfig(BaseModel):
+    """
+    Cosine similarity thresholds of the EmbeddingRouter.
+
+    The defaults are starting points for OpenAI's text-embedding models, not values calibrated on our traffic.
+    To calibrate them, replay logged questions (without conversation history) through `EmbeddingRouter.decide`
+    and the router LLM, and raise the thresholds until the fast path agrees with the LLM on nearly every
+    question it decides; `EmbeddingRouter.stats()` then tells how many turns skip the LLM in production.
+    """
+
+    # Questions this close to the centroid of a paper go to "arxiv"
+    in_corpus_threshold: float = 0.88
+    # Questions this far from every paper go to "web" if their nearest example is a web question
+    out_of_corpus_threshold: float = 0.74
+    # Otherwise the label of the nearest example wins if it is this close and this far ahead of the others
+    example_threshold: float = 0.93
+    example_margin: float = 0.04
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class EmbeddingRouter:
+    """
+    Local routing stage that decides confident cases without calling the router LLM.
+
+    The question embedding is compared with the corpus centroids (one per source document) and with a
+    small labeled set of example questions. Questions close to the corpus go to "arxiv", questions far
+    from it whose nearest examples are web questions go to "web", and a clear nearest-example label wins
+    otherwise. Anything else returns None so the caller falls back to the LLM router, as do questions asked
+    after earlier turns, which only the LLM sees in context. `stats()` reports how often the fast path fired,
+    to tune the thresholds (see RouterConfig).
+
+    `centroids` returns the sum of the normalized chunk embeddings of every source, over all stored chunks
+    (None) or the given chunk ids. The full scan happens once, on first use; `add_sources` then updates the
+    centroids of newly indexed papers from their own chunks. Call `warm_up` ahead of time (RAGAgent does it
+    while it is built) to keep that work off the first request.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        centroids: Callable[[Optional[List[str]]], Dict[str, np.ndarray]],
+        examples: Optional[Dict[str, Sequence[str]]] = None,
+        config: Optional[RouterConfig] = None,
+    ) -> None:
+        self.embeddings = embeddings
+        self.centroid_provider = centroids
+        self.examples = examples or DEFAULT_ROUTING_EXAMPLES
+        self.config = config or RouterConfig()
+        self._sums: Optional[Dict[str, np.ndarray]] = None
+        self._centroids: Optional[np.ndarray] = None
+        self._example_vectors: Optional[np.ndarray] = None
+        self._example_labels: List[str] = []
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+        # Held while the examples are embedded and the centroids first computed, which happens once
+        self._ready_lock = threading.Lock()
+
+    def refresh(self) -> None:
+        """Recompute the centroids of every source from all stored chunks."""
+        sums = dict(self.centroid_provider(None))
+        with self._lock:
+            self._set_sums(sums)
+
+    def add_sources(self, sources: Dict[str, List[str]]) -> None:
+        """Recompute the centroids of `sources` (source -> all its chunk ids) only, e.g. papers added at runtime."""
+        with self._ready_lock:
+            if self._sums is None:
+                # Not used yet: the first full scan will include them
+                return
+            sums = self.centroid_provider([i for ids in sources.values() for i in ids])
+            with self._lock:
+                self._set_sums({**self._sums, **sums})
+
+    def _set_sums(self, sums: Dict[str, np.ndarray]) -> None:
+        self._sums = sums
+        self._centroids = _normalize(np.stack(list(sums.values())).astype(np.float32)) if sums else None
+
+    @property
+    def ready(self) -> bool:
+        """Whether the examples are embedded and the centroids computed, so `decide` does no I/O of its own."""
+        return self._example_vectors is not None
+
+    def warm_up(self) -> None:
+        """Embed the examples and scan the corpus for centroids now instead of on the first `decide`."""
+        self._ensure_ready()
+
+    def _ensure_ready(self) -> None:
+        if self._example_vectors is not None:
+            return
+        with self._ready_lock:
+            if self._example_vectors is not None:
+                return
+            labels = [label for label, questions in self.examples.items() for _ in questions]
+            texts = [q for questions in self.examples.values() for q in questions]
+            vectors = _normalize(np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32))
+            self.refresh()
+            with self._lock:
+                self._example_labels = labels
+                self._example_vectors = vectors
+
+    def decide(self, embedding: Sequence[float], history: str = "") -> Optional[str]:
+        """
+        Route a question from its embedding, or return None if the case is ambiguous or the question follows
+        earlier turns (`history`).
+        """
+        if self._defers(history):
+            return None
+        self._ensure_ready()
+        query = _normalize(np.asarray(embedding, dtype=np.float32))
+        decision = None
+        with self._lock:
+            centroids = self._centroids
+        corpus_sim = float(np.max(centroids @ query)) if centroids is not None else None
+        label, label_sim, margin = self._nearest_label(query)
+        if corpus_sim is not None and corpus_sim >= self.config.in_corpus_threshold:
+            decision = "arxiv"
+        elif corpus_sim is not None and corpus_sim <= self.config.out_of_corpus_threshold and label == "web":
+            decision = "web"
+        elif label_sim >= self.config.example_threshold and margin >= self.config.example_margin:
+            decision = label
+        with self._lock:
+            self._counts[f"fast_{decision}" if decision else "fallback"] += 1
+        return decision
+
+    def route(self, question: str, history: str = "") -> Optional[str]:
+        if self._defers(history):
+            return None
+        return self.decide(self.embeddings.embed_query(question))
+
+    async def aroute(self, question: str, history: str = "") -> Optional[str]:
+        if self._defers(history):
+            return None
+        return self.decide(await self.embeddings.aembed_query(question))
+
+    def _defers(self, history: str) -> bool:
+        """Follow-ups ("what about the second one?") can't be routed from the question alone."""
+        if not history:
+            return False
+        with self._lock:
+            self._counts["fallback_history"] += 1
+        return True
+
+    def _nearest_label(self, query: np.ndarray) -> Tuple[str, float, float]:
+        sims = self._example_vectors @ query
+        best: Dict[str, float] = {}
+        for label, sim in zip(self._example_labels, sims):
+            best[label] = max(best.get(label, -1.0), float(sim))
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)
+        runner_up = ranked[1][1] if len(ranked) > 1 else -1.0
+        return ranked[0][0], ranked[0][1], ranked[0][1] - runner_up
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            counts = dict(self._counts)
+        total = sum(counts.values())
+        fast = sum(count for key, count in counts.items() if key.startswith("fast_"))
+        return {**counts, "total": total, "fast_path_rate": fast / total if total else 0.0}
@@ -0,0 +1,59 @@
+import os
+from typing import Any, Callable, List
+
+import pytest
+
+from benchmarks.corpus import write_pdf
+from benchmarks.fakes import BenchmarkRegistry, HashingEmbeddings
+from src.instrumentation import set_quiet
+from src.main import ArXivProcessor, RAGAgent
+
+# Pages with the function words of real papers, so that stopword-only matches are possible
+PAGES = [
+    [
+        "The proof of the main theorem is given in the appendix of the paper.",
+        "We show that the error of the estimator is bounded by the noise of the samples.",
+    ],
+    [
+        "A diffusion policy is trained on robot trajectories.",
+        "RLHF fine-tuning of the policy uses RLHF preference data collected from the operators.",
+    ],
+]
+
+
+@pytest.fixture(scope="session", autouse=True)
+def quiet() -> None:
+    set_quiet()
+
+
+@pytest.fixture
+def papers(tmp_path) -> List[str]:
+    paths = []
+    for i in range(2):
+        path = os.path.join(tmp_path, f"paper-{i}.pdf")
+        write_pdf(path, PAGES)
+        paths.append(path)
+    return paths
+
+
+@pytest.fixture
+def processor(tmp_path, papers) -> ArXivProcessor:
+    processor = ArXivProcessor(
+        embeddings=HashingEmbeddings(), persist_directory=os.path.join(tmp_path, "db"), pdf_cache_dir=None
+    )
+    processor.load_and_process(papers)
+    return processor
+
+
+@pytest.fixture
+def make_agent(tmp_path, papers) -> Callable[..., RAGAgent]:
+    """RAGAgent over `papers` with the benchmarks' instant fake LLM, embedding and search clients."""
+
+    def make(**kwargs: Any) -> RAGAgent:
+        registry = BenchmarkRegistry(llm_latency=0, router_latency=0, embed_latency=0, search_latency=0)
+        options: dict = dict(
+            arxiv_links=papers, persist_directory=os.path.join(tmp_path, "agent_db"), pdf_cache_dir=None, quiet=True
+        )
+        return RAGAgent(clients=registry, **{**options, **kwargs})
+
+    return make
@@ -0,0 +1,44 @@
+import os
+import time
+
+from src.cache import TTLCache
+
+
+def test_entries_expire_after_ttl():
+    cache = TTLCache(ttl_seconds=0.05)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_are_read_back_from_sqlite(tmp_path):
+    path = os.path.join(tmp_path, "cache.db")
+    cache = TTLCache(maxsize=2, db_path=path)
+    cache.set("a", {"results": ["x"]})
+    cache.set("b", {"results": ["y"]})
+    cache.get("a")
+    cache.set("c", {"results": ["z"]})
+    # "b" is the least recently used in memory but among the most recently stored on disk
+    assert cache.stats()["size"] == 2
+    assert cache.get("b") == {"results": ["y"]}
+    assert TTLCache(db_path=path).get("c") == {"results": ["z"]}
+
+
+def test_expired_entries_are_not_read_back_from_sqlite(tmp_path):
+    path = os.path.join(tmp_path, "cache.db")
+    TTLCache(ttl_seconds=0.05, db_path=path).set("a", 1)
+    time.sleep(0.1)
+    assert TTLCache(db_path=path).get("a") is None
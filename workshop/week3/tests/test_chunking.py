@@ -0,0 +1,39 @@
+import os
+
+import pytest
+from langchain_core.documents import Document
+
+from benchmarks.chunking import load_pages, same_chunks, two_stage_chunks
+from benchmarks.corpus import make_corpus
+from src.chunking import DEFAULT_SPLITTER_CONFIG, PageChunker
+
+LONG = " ".join(f"Sentence {i} about reward models and policy optimization." for i in range(120))
+
+# Page texts with what the header splitter normalizes: surrounding whitespace, blank lines, markdown headers
+TEXTS = [
+    "",
+    "   \n  \n",
+    "A single line.",
+    "  Indented line  \n\nNext paragraph\n\n\nAfter two blank lines",
+    "# Heading in the text\nBody under it\n## Subheading\nMore body\n### Third level\nEnd",
+    "#NotAHeader and a #hashtag\n####### Too deep",
+    "Code:\n```\n# comment, not a header\n```\nAfter the code",
+    LONG,
+    LONG.replace(". ", ".\n\n"),
+]
+
+
+@pytest.mark.parametrize("config", [DEFAULT_SPLITTER_CONFIG, {"chunk_size": 200, "chunk_overlap": 40}])
+def test_page_chunker_matches_two_stage_splitting(config):
+    pages = [
+        Document(page_content=text, metadata={"source": f"paper-{i % 2}.pdf", "page": i})
+        for i, text in enumerate(TEXTS)
+    ]
+    assert same_chunks(two_stage_chunks(pages, config), PageChunker(config).split_pages(pages))
+
+
+def test_page_chunker_matches_two_stage_splitting_on_parsed_pdfs(tmp_path):
+    pages = load_pages(make_corpus(os.path.join(tmp_path, "papers"), papers=2, pages=3))
+    chunks = PageChunker(DEFAULT_SPLITTER_CONFIG).split_pages(pages)
+    assert chunks
+    assert same_chunks(two_stage_chunks(pages, DEFAULT_SPLITTER_CONFIG), chunks)
@@ -0,0 +1,96 @@
+import threading
+import time
+
+import pytest
+
+from src.main import TimeoutRunner, after_arxiv, arxiv_retrieval_node, route_retrievers
+from src.policy import RetrievalPolicy
+
+
+def routing_state(decision: str, scores=None, early_exit: bool = False) -> dict:
+    return {
+        "routing_decision": decision,
+        "arxiv_scores": scores,
+        "retrieval_policy": RetrievalPolicy(early_exit=early_exit),
+    }
+
+
+@pytest.mark.parametrize(
+    "decision, early_exit, retrievers",
+    [
+        ("both", False, ["arxiv_retrieval", "web_search"]),
+        ("both", True, ["arxiv_retrieval"]),
+        ("arxiv", False, ["arxiv_retrieval"]),
+        ("web", False, ["web_search"]),
+    ],
+)
+def test_route_retrievers_fans_out(decision, early_exit, retrievers):
+    assert route_retrievers(routing_state(decision, early_exit=early_exit)) == retrievers
+
+
+@pytest.mark.parametrize(
+    "decision, scores, early_exit, next_node",
+    [
+        # The web search already runs in parallel
+        ("both", [0.1], False, "synthesize"),
+        ("both", [0.9, 0.8], True, "synthesize"),
+        ("both", [0.9, 0.6], True, "web_search"),
+        ("arxiv", [0.7], False, "synthesize"),
+        ("arxiv", [0.2], False, "web_search"),
+        ("arxiv", None, False, "web_search"),
+    ],
+)
+def test_after_arxiv(decision, scores, early_exit, next_node):
+    assert after_arxiv(routing_state(decision, scores, early_exit)) == next_node
+
+
+def test_timeout_runner_gives_up_on_slow_calls():
+    runner = TimeoutRunner(max_workers=2)
+    release = threading.Event()
+    started = time.perf_counter()
+    with pytest.raises(TimeoutError):
+        runner.call(release.wait, timeout=0.05)
+    assert time.perf_counter() - started < 1.0
+    assert runner.call(lambda: 42, timeout=1.0) == 42
+    release.set()
+
+
+def test_stragglers_dont_make_new_calls_wait_past_their_timeout():
+    runner = TimeoutRunner(max_workers=2)
+    release = threading.Event()
+    for _ in range(2):
+        with pytest.raises(TimeoutError):
+            runner.call(release.wait, timeout=0.01)
+    # Both workers are held by stragglers: the call fails at once instead of queueing
+    started = time.perf_counter()
+    with pytest.raises(TimeoutError):
+        runner.call(lambda: 42, timeout=5.0)
+    assert time.perf_counter() - started < 1.0
+    release.set()
+    deadline = time.monotonic() + 5.0
+    while time.monotonic() < deadline:
+        try:
+            assert runner.call(lambda: 42, timeout=1.0) == 42
+            break
+        except TimeoutError:
+            time.sleep(0.01)
+    else:
+        pytest.fail("workers were not released after the stragglers returned")
+
+
+class SlowProcessor:
+    def retrieve(self, question: str, k: int = 5):
+        time.sleep(1.0)
+        return []
+
+
+def test_arxiv_retrieval_times_out_with_no_chunks():
+    state = {
+        "question": "q",
+        "arxiv_processor": SlowProcessor(),
+        "retrieval_timeout": 0.05,
+        "timeout_runner": TimeoutRunner(max_workers=2),
+    }
+    started = time.perf_counter()
+    assert arxiv_retrieval_node(state) == {"arxiv_results": [], "arxiv_scores": []}
+    assert time.perf_counter() - started < 0.5
@@ -0,0 +1,27 @@
+import asyncio
+
+from benchmarks.fakes import HashingEmbeddings
+from src.flat_index import FlatIndex
+
+
+def make_index(tmp_path) -> FlatIndex:
+    index = FlatIndex(persist_directory=str(tmp_path), embedding_function=HashingEmbeddings())
+    index.add_texts(["robot policy", "theorem proof", "noise samples"], ids=["a", "b", "c"])
+    return index
+
+
+def test_searches_take_the_vector_store_arguments(tmp_path):
+    index = make_index(tmp_path)
+    positional = index.similarity_search_with_score("robot policy", 2)
+    keywords = index.similarity_search_with_score(query="robot policy", k=2, filter={"source": "x"})
+    assert [doc.id for doc, _ in positional] == [doc.id for doc, _ in keywords]
+    assert positional[0][0].id == "a"
+    assert len(positional) == 2
+    hits = asyncio.run(index.asimilarity_search_with_score("robot policy", k=1))
+    assert [doc.id for doc, _ in hits] == ["a"]
+
+
+def test_relevance_scores(tmp_path):
+    [(doc, score)] = make_index(tmp_path).similarity_search_with_relevance_scores("robot policy", k=1)
+    assert doc.id == "a"
+    assert score > 0.99
@@ -0,0 +1,65 @@
+import os
+from typing import Any, Dict, List
+
+from langchain_core.messages import AIMessage
+
+from evals.utils import GradeCache, Grader
+
+
+class FakeJudge:
+    """Judge model that answers every request with the next of `replies` (lists of grades)."""
+
+    def __init__(self, replies: List[List[Dict[str, Any]]]) -> None:
+        self.replies = list(replies)
+        self.requests: List[List[Dict[str, Any]]] = []
+
+    def bind_tools(self, tools: Any, tool_choice: str) -> "FakeJudge":
+        return self
+
+    def invoke(self, messages: List[Dict[str, Any]]) -> AIMessage:
+        self.requests.append(messages)
+        grades = self.replies.pop(0)
+        return AIMessage(content="", tool_calls=[{"name": "Grades", "args": {"grades": grades}, "id": "call"}])
+
+
+def test_batch_grades_are_matched_by_index():
+    judge = FakeJudge([[{"index": 1, "score": False}, {"index": 0, "score": True}, {"index": 2, "score": True}]])
+    grader = Grader(model=judge, batch_size=8)
+    assert grader.grade_many([("a", "a"), ("b", "c"), ("d", "d")]) == [True, False, True]
+    assert len(judge.requests) == 1
+    assert judge.requests[0][-1]["content"].startswith("Grade each of the following 3 items.")
+
+
+def test_items_skipped_by_the_judge_are_graded_on_their_own():
+    judge = FakeJudge([[{"index": 0, "score": True}], [{"index": 0, "score": False}]])
+    grader = Grader(model=judge)
+    assert grader.grade_many([("a", "a"), ("b", "c")]) == [True, False]
+    assert len(judge.requests) == 2
+
+
+def test_pairs_are_split_into_batches():
+    judge = FakeJudge([[{"index": 0, "score": True}, {"index": 1, "score": True}], [{"index": 0, "score": False}]])
+    grader = Grader(model=judge, batch_size=2)
+    assert grader.grade_many([("a", "a"), ("b", "b"), ("c", "d")]) == [True, True, False]
+    assert len(judge.requests) == 2
+
+
+def test_cached_grades_are_not_judged_again(tmp_path):
+    cache = GradeCache(os.path.join(tmp_path, "grades.sqlite"))
+    judge = FakeJudge([[{"index": 0, "score": True}, {"index": 1, "score": False}], [{"index": 0, "score": True}]])
+    grader = Grader(model=judge, cache=cache)
+    assert grader.grade_many([("a", "a"), ("b", "c")]) == [True, False]
+    # Only the new response is sent to the judge; a duplicate pair is judged once
+    assert Grader(model=judge, cache=cache).grade_many([("b", "c"), ("e", "e"), ("e", "e")]) == [False, True, True]
+    assert len(judge.requests) == 2
+    assert not judge.replies
+
+
+def test_grade_keys_depend_on_the_prompt_reference_and_response():
+    grader = Grader(model=FakeJudge([]))
+    key = grader.key("reference", "response")
+    assert key == Grader(model=FakeJudge([])).key("reference", "response")
+    assert key != grader.key("reference", "other response")
+    assert key != grader.key("other reference", "response")
+    strict = grader.prompt.model_copy(update={"system_prompt": grader.prompt.system_prompt + " Be strict."})
+    assert Grader(prompt=strict, model=FakeJudge([])).key("reference", "response") != key
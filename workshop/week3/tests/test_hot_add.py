@@ -0,0 +1,51 @@
+import os
+
+import pytest
+from langchain_core.documents import Document
+
+from benchmarks.fakes import HashingEmbeddings
+from src.build_index import build_index
+from src.main import ArXivProcessor
+
+
+@pytest.fixture
+def index_path(tmp_path, papers) -> str:
+    path = os.path.join(tmp_path, "index")
+    build_index(path, papers[:1], embeddings=HashingEmbeddings())
+    return path
+
+
+def open_processor(tmp_path, index_path, papers, copy_to=None) -> ArXivProcessor:
+    processor = ArXivProcessor(
+        embeddings=HashingEmbeddings(), persist_directory=os.path.join(tmp_path, "db"), pdf_cache_dir=None
+    )
+    processor.open_index(index_path, papers[:1], copy_to=copy_to)
+    return processor
+
+
+def test_hot_add_to_a_read_only_index_raises(tmp_path, index_path, papers):
+    processor = open_processor(tmp_path, index_path, papers)
+    with pytest.raises(ValueError, match="prebuilt artifact"):
+        processor.add_sources(papers[1:])
+
+
+def test_hot_add_to_a_copy_of_the_index(tmp_path, index_path, papers):
+    copy = os.path.join(tmp_path, "copy")
+    processor = open_processor(tmp_path, index_path, papers, copy_to=copy)
+    assert processor.add_sources(papers[1:]).result() == 1
+    sources = {hit.metadata["source"] for hit in processor.retrieve("RLHF", confidence_threshold=0.0, k=10)}
+    assert sources == set(papers)
+    # The artifact itself is left as built
+    assert open_processor(tmp_path, index_path, papers).manifest.sources.keys() == {papers[0]}
+
+
+def test_chunks_of_an_unpublished_generation_dont_shorten_results(processor):
+    # Closer to the question than any published chunk, as a paper being indexed could be
+    staged = [
+        Document(page_content=f"RLHF preference data {i}", metadata={"source": "staged.pdf", "generation": 1})
+        for i in range(20)
+    ]
+    processor.vector_store.add_documents(staged)
+    hits = processor.retrieve("RLHF preference data", confidence_threshold=-1.0, k=3, mode="vector")
+    assert len(hits) == 3
+    assert all(hit.metadata.get("generation", 0) == 0 for hit in hits)
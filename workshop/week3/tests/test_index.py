@@ -0,0 +1,48 @@
+import logging
+import os
+
+import pytest
+
+from benchmarks.fakes import HashingEmbeddings
+from src.build_index import build_index
+from src.ingestion import INDEX_ARTIFACT_FILENAME
+
+
+@pytest.fixture
+def index_path(tmp_path, papers) -> str:
+    path = os.path.join(tmp_path, "index")
+    build_index(path, papers[:1], embeddings=HashingEmbeddings())
+    return path
+
+
+def test_matching_index_is_served(make_agent, index_path, papers):
+    agent = make_agent(arxiv_links=papers[:1], index_path=index_path)
+    assert agent.arxiv_processor.read_only
+    assert agent.arxiv_processor.persist_directory == index_path
+
+
+def test_mismatched_index_falls_back_to_ingestion(make_agent, index_path, papers, caplog):
+    caplog.set_level(logging.INFO)
+    agent = make_agent(arxiv_links=papers, index_path=index_path)
+    assert not agent.arxiv_processor.read_only
+    assert agent.arxiv_processor.persist_directory != index_path
+    assert agent.arxiv_processor.manifest.sources.keys() == set(papers)
+    assert "does not match this agent" in caplog.text
+
+
+def test_stale_copy_of_a_mismatched_index_is_rebuilt(make_agent, tmp_path, papers):
+    # Chroma can't reopen a directory deleted in the same process, so this uses the flat backend
+    index_path = os.path.join(tmp_path, "flat_index")
+    build_index(index_path, papers[:1], embeddings=HashingEmbeddings(), vector_backend="flat")
+    options = dict(index_path=index_path, writable_index=True, vector_backend="flat")
+    copy = make_agent(arxiv_links=papers[:1], **options).arxiv_processor
+    assert not copy.read_only and copy.persist_directory != index_path
+    assert os.path.exists(os.path.join(copy.persist_directory, INDEX_ARTIFACT_FILENAME))
+    agent = make_agent(arxiv_links=papers[1:], **options)
+    assert agent.arxiv_processor.manifest.sources.keys() == {papers[1]}
+    assert not os.path.exists(os.path.join(agent.arxiv_processor.persist_directory, INDEX_ARTIFACT_FILENAME))
+
+
+def test_failed_ingestion_after_a_mismatch_raises(make_agent, index_path, tmp_path):
+    with pytest.raises(ValueError, match="missing.pdf"):
+        make_agent(arxiv_links=[os.path.join(tmp_path, "missing.pdf")], index_path=index_path)
@@ -0,0 +1,37 @@
+from src.ingestion import IngestionManifest, SourceRecord
+
+
+def test_corpus_version_is_cached_until_save(tmp_path, monkeypatch):
+    manifest = IngestionManifest(splitter={"chunk_size": 1000})
+    manifest.sources["a.pdf"] = SourceRecord(chunk_ids=["1", "2"])
+    version = manifest.corpus_version
+
+    def fail() -> str:
+        raise AssertionError("corpus version hashed again")
+
+    monkeypatch.setattr(manifest, "_hash_corpus", fail)
+    assert manifest.corpus_version == version
+    monkeypatch.undo()
+
+    manifest.sources["b.pdf"] = SourceRecord(chunk_ids=["3"])
+    assert manifest.corpus_version == version
+    manifest.save(str(tmp_path))
+    assert manifest.corpus_version != version
+    assert IngestionManifest.load(str(tmp_path)).corpus_version == manifest.corpus_version
+
+
+def test_corpus_version_follows_published_copies(tmp_path):
+    manifest = IngestionManifest()
+    version = manifest.corpus_version
+    staged = manifest.model_copy(deep=True)
+    staged.sources["a.pdf"] = SourceRecord(chunk_ids=["1"])
+    staged.save(str(tmp_path))
+    assert manifest.corpus_version == version
+    assert staged.corpus_version != version
+
+
+def test_corpus_version_is_current_after_ingestion(processor, papers):
+    version = processor.corpus_version
+    processor.load_and_process(papers[:1])
+    assert processor.corpus_version != version
+    assert processor.corpus_version == IngestionManifest.load(processor.persist_directory).corpus_version
@@ -0,0 +1,71 @@
+import asyncio
+import os
+import threading
+
+from src.instrumentation import Instrumentation, JSONLinesExporter, PrometheusExporter, TurnRecord
+
+
+class BlockingExporter:
+    """Exporter that records the thread it ran on and waits for `release`."""
+
+    def __init__(self) -> None:
+        self.release = threading.Event()
+        self.threads = []
+        self.turns = []
+
+    def export(self, turn: TurnRecord, instrumentation: Instrumentation) -> None:
+        self.release.wait(5)
+        self.threads.append(threading.current_thread())
+        self.turns.append(turn.session_id)
+
+
+def test_exports_run_off_the_event_loop_in_turn_order():
+    exporter = BlockingExporter()
+    instrumentation = Instrumentation(exporters=[exporter])
+
+    async def turns() -> None:
+        for session_id in ["a", "b"]:
+            with instrumentation.turn(session_id):
+                await asyncio.sleep(0)
+
+    # The turns end while the exporter is still blocked
+    asyncio.run(turns())
+    assert not exporter.turns
+    exporter.release.set()
+    instrumentation.flush(5)
+    assert exporter.turns == ["a", "b"]
+    assert threading.current_thread() not in exporter.threads
+
+
+def test_file_exporters_write_after_flush(tmp_path):
+    jsonl, prom = os.path.join(tmp_path, "turns.jsonl"), os.path.join(tmp_path, "metrics.prom")
+    instrumentation = Instrumentation(exporters=[JSONLinesExporter(jsonl), PrometheusExporter(prom)])
+    with instrumentation.turn("session"):
+        pass
+    instrumentation.flush(5)
+    with open(jsonl, encoding="utf-8") as f:
+        assert TurnRecord.model_validate_json(f.readline()).session_id == "session"
+    with open(prom, encoding="utf-8") as f:
+        assert "rag_turn_seconds_count 1" in f.read()
+
+
+def test_failed_exports_do_not_fail_the_turn(caplog):
+    class Failing:
+        def export(self, turn: TurnRecord, instrumentation: Instrumentation) -> None:
+            raise OSError("disk full")
+
+    instrumentation = Instrumentation(exporters=[Failing()])
+    with instrumentation.turn():
+        pass
+    instrumentation.flush(5)
+    assert "Metrics export failed: disk full" in caplog.text
+
+
+def test_reset_clears_the_metrics_shared_with_the_processor(make_agent):
+    agent = make_agent()
+    assert agent.arxiv_processor.instrumentation is agent.instrumentation
+    agent.instrumentation.increment("rag_ingested_sources_total")
+    agent.instrumentation.reset()
+    assert agent.instrumentation.snapshot() == {"histograms": {}, "counters": {}, "gauges": {}}
+    agent.ask("How is the diffusion policy trained?")
+    assert "rag_turn_seconds" in agent.instrumentation.snapshot()["histograms"]
@@ -0,0 +1,32 @@
+import pytest
+
+from src.lazy import LazyAgent
+
+
+def flaky_factory(failures: int):
+    calls = []
+
+    def factory() -> str:
+        calls.append(None)
+        if len(calls) <= failures:
+            raise RuntimeError("vector store unavailable")
+        return "agent"
+
+    return factory
+
+
+def test_failed_construction_is_retried():
+    agent = LazyAgent(flaky_factory(failures=2), retries=2, retry_delay=0.0)
+    assert agent.get() == "agent"
+    assert agent.status()["attempts"] == 3
+    assert agent.status()["error"] is None
+
+
+def test_error_is_reported_once_retries_are_exhausted():
+    agent = LazyAgent(flaky_factory(failures=3), retries=1, retry_delay=0.0)
+    agent.warm_up()
+    with pytest.raises(RuntimeError):
+        agent.get(timeout=5)
+    assert not agent.ready
+    assert agent.status()["attempts"] == 2
+    assert "vector store unavailable" in agent.status()["error"]
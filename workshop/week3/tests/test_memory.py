@@ -0,0 +1,128 @@
+import os
+import time
+
+from src.memory import SessionMemoryStore, SummarizingMemory, approximate_tokens
+
+
+def test_least_recently_used_session_is_evicted():
+    store = SessionMemoryStore(max_sessions=2)
+    first = store.get("a")
+    store.get("b")
+    store.get("a")
+    store.get("c")
+    assert "b" not in store
+    assert "a" in store and "c" in store
+    assert store.get("a") is first
+
+
+def test_idle_sessions_expire():
+    store = SessionMemoryStore(ttl_seconds=0.05)
+    store.get("a")
+    time.sleep(0.1)
+    store.get("b")
+    assert "a" not in store
+
+
+def test_evicted_sessions_are_spilled_and_restored(tmp_path):
+    path = os.path.join(tmp_path, "sessions.db")
+    store = SessionMemoryStore(max_sessions=1, db_path=path)
+    store.get("a").add_turn("What is RLHF?", "Reinforcement learning from human feedback.")
+    store.get("b")
+    assert "a" not in store
+    assert store.get("a").turns == [("What is RLHF?", "Reinforcement learning from human feedback.")]
+    # Spilled sessions survive the store itself
+    store.release("a")
+    assert SessionMemoryStore(db_path=path).get("a").turns == [
+        ("What is RLHF?", "Reinforcement learning from human feedback.")
+    ]
+
+
+def test_session_in_a_turn_is_not_evicted_until_the_turn_ends(tmp_path):
+    store = SessionMemoryStore(max_sessions=1, db_path=os.path.join(tmp_path, "sessions.db"))
+    with store.using("a") as memory:
+        # Another session arrives mid-turn
+        store.get("b")
+        assert "a" in store
+        memory.add_turn("question", "answer")
+    assert "a" not in store
+    assert store.get("a").turns == [("question", "answer")]
+
+
+def test_released_session_is_evicted_once_its_turn_ends():
+    store = SessionMemoryStore()
+    with store.using("a"):
+        store.release("a")
+        assert "a" in store
+    assert "a" not in store
+
+
+def test_older_turns_are_summarized():
+    calls = []
+
+    def summarize(summary, turns):
+        calls.append((summary, list(turns)))
+        return f"{summary} {' '.join(q for q, _ in turns)}".strip()
+
+    memory = SummarizingMemory(summarize=summarize, recent_turns=2)
+    for i in range(2):
+        memory.add_turn(f"q{i}", f"a{i}")
+    assert not calls
+    memory.add_turn("q2", "a2")
+    assert calls == [("", [("q0", "a0")])]
+    assert memory.summary == "q0"
+    assert memory.turns == [("q1", "a1"), ("q2", "a2")]
+    assert memory.history().startswith("Summary of earlier conversation: q0")
+
+
+def test_failed_summary_keeps_the_turns_verbatim():
+    def summarize(summary, turns):
+        raise RuntimeError("LLM unavailable")
+
+    memory = SummarizingMemory(summarize=summarize, recent_turns=1)
+    memory.add_turn("q0", "a0")
+    memory.add_turn("q1", "a1")
+    assert memory.summary == ""
+    assert memory.turns == [("q0", "a0"), ("q1", "a1")]
+
+
+def words(text: str) -> int:
+    return len(text.split())
+
+
+def test_history_drops_the_oldest_turns_to_fit_the_budget():
+    memory = SummarizingMemory(recent_turns=10, token_budget=8, count_tokens=words)
+    for i in range(3):
+        memory.add_turn(f"q{i}", f"a{i}")
+    # Each turn is "Human: q AI: a", four words
+    assert memory.history() == "Human: q1\nAI: a1\nHuman: q2\nAI: a2"
+    assert words(memory.history()) <= memory.token_budget
+
+
+def test_history_clips_the_last_turn_from_the_front():
+    memory = SummarizingMemory(token_budget=10)
+    memory.add_turn("q", "x" * 100)
+    history = memory.history()
+    assert approximate_tokens(history) <= 10
+    assert history.endswith("x" * 30)
+
+
+def test_router_history_is_the_summary_and_last_turn_within_its_budget():
+    memory = SummarizingMemory(
+        summarize=lambda summary, turns: "earlier", recent_turns=2, router_token_budget=9, count_tokens=words
+    )
+    memory.add_turn("q0", "a0")
+    memory.add_turn("q1", "a1")
+    memory.add_turn("q2", "a2")
+    assert memory.history("router") == "Summary of earlier conversation: earlier\nHuman: q2\nAI: a2"
+    assert "q1" in memory.history()
+    memory.router_token_budget = 4
+    assert words(memory.history("router")) <= 4
+    assert memory.history("router").endswith("Human: q2\nAI: a2")
+
+
+def test_without_a_summarizer_older_turns_are_dropped():
+    memory = SummarizingMemory(recent_turns=2)
+    for i in range(4):
+        memory.add_turn(f"q{i}", f"a{i}")
+    assert memory.turns == [("q2", "a2"), ("q3", "a3")]
+    assert memory.summary == ""
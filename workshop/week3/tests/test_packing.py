@@ -0,0 +1,64 @@
+from langchain_core.documents import Document
+
+from src.packing import ContextPacker, merge_overlap
+
+
+def chunk(text: str, score: float, source: str = "a.pdf", page: int = 0) -> Document:
+    return Document(page_content=text, metadata={"source": source, "page": page, "relevance_score": score})
+
+
+def words(text: str) -> int:
+    return len(text.split())
+
+
+def test_merge_overlap_joins_repeated_boundaries():
+    assert merge_overlap("one two three four", "three four five", min_overlap=5) == "one two three four five"
+    assert merge_overlap("one two three", "two", min_overlap=5) == "one two three"
+    assert merge_overlap("one two", "three four", min_overlap=5) is None
+
+
+def test_overlapping_chunks_of_a_page_merge_into_one_passage():
+    packer = ContextPacker(min_overlap=5)
+    passages = packer.merge(
+        [
+            chunk("alpha beta gamma delta", 0.5),
+            chunk("gamma delta epsilon zeta", 0.9),
+            # Same text on another page is a separate passage
+            chunk("gamma delta epsilon zeta", 0.4, page=1),
+        ]
+    )
+    assert [p.page_content for p in passages] == ["alpha beta gamma delta epsilon zeta", "gamma delta epsilon zeta"]
+    assert passages[0].metadata["relevance_score"] == 0.9
+
+
+def test_near_duplicates_rank_below_diverse_passages():
+    packer = ContextPacker(diversity=0.5)
+    ranked = packer.rank(
+        [
+            chunk("policy gradient with human feedback", 0.9, page=0),
+            chunk("policy gradient with human feedback rewards", 0.85, page=1),
+            chunk("diffusion models for robot control", 0.7, page=2),
+        ]
+    )
+    assert [p.metadata["page"] for p in ranked] == [0, 2, 1]
+    # Without diversity the order is by score
+    assert [p.metadata["page"] for p in ContextPacker(diversity=0.0).rank(ranked)] == [0, 1, 2]
+
+
+def test_pack_keeps_passages_within_the_token_budget():
+    packer = ContextPacker(token_budget=6, diversity=0.0, count_tokens=words)
+    packed = packer.pack(
+        [
+            chunk("one two three four", 0.9, page=0),
+            chunk("five six seven", 0.8, page=1),
+            chunk("eight nine", 0.7, page=2),
+        ]
+    )
+    # The second passage does not fit, but a smaller one after it does
+    assert [p.page_content for p in packed] == ["one two three four", "eight nine"]
+
+
+def test_pack_always_keeps_the_best_passage():
+    packer = ContextPacker(token_budget=2, count_tokens=words)
+    packed = packer.pack([chunk("one two three four", 0.9), chunk("five", 0.1, page=1)])
+    assert [p.page_content for p in packed] == ["one two three four"]
@@ -0,0 +1,77 @@
+import os
+from typing import List
+
+import httpx
+import pytest
+
+from src.pdf_cache import PDFCache
+
+URL = "https://arxiv.org/pdf/2401.00001"
+
+
+class FakeServer:
+    """Serves `body` with an ETag, answering 304 to a request that already has it."""
+
+    def __init__(self, body: bytes, etag: str) -> None:
+        self.body = body
+        self.etag = etag
+        self.requests: List[httpx.Request] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.headers.get("If-None-Match") == self.etag:
+            return httpx.Response(304)
+        return httpx.Response(200, content=self.body, headers={"ETag": self.etag})
+
+
+@pytest.fixture
+def server() -> FakeServer:
+    return FakeServer(b"%PDF-1.4 first", '"v1"')
+
+
+def make_cache(tmp_path, server: FakeServer, max_age: float = 0.0) -> PDFCache:
+    return PDFCache(
+        os.path.join(tmp_path, "pdfs"), max_age=max_age, client=httpx.Client(transport=httpx.MockTransport(server))
+    )
+
+
+def read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_fresh_entries_are_served_without_a_request(tmp_path, server):
+    cache = make_cache(tmp_path, server, max_age=3600.0)
+    first = cache.fetch(URL)
+    assert cache.fetch(URL) == first
+    assert len(server.requests) == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_not_modified_reuses_the_cached_file(tmp_path, server):
+    cache = make_cache(tmp_path, server)
+    first = cache.fetch(URL)
+    second = cache.fetch(URL)
+    assert second == first and read(second) == b"%PDF-1.4 first"
+    assert server.requests[1].headers["If-None-Match"] == '"v1"'
+    assert cache.stats()["revalidated"] == 1 and cache.stats()["downloaded"] == 1
+
+
+def test_changed_pdf_replaces_the_cached_file(tmp_path, server):
+    cache = make_cache(tmp_path, server)
+    first = cache.fetch(URL)
+    server.body, server.etag = b"%PDF-1.4 second", '"v2"'
+    second = cache.fetch(URL)
+    assert second != first and read(second) == b"%PDF-1.4 second"
+    assert cache.stats()["downloaded"] == 2
+    # The index now points at the new copy and its validator, also for a new cache over the same root
+    assert make_cache(tmp_path, server).fetch(URL) == second
+    assert server.requests[-1].headers["If-None-Match"] == '"v2"'
+
+
+def test_cached_file_is_served_when_the_server_fails(tmp_path, server):
+    cache = make_cache(tmp_path, server)
+    first = cache.fetch(URL)
+    cache.client = httpx.Client(transport=httpx.MockTransport(lambda request: httpx.Response(503)))
+    assert cache.fetch(URL) == first
+    assert cache.stats()["offline"] == 1
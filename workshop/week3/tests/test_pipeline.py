@@ -0,0 +1,29 @@
+import os
+
+from benchmarks.corpus import make_corpus
+from benchmarks.fakes import HashingEmbeddings
+from src.main import ArXivProcessor
+
+
+def ingest(directory: str, papers, pipelined: bool) -> ArXivProcessor:
+    processor = ArXivProcessor(embeddings=HashingEmbeddings(), persist_directory=directory, pdf_cache_dir=None)
+    processor.load_and_process(papers, pipelined=pipelined, download_workers=2, parse_workers=2)
+    return processor
+
+
+def test_pipelined_ingestion_matches_serial(tmp_path):
+    papers = make_corpus(os.path.join(tmp_path, "papers"), papers=3, pages=3)
+    serial = ingest(os.path.join(tmp_path, "serial"), papers, pipelined=False)
+    pipelined = ingest(os.path.join(tmp_path, "pipelined"), papers, pipelined=True)
+
+    assert pipelined.manifest.sources == serial.manifest.sources
+    assert pipelined.corpus_version == serial.corpus_version
+    assert sorted(pipelined.lexical_index.ids) == sorted(serial.lexical_index.ids)
+    stored = [processor.vector_store.get() for processor in [serial, pipelined]]
+    assert sorted(zip(stored[0]["ids"], stored[0]["documents"])) == sorted(
+        zip(stored[1]["ids"], stored[1]["documents"])
+    )
+    for question in ["How is the policy trained?", "What bounds the error of the estimator?"]:
+        assert [d.page_content for d in pipelined.retrieve(question, confidence_threshold=0.0)] == [
+            d.page_content for d in serial.retrieve(question, confidence_threshold=0.0)
+        ]
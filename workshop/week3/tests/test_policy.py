@@ -0,0 +1,17 @@
+from src.policy import RetrievalPolicy
+
+
+def test_arxiv_route_falls_back_to_web_on_low_scores():
+    policy = RetrievalPolicy()
+    assert policy.needs_web("arxiv", [])
+    # Only hits kept for their BM25 score, below the relevance threshold
+    assert policy.needs_web("arxiv", [0.3, 0.1])
+    assert not policy.needs_web("arxiv", [0.6, 0.1])
+    assert not RetrievalPolicy(web_fallback=False).needs_web("arxiv", [0.3])
+
+
+def test_both_route_searches_the_web_unless_early_exit():
+    scores = [0.9, 0.8]
+    assert RetrievalPolicy().needs_web("both", scores)
+    assert not RetrievalPolicy(early_exit=True).needs_web("both", scores)
+    assert RetrievalPolicy(early_exit=True).needs_web("both", [0.9, 0.6])
@@ -0,0 +1,82 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+from evals.utils import EvaluationQuestion, EvaluationResult, ResultStore, config_hash, question_hash, source_hash
+
+
+def result(question: str, config: str, **fields) -> EvaluationResult:
+    return EvaluationResult(
+        question_hash=question_hash(EvaluationQuestion(question=question, answer="reference", category="internal")),
+        config_hash=config,
+        question=question,
+        answer="reference",
+        category="internal",
+        response="response",
+        latency=1.5,
+        **fields,
+    )
+
+
+def test_results_round_trip_per_question_and_config(tmp_path):
+    path = os.path.join(tmp_path, "results.sqlite")
+    store = ResultStore(path)
+    first, other_config = result("What is RLHF?", "config-1"), result("What is RLHF?", "config-2", score=True)
+    store.put_many([first, other_config])
+    assert ResultStore(path).get(first.question_hash, "config-1") == first
+    assert store.get(first.question_hash, "config-2") == other_config
+    assert store.get(first.question_hash, "config-3") is None
+
+
+def test_grading_a_stored_result_replaces_it(tmp_path):
+    store = ResultStore(os.path.join(tmp_path, "results.sqlite"))
+    ungraded = result("What is RLHF?", "config")
+    store.put_many([ungraded])
+    store.put_many([ungraded.model_copy(update={"score": False})])
+    assert store.get(ungraded.question_hash, "config").score is False
+
+
+def test_question_hash_ignores_the_reference_answer_and_category():
+    question = EvaluationQuestion(question="What is RLHF?", answer="reference", category="internal")
+    assert question_hash(question) == question_hash(question.model_copy(update={"answer": "new", "category": "web"}))
+    assert question_hash(question) != question_hash(question.model_copy(update={"question": "What is DPO?"}))
+
+
+def test_config_hash_is_independent_of_key_order():
+    assert config_hash({"a": 1, "b": [2, 3]}) == config_hash({"b": [2, 3], "a": 1})
+    assert config_hash({"a": 1}) != config_hash({"a": 2})
+
+
+def test_source_hash_covers_only_the_listed_files(tmp_path):
+    for name in ["main.py", "serving.py"]:
+        (tmp_path / name).write_text("x = 1\n")
+    answer_hash = source_hash(str(tmp_path), ["main.py"])
+    (tmp_path / "serving.py").write_text("x = 2\n")
+    assert source_hash(str(tmp_path), ["main.py"]) == answer_hash
+    (tmp_path / "main.py").write_text("x = 2\n")
+    assert source_hash(str(tmp_path), ["main.py"]) != answer_hash
+
+
+@pytest.fixture
+def run_evals(monkeypatch):
+    # The evals script imports its helpers as a top-level `utils` package and creates an OpenAI client on import
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.syspath_prepend(os.path.join(os.path.dirname(__file__), "..", "evals"))
+    module = importlib.import_module("run_evals")
+    yield module
+    for name in [name for name in sys.modules if name == "run_evals" or name.split(".")[0] == "utils"]:
+        del sys.modules[name]
+
+
+def test_answer_sources_exist(run_evals):
+    for name in run_evals.ANSWER_SOURCES:
+        assert os.path.exists(os.path.join(run_evals.SRC_PATH, name)), name
+
+
+def test_agent_config_hash_follows_the_agent_config(run_evals, monkeypatch):
+    config_key = run_evals.agent_config_hash()
+    assert run_evals.agent_config_hash() == config_key
+    monkeypatch.setitem(run_evals.AGENT_CONFIG, "arxiv_links", ["https://arxiv.org/pdf/2401.00001.pdf"])
+    assert run_evals.agent_config_hash() != config_key
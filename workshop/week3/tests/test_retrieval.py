@@ -0,0 +1,36 @@
+from src.lexical import BM25Index, query_terms
+
+# The fake embeddings are bags of words, so chunks sharing function words with a question pass a low threshold;
+# a high one leaves the lexical evidence alone to decide
+HIGH_THRESHOLD = 0.9
+
+
+def test_query_terms_drop_stopwords():
+    assert query_terms("What is the theorem of the paper?") == ["theorem", "paper"]
+
+
+def test_stopwords_alone_match_nothing():
+    index = BM25Index()
+    index.add(["a", "b"], ["the proof of the theorem", "the noise of the samples"])
+    assert not index.search("what is the state of the art")
+
+
+def test_lexical_scores_are_normalized():
+    index = BM25Index()
+    index.add(["a", "b", "c"], ["robot policy", "theorem proof", "noise samples"])
+    [(chunk_id, score)] = index.search("robot policy")
+    assert chunk_id == "a"
+    assert 0.0 < score < 1.0
+
+
+def test_off_topic_question_has_no_hybrid_hits(processor):
+    question = "What is the weather in the city of Paris today?"
+    assert processor.retrieve(question, confidence_threshold=HIGH_THRESHOLD, mode="hybrid") == []
+
+
+def test_exact_term_match_is_kept_in_hybrid_mode(processor):
+    hits = processor.retrieve("RLHF", confidence_threshold=HIGH_THRESHOLD, mode="hybrid")
+    assert hits
+    assert all("RLHF" in hit.page_content for hit in hits)
+    # Kept for BM25 alone, so not a strong hit for the retrieval policy
+    assert all(hit.metadata["relevance_score"] < HIGH_THRESHOLD for hit in hits)
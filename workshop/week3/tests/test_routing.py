@@ -0,0 +1,35 @@
+import asyncio
+import threading
+
+from benchmarks.fakes import HashingEmbeddings
+from src.main import arouter_node
+from src.routing import EmbeddingRouter
+
+
+def test_agent_build_warms_the_router(make_agent):
+    assert make_agent().local_router.ready
+
+
+def test_cold_router_warms_up_off_the_event_loop():
+    embeddings = HashingEmbeddings()
+    corpus = embeddings.embed_query("diffusion policy trained on robot trajectories")
+    scans = []
+
+    def centroids(ids):
+        scans.append(threading.current_thread())
+        return {"paper.pdf": corpus}
+
+    router = EmbeddingRouter(embeddings, centroids)
+    state = {"local_router": router, "question": "", "conversation_history": "", "question_embedding": corpus}
+    assert asyncio.run(arouter_node(state)) == {"routing_decision": "arxiv"}
+    assert scans and scans[0] is not threading.main_thread()
+    # Warm now: later decisions don't scan again
+    asyncio.run(arouter_node(state))
+    assert len(scans) == 1
+
+
+def test_follow_ups_are_left_to_the_llm_router():
+    embeddings = HashingEmbeddings()
+    router = EmbeddingRouter(embeddings, lambda ids: {"paper.pdf": embeddings.embed_query("robot policy")})
+    assert router.decide(embeddings.embed_query("robot policy"), history="User: what is RLHF?") is None
+    assert router.stats()["fallback_history"] == 1
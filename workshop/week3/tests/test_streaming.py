@@ -0,0 +1,43 @@
+import asyncio
+from typing import Dict, List
+
+from src.main import RAGAgent
+
+
+def stream(agent: RAGAgent, question: str, session_id: str) -> List[Dict[str, str]]:
+    async def collect() -> List[Dict[str, str]]:
+        return [event async for event in agent.astream(question, session_id=session_id)]
+
+    return asyncio.run(collect())
+
+
+def test_streamed_answer_is_served_from_cache_the_second_time(make_agent):
+    agent = make_agent(semantic_cache_threshold=0.95)
+    question = "How is the diffusion policy trained?"
+    first = stream(agent, question, "first")
+    assert not [e for e in first if e["type"] == "status" and e["node"] == "cache"]
+    # A new session has the same (empty) history, so the same cache key
+    second = stream(agent, question, "second")
+    assert {"type": "status", "node": "cache", "content": "Served from cache"} in second
+    answer = second[-1]
+    assert answer["type"] == "answer"
+    assert answer["content"].startswith("> _Served from cache")
+    assert answer["content"].endswith(first[-1]["content"])
+
+
+def test_stream_yields_statuses_then_answer_tokens_then_the_answer(make_agent):
+    agent = make_agent()
+    events = stream(agent, "How is RLHF used to train policies?", "session")
+    kinds = [event["type"] for event in events]
+    first_token = kinds.index("token")
+    # Steps before synthesis only report their status; their LLM calls are not streamed as answer tokens
+    assert set(kinds[:first_token]) == {"status"}
+    assert "synthesize" not in [event["node"] for event in events[:first_token]]
+    assert events[-1]["type"] == "answer"
+    tokens = [event["content"] for event in events if event["type"] == "token"]
+    answer = events[-1]["content"]
+    # Header first, then the synthesis tokens, then the citation footer: together exactly the final answer
+    assert answer.startswith(tokens[0]) and tokens[0].startswith("## Context")
+    assert answer.endswith(tokens[-1])
+    assert "".join(tokens) == answer
+    assert kinds.index("answer") == len(kinds) - 1